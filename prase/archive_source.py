@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Read pages straight out of zip, tar (.gz/.bz2/.xz/.zst) and WARC files.
+
+``iter_members(archive, ext)`` streams one ``Member`` per page, holding the
+page's bytes. Nothing is extracted to disk, and tar and WARC files are read
+front to back in a single pass. Each member is named by its base name, so
+``filename.replace('_', '/')`` gives the DOI exactly as it does for a folder
+of files. A WARC record is named after the DOI found in its target URI
+(``10.1007/s1`` -> ``10.1007_s1.html``), falling back to the URI's last path
+segment. Only 2xx responses whose Content-Type is a page (HTML/XHTML ->
+``.html``, XML -> ``.xml``) become members, and when a page was fetched
+twice the first response is kept. A record that cannot be decoded is
+skipped with a warning.
+"""
+import os
+import re
+import sys
+import zlib
+import gzip
+import tarfile
+import zipfile
+from collections import namedtuple
+from datetime import datetime
+from urllib.parse import urlparse, unquote
+
+Member = namedtuple('Member', 'name data mtime_ns')
+
+TAR_EXTS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ZSTD_TAR_EXTS = ('.tar.zst', '.tzst')
+WARC_EXTS = ('.warc', '.warc.gz')
+ARCHIVE_EXTS = ('.zip',) + TAR_EXTS + ZSTD_TAR_EXTS + WARC_EXTS
+
+DOI = re.compile(r'10\.\d{4,9}/[^\s?#&"]+')
+
+
+def is_archive(path):
+    return os.path.isfile(path) and path.lower().endswith(ARCHIVE_EXTS)
+
+
+def _wanted(name, ext):
+    return name.endswith(ext) and not name.startswith('.')
+
+
+def _zip_members(path, ext):
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not _wanted(name, ext):
+                continue
+            mtime = int(datetime(*info.date_time).timestamp() * 1e9)
+            yield Member(name, zf.read(info), mtime)
+
+
+def _tar_members(tf, ext):
+    for info in tf:
+        name = os.path.basename(info.name)
+        if not info.isfile() or not _wanted(name, ext):
+            continue
+        yield Member(name, tf.extractfile(info).read(), int(info.mtime * 1e9))
+
+
+def _http_response(block):
+    """``(status, headers, body)`` of a raw HTTP response, the body as sent."""
+    head, sep, body = block.partition(b'\r\n\r\n')
+    if not sep:
+        raise ValueError('HTTP headers do not end')
+    lines = head.split(b'\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip().lower()
+    return status, headers, body
+
+
+def _http_body(headers, body):
+    """``body`` de-chunked and decompressed."""
+    if 'chunked' in headers.get('transfer-encoding', ''):
+        out = []
+        rest = body
+        while rest:
+            size_line, _, rest = rest.partition(b'\r\n')
+            size = int(size_line.split(b';')[0] or b'0', 16)
+            if size == 0:
+                break
+            out.append(rest[:size])
+            rest = rest[size + 2:]
+        body = b''.join(out)
+    encoding = headers.get('content-encoding', '')
+    if encoding in ('gzip', 'x-gzip'):
+        body = gzip.decompress(body)
+    elif encoding == 'deflate':
+        body = zlib.decompress(body)
+    return body
+
+
+def _page_suffix(content_type):
+    """'.html' or '.xml' for a page's Content-Type; None for anything else
+    (images, scripts, robots.txt...)."""
+    mime = content_type.split(';', 1)[0].strip().lower()
+    if mime in ('text/html', 'application/xhtml+xml'):
+        return '.html'
+    if mime in ('text/xml', 'application/xml'):
+        return '.xml'
+    return None
+
+
+def _warc_records(f):
+    """``(headers, block)`` for each record of an uncompressed WARC stream."""
+    while True:
+        line = f.readline()
+        if not line:
+            return
+        if not line.strip():
+            continue
+        if not line.startswith(b'WARC/'):
+            raise ValueError(f'not a WARC record: {line[:40]!r}')
+        headers = {}
+        while True:
+            line = f.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            key, _, value = line.decode('utf-8', 'replace').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        yield headers, f.read(int(headers.get('content-length', 0)))
+
+
+def warc_name(uri, suffix='.html'):
+    """File name a page fetched from ``uri`` would have had in our folders."""
+    m = DOI.search(unquote(uri))
+    if m:
+        return m.group(0).rstrip('/.').replace('/', '_') + suffix
+    name = urlparse(uri).path.rstrip('/').rsplit('/', 1)[-1] or 'index'
+    return name if name.endswith(suffix) else name + suffix
+
+
+def _warc_members(path, ext):
+    opener = gzip.open if path.lower().endswith('.gz') else open
+    seen = set()
+    with opener(path, 'rb') as f:
+        for headers, block in _warc_records(f):
+            kind = headers.get('warc-type')
+            uri = headers.get('warc-target-uri', '')
+            try:
+                if kind == 'response' and headers.get('content-type', '').startswith('application/http'):
+                    status, http_headers, body = _http_response(block)
+                    content_type = http_headers.get('content-type', '')
+                elif kind == 'resource':
+                    status, http_headers, body = 200, None, block
+                    content_type = headers.get('content-type', '')
+                else:
+                    continue
+                suffix = _page_suffix(content_type)
+                if not 200 <= status < 300 or suffix is None:
+                    continue  # redirects, error pages, and anything that is not a page
+                name = warc_name(uri, suffix)
+                if name in seen or not _wanted(name, ext):
+                    continue  # a page fetched twice: the first response wins
+                data = body if http_headers is None else _http_body(http_headers, body)
+            except (ValueError, IndexError, OSError, EOFError, zlib.error) as e:
+                # one damaged record (bad status line, chunk size or gzip body) is skipped, not the run
+                print(f'WARNING  {path}: skipped {uri}: {e!r}', file=sys.stderr)
+                continue
+            seen.add(name)
+            try:
+                mtime = int(datetime.fromisoformat(headers['warc-date'].replace('Z', '+00:00')).timestamp() * 1e9)
+            except (KeyError, ValueError):
+                mtime = 0
+            yield Member(name, data, mtime)
+
+
+def iter_shards(folder, ext='.html'):
+    """``iter_members`` over every archive in ``folder``, in name order."""
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(ARCHIVE_EXTS):
+            yield from iter_members(os.path.join(folder, name), ext)
+
+
+def iter_members(path, ext='.html'):
+    """Stream the pages ending in ``ext`` out of archive ``path``."""
+    lower = path.lower()
+    if lower.endswith('.zip'):
+        yield from _zip_members(path, ext)
+    elif lower.endswith(WARC_EXTS):
+        yield from _warc_members(path, ext)
+    elif lower.endswith(ZSTD_TAR_EXTS):
+        import zstandard
+        with open(path, 'rb') as raw:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            with tarfile.open(fileobj=stream, mode='r|') as tf:
+                yield from _tar_members(tf, ext)
+    elif lower.endswith(TAR_EXTS):
+        with tarfile.open(path, 'r|*') as tf:
+            yield from _tar_members(tf, ext)
+    else:
+        raise ValueError(f'not a supported archive: {path}')
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import importlib.util
+from itertools import islice
+from functools import partial
+from multiprocessing import Pool
+
+from archive_source import ARCHIVE_EXTS, is_archive, iter_members, iter_shards
+from doc_store import ShardWriter
+from doc_timing import profile_slowest
+from jsonl_io import JsonlWriter
+from manifest import Manifest
+
+workers   = os.cpu_count() or 1   # size of the process pool, 1 = run in the main process
+chunksize = 16                    # files handed to a worker per task
+recycle   = 400                   # restart a worker after this many files (bs4 memory growth)
+window    = 4                     # archive input: chunks per worker read ahead (bounds memory)
+
+
+def load_script(filename):
+    """Import one of the prase scripts by file name (several contain '-')."""
+    name = os.path.splitext(filename)[0].replace('-', '_')
+    if name in sys.modules:
+        return sys.modules[name]
+    here = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location(name, os.path.join(here, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def list_inputs(path, ext='.html'):
+    """Names of the ``ext`` files in folder ``path``. For an archive, or a
+    folder holding only archives (WARC shards, say), a stream of
+    ``archive_source.Member``s instead, read one at a time."""
+    if is_archive(path):
+        return iter_members(path, ext)
+    files = [f for f in os.listdir(path) if f.endswith(ext)]
+    if not files and any(f.lower().endswith(ARCHIVE_EXTS) for f in os.listdir(path)):
+        return iter_shards(path, ext)
+    return files
+
+
+def _call_member(work, member):
+    return work(member.name, member.data)
+
+
+def _parsed(head):
+    # a DocTimer without error; a plain text line reports a file that was not parsed
+    return not isinstance(head, str) and getattr(head, 'error', None) is None
+
+
+def _deliver(res, log, manifest, path, file):
+    try:
+        yield res
+    finally:
+        log.write(str(res[0]))
+    # reached only when the caller asks for the next result, i.e. has stored this one
+    if manifest is not None and _parsed(res[0]):
+        manifest.record(path, file)
+
+
+def run_batch(work, files, logpath, n_workers=None, n_chunk=None, n_recycle=None,
+              manifest=None, path=None):
+    """Run ``work(file)`` over ``files`` and yield its results in input order.
+
+    ``work`` must be a module-level function (or a ``functools.partial`` of
+    one) returning a tuple whose first item is the text to log for that file,
+    or a ``doc_timing.DocTimer``. The log is written only from this process,
+    so ``parse.log`` keeps the order of ``files`` whatever the order in which
+    workers finish. A line is written once the caller has handled the result,
+    so stages timed in this process (section tree, JSONL) are in it too.
+
+    ``files`` is a list of names in ``path``, or a stream of
+    ``archive_source.Member``s from ``list_inputs``. Members are handed to
+    ``work(name, data)``, so a worker never opens the archive.
+
+    With a ``manifest.Manifest`` only new or changed files under ``path`` are
+    handed out. A file is recorded in it only when it was parsed (its
+    ``DocTimer`` has no ``error``), and only after the caller has handled its
+    result, so a crash while storing it leaves it unrecorded. Failed files
+    (PARSE ERROR, or a plain text log line such as dispatch.py's READ ERROR)
+    are handed out again on the next run. Pass the caller's writers to the
+    manifest as ``outputs`` so each commit follows their flush.
+    """
+    n_workers = n_workers or workers
+    n_chunk = n_chunk or chunksize
+    n_recycle = n_recycle or recycle
+    if manifest is not None:
+        files = manifest.changed(path, files)
+    streamed = not isinstance(files, (list, tuple))
+    if streamed:
+        work = partial(_call_member, work)
+
+    with open(logpath, 'w', encoding='utf-8') as log:
+        if n_workers <= 1:
+            for file in files:
+                yield from _deliver(work(file), log, manifest, path, file)
+            return
+
+        # maxtasksperchild counts chunks, not files
+        maxtasks = max(1, n_recycle // n_chunk)
+        with Pool(n_workers, maxtasksperchild=maxtasks) as pool:
+            if not streamed:
+                for file, res in zip(files, pool.imap(work, files, n_chunk)):
+                    yield from _deliver(res, log, manifest, path, file)
+                return
+            # imap would read the whole archive ahead; hand it a slice at a time
+            members = iter(files)
+            while True:
+                batch = list(islice(members, n_workers * n_chunk * window))
+                if not batch:
+                    break
+                for member, res in zip(batch, pool.imap(work, batch, n_chunk)):
+                    yield from _deliver(res, log, manifest, path, member)
+
+
+class Outputs:
+    """What the main process writes for one output folder: the JSONL file
+    ``jsonl`` (None for none) and, in a sharded run, the shard store under
+    ``<folder>/shards``. Each is opened when its first document arrives."""
+
+    def __init__(self, folder, jsonl=None, append=False):
+        self.folder = folder
+        self.jsonl = jsonl
+        self.append = append
+        self.writer = None
+        self.store = None
+
+    def put(self, timer, line, packed):
+        """Store one result of a parser's ``process_file``: its JSONL ``line``
+        and the ``packed`` txt/JSON files (either may be None)."""
+        if packed:
+            if self.store is None:
+                self.store = ShardWriter(os.path.join(self.folder, 'shards'), append=self.append)
+            timer.start()
+            for name, text in packed:
+                self.store.put(name, text)
+            timer.mark('write')
+        if line is not None and self.jsonl is not None:
+            if self.writer is None:
+                self.writer = JsonlWriter(self.jsonl, append=self.append)
+            timer.start()
+            self.writer.write_line(line)
+            timer.mark('write')
+
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+        if self.store is not None:
+            self.store.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.store is not None:
+            self.store.close()
+        self.writer = self.store = None
+
+
+def main(process_file, path, txtpath, parser, version=1, incremental=1, jsonl=None, profile=0, args=()):
+    """The ``__main__`` of a parser script: parse every page in ``path`` (a
+    folder or an archive) into ``txtpath``.
+
+    ``process_file(path, txtpath, *args, file, data=None)`` returns
+    ``(DocTimer, doi, line, packed)``: the JSONL line made by
+    ``jsonl_io.jsonl_line`` (None when there is none) and, with ``sharded``,
+    the list of txt/JSON files for the shard store (else None). ``parser``
+    and ``version`` key the manifest (``incremental``); ``jsonl`` is the
+    JSONL file to append the lines to, None for no JSONL; ``profile`` > 0
+    re-runs that many of the slowest pages under cProfile afterwards.
+    """
+    os.makedirs(txtpath, exist_ok=True)
+    logpath = os.path.join(txtpath, 'parse.log')
+    outputs = Outputs(txtpath, jsonl, append=incremental)
+    manifest = Manifest(os.path.join(txtpath, 'manifest.sqlite'), parser, version, [outputs]) if incremental else None
+    work = partial(process_file, path, txtpath, *args)
+    for timer, doi, line, packed in run_batch(work, list_inputs(path), logpath, manifest=manifest, path=path):
+        outputs.put(timer, line, packed)
+    outputs.close()
+    if manifest is not None:
+        manifest.close()
+    if profile:
+        profile_slowest(logpath, profile, work, os.path.join(txtpath, 'profile'), path)
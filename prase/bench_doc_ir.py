@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Memory and pickle size of the nested doc dicts vs DocIR.
+
+    python bench_doc_ir.py [docs]
+
+Builds synthetic documents, keeps all of them alive the way results queue
+up in the main process, and reports the memory they hold, their pickled
+size and how long the main process takes to unpickle them. It also checks
+that ``DocIR.to_dict`` gives the old doc dict.
+"""
+import sys
+import time
+import pickle
+import random
+import tracemalloc
+
+from doc_ir import DocIR
+from section_tree import section_struct, split_section_struct
+
+
+def synthetic_doc(rng, n_sections=8, n_items=30):
+    words = ['fatigue', 'crack', 'weld', 'stress', 'amplitude', 'specimen', 'residual', 'toe', 'cycles']
+    ids, texts = [], []
+    for s in range(n_sections):
+        sec_ids, sec_texts = ['h2'], [f'{s + 1} Section']
+        for _ in range(n_items):
+            tag = rng.choice(['p', 'p', 'p', 'p', 'h3', 'eq', 'li'])
+            sec_ids.append(tag)
+            n = 3 if tag == 'h3' else rng.randint(20, 120)
+            sec_texts.append(' '.join(rng.choice(words) for _ in range(n)))
+        ids.append(sec_ids)
+        texts.append(sec_texts)
+    return 'A study of welded joints', 'abstract ' * 50, ['weld', 'fatigue'], ids, texts
+
+
+def as_dict(title, abstract, keywords, ids, texts, split=False):
+    build = split_section_struct if split else section_struct
+    return {'title': title, 'abstract': abstract, 'keywords': keywords, 'path': 'p', 'file': 'f',
+            'doi': 'd', 'content': [build(i, t) for i, t in zip(ids, texts)]}
+
+
+def fresh(raw):
+    # new strings each time, so every form owns its texts as a real parse would
+    title, abstract, keywords, ids, texts = raw
+    return title, abstract, keywords, [list(s) for s in ids], [[''.join(t) for t in s] for s in texts]
+
+
+def measure(build, raws):
+    """Memory held once every document is built, pickled size, build and unpickle time."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    held = [build(*fresh(raw)) for raw in raws]
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blobs = [pickle.dumps(x) for x in held]
+    t0 = time.perf_counter()
+    for blob in blobs:
+        pickle.loads(blob)
+    loads = time.perf_counter() - t0
+    return current, sum(map(len, blobs)), elapsed, loads
+
+
+def main(n_docs=500):
+    rng = random.Random(0)
+    raws = [synthetic_doc(rng) for _ in range(n_docs)]
+    for raw in raws[:50]:
+        for split in (False, True):
+            ir = DocIR.from_lists(*raw, 'p', 'f', 'd', split=split)
+            assert ir.to_dict() == as_dict(*raw, split=split)
+            assert ir.to_lists() == (raw[3], raw[4])
+            assert pickle.loads(pickle.dumps(ir)).to_dict() == ir.to_dict()
+
+    builds = [('lists', lambda *raw: (raw[3], raw[4])),
+              ('doc dict', as_dict),
+              ('DocIR', lambda *raw: DocIR.from_lists(*raw, 'p', 'f', 'd'))]
+    for name, build in builds:
+        held, size, elapsed, loads = measure(build, raws)
+        print(f'{name:10s} held {held / 2**20:7.1f} MB   pickled {size / 2**20:7.1f} MB   '
+              f'build {elapsed:6.2f} s   unpickle {loads * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
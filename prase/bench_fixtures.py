@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Synthetic pages for the parser benchmarks.
+
+    python bench_fixtures.py <out dir> [docs] [size]
+
+Writes ``docs`` pages per publisher into ``<out dir>/<publisher>``, laid
+out the way each parser expects: title, abstract, keywords, numbered
+sections with sub-sections, equations and ``rowspan``/``colspan`` tables,
+plus the navigation, script and reference chrome real pages carry around
+them. ``size`` is one of ``SIZES`` and sets how many sections, paragraphs,
+tables and equations each page has. The same seed always gives the same
+pages.
+"""
+import os
+import sys
+import random
+
+from dispatch import DOI_PREFIX
+
+SIZES = {
+    'small':  {'sections': 3,  'paras': 4,  'tables': 1, 'equations': 1},
+    'medium': {'sections': 8,  'paras': 8,  'tables': 3, 'equations': 4},
+    'large':  {'sections': 20, 'paras': 16, 'tables': 8, 'equations': 12},
+}
+PUBLISHERS = ('springer', 'mdpi', 'wiley', 'taylor', 'sage', 'asme', 'iop', 'elsevier')
+EXT = {'elsevier': '.xml'}
+PREFIX = {}
+for _prefix, _pub in DOI_PREFIX.items():
+    PREFIX.setdefault(_pub, _prefix)
+
+WORDS = ('fatigue weld toe stress amplitude cycles crack residual steel joint specimen '
+         'load ratio notch strength butt fillet grinding peening failure growth').split()
+
+
+class _Text:
+
+    def __init__(self, seed):
+        self.r = random.Random(seed)
+
+    def words(self, n):
+        return ' '.join(self.r.choice(WORDS) for _ in range(n))
+
+    def para(self):
+        return self.words(self.r.randint(40, 120))
+
+    def title(self):
+        return self.words(self.r.randint(5, 10)).capitalize()
+
+    def keywords(self):
+        return self.r.sample(WORDS, 5)
+
+
+def _chrome(t):
+    nav = '<header><nav>' + ''.join(
+        '<ul class="menu">' + ''.join(f'<li><a href="/j/{i}/{k}">Journal {i} {k}</a></li>' for k in range(20)) + '</ul>'
+        for i in range(10)) + '</nav></header>'
+    script = '<script>' + 'var cfg = {"k": [1, 2, 3]};\n' * 500 + '</script>'
+    refs = ''.join(f'<li><span class="auth">A. Author{i}</span> <i>Int J Fatigue</i> {i} (2020) '
+                   f'<a href="https://doi.org/10.1/{i}">doi</a></li>' for i in range(60))
+    return nav, script, refs
+
+
+def _table(t, n):
+    """One table with a two-row header using rowspan/colspan."""
+    rows = ''.join(f'<tr><td>S{k}</td><td>{300 - k * 20}</td><td>{150 - k * 10} ± 5</td><td>{10 ** (4 + k / 2):.3g}</td></tr>'
+                   for k in range(t.r.randint(6, 20)))
+    return ('<table><thead><tr><th rowspan="2">Specimen</th><th colspan="2">Stress (MPa)</th><th rowspan="2">N<sub>f</sub></th></tr>'
+            '<tr><th>max</th><th>amp</th></tr></thead><tbody>' + rows + '</tbody></table>')
+
+
+def _layout(size):
+    """Which section gets each table and equation: spread evenly."""
+    n = size['sections']
+    tables = [i * n // size['tables'] for i in range(size['tables'])] if size['tables'] else []
+    eqs = [i * n // size['equations'] for i in range(size['equations'])] if size['equations'] else []
+    return tables, eqs
+
+
+def springer(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    out = [f'<html><head><meta property="og:url" content="https://link.springer.com/article/{PREFIX["springer"]}/x"/>'
+           f'<title>t</title>{script}</head><body>{nav}',
+           f'<h1 class="c-article-title">{t.title()}</h1>',
+           '<section data-title="Abstract"><div class="c-article-section__content"><p>' + t.para() + '</p><ul>'
+           + ''.join(f'<li class="c-article-subject-list__subject">{k}</li>' for k in t.keywords()) + '</ul></div></section>']
+    for s in range(size['sections']):
+        out.append(f'<section data-title="{s + 1} Section"><div class="c-article-section"><h2>{s + 1} Section</h2>'
+                   '<div class="c-article-section__content">')
+        for p in range(size['paras']):
+            if p == size['paras'] // 2:
+                out.append(f'<h3>{s + 1}.1 Sub</h3>')
+            out.append('<p>' + t.para() + '</p>')
+        for k in range(eqs.count(s)):
+            out.append('<div class="c-article-equation"><div class="c-article-equation__content">'
+                       f'σ = E ε + {k}</div><div class="c-article-equation__number">({s}.{k})</div></div>')
+        for k in range(tables.count(s)):
+            out.append(f'<div class="c-article-table"><figure><figcaption>Table {s}.{k} Fatigue results</figcaption>'
+                       + _table(t, k) + '</figure></div>')
+        out.append('</div></div></section>')
+    out.append(f'<section data-title="References"><ol>{refs}</ol></section></body></html>')
+    return '\n'.join(out)
+
+
+def mdpi(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    body = []
+    for s in range(size['sections']):
+        body.append(f'<section id="sec{s}"><h2 data-nested="1">{s + 1}. Section</h2>')
+        body.extend(f'<div class="html-p">{t.para()}</div>' for _ in range(size['paras']))
+        body.extend(f'<div class="html-disp-formula-info"><math><mi>σ</mi><mo>=</mo><mn>{k}</mn></math></div>'
+                    for k in range(eqs.count(s)))
+        body.extend(f'<div class="html-table_show"><div class="html-caption">Table {s}.{k}</div>{_table(t, k)}</div>'
+                    for k in range(tables.count(s)))
+        body.append(f'<section><h4 data-nested="2">{s + 1}.1 Sub</h4><div class="html-p">{t.para()}</div></section></section>')
+    return (f'<html><head>{script}</head><body>{nav}<h1 class="title hypothesis_container">{t.title()}</h1>'
+            f'<div class="art-abstract in-tab hypothesis_container">{t.para()}</div>'
+            f'<div class="art-keywords in-tab hypothesis_container"><span itemprop="keywords">{"; ".join(t.keywords())}</span></div>'
+            f'<div class="html-body">{"".join(body)}</div><div class="html-back"><ol>{refs}</ol></div></body></html>')
+
+
+def wiley(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    body = []
+    for s in range(size['sections']):
+        body.append(f'<section class="article-section__content" id="sec{s}"><h2 class="article-section__title">{s + 1} Section</h2>')
+        body.extend(f'<p>{t.para()}</p>' for _ in range(size['paras']))
+        body.extend(f'<div class="inline-equation"><math><mi>σ</mi><mo>=</mo><mn>{k}</mn></math></div>' for k in range(eqs.count(s)))
+        body.extend(f'<div class="article-table-content"><header>Table {s}.{k} Fatigue results</header>{_table(t, k)}</div>'
+                    for k in range(tables.count(s)))
+        body.append(f'<section class="article-section__sub-content"><h3>{s + 1}.1 Sub</h3><p>{t.para()}</p></section></section>')
+    return (f'<html><head>{script}</head><body>{nav}<h1 class="citation__title">{t.title()}</h1>'
+            '<div class="abstract-group"><section class="article-section article-section__abstract"><h2>Abstract</h2>'
+            f'<div class="article-section__content"><p>{t.para()}</p></div></section></div>'
+            f'<section class="article-section article-section__full">{"".join(body)}</section>'
+            f'<section class="article-section article-section__references"><ol>{refs}</ol></section></body></html>')
+
+
+def taylor(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    body = []
+    for s in range(size['sections']):
+        body.append(f'<div class="NLM_sec NLM_sec_level_1" id="s{s}"><h2 class="section-heading-2">{s + 1}. Section</h2>')
+        body.extend(f'<p>{t.para()}</p>' for _ in range(size['paras']))
+        body.extend(f'<p><span class="NLM_disp-formula"><math><mi>σ</mi><mo>=</mo><mn>{k}</mn></math></span></p>'
+                    for k in range(eqs.count(s)))
+        body.extend(f'<div class="tableView"><div class="tableCaption">Table {s}.{k}</div>{_table(t, k)}</div>'
+                    for k in range(tables.count(s)))
+        body.append(f'<div class="NLM_sec NLM_sec_level_2"><h3 class="section-heading-3">{s + 1}.1 Sub</h3><p>{t.para()}</p></div></div>')
+    keywords = ''.join(f'<a href="/keyword/{k}">{k}</a>' for k in t.keywords())
+    return (f'<html><head>{script}</head><body>{nav}<h1><span class="hlFld-title">{t.title()}</span></h1>'
+            f'<div class="abstractSection abstractInFull"><p class="summary-title">Abstract</p><p>{t.para()}</p></div>'
+            f'<div class="abstractKeywords"><div class="hlFld-KeywordText">{keywords}</div></div>'
+            f'<div class="hlFld-Fulltext">{"".join(body)}</div><ul class="references">{refs}</ul></body></html>')
+
+
+def sage(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    body = []
+    for s in range(size['sections']):
+        body.append(f'<section id="sec-{s + 1}"><h2>{s + 1}. Section</h2>')
+        body.extend(f'<div role="paragraph">{t.para()}</div>' for _ in range(size['paras']))
+        body.extend(f'<div role="paragraph"><math><mi>σ</mi><mo>=</mo><mn>{k}</mn></math></div>' for k in range(eqs.count(s)))
+        body.extend(f'<figure class="table"><figcaption>Table {s}.{k}</figcaption>{_table(t, k)}</figure>'
+                    for k in range(tables.count(s)))
+        body.append(f'<section id="sec-{s + 1}-1"><h3>{s + 1}.1 Sub</h3><div role="paragraph">{t.para()}</div></section></section>')
+    keywords = ''.join(f'<li><a href="/keyword/{k}">{k}</a></li>' for k in t.keywords())
+    return (f'<html><head><title>t</title><meta name="keywords" content="{", ".join(t.keywords())}">{script}</head>'
+            f'<body>{nav}<article><h1>{t.title()}</h1>'
+            f'<section id="abstract"><h2>Abstract</h2><div role="paragraph">{t.para()}</div></section>'
+            f'<section id="keywords"><ul>{keywords}</ul></section>'
+            f'{"".join(body)}<section id="bibliography"><h2>References</h2><ol>{refs}</ol></section></article></body></html>')
+
+
+def asme(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    body = []
+    for s in range(size['sections']):
+        body.append(f'<div class="article-section-wrapper"><h2 class="section-title">{s + 1} Section</h2>')
+        body.extend(f'<p>{t.para()}</p>' for _ in range(size['paras']))
+        body.extend(f'<div class="disp-formula"><p>σ = E ε + {k}</p></div>' for k in range(eqs.count(s)))
+        body.extend(f'<div class="table-wrap"><div class="caption">Table {s}.{k}</div>{_table(t, k)}</div>'
+                    for k in range(tables.count(s)))
+        body.append('</div>')
+    keywords = ''.join(f'<a href="/keyword/{k}">{k}</a>' for k in t.keywords())
+    return (f'<html><head>{script}</head><body>{nav}<h1 class="article-title-main">{t.title()}</h1>'
+            f'<div class="article-section-wrapper"><section class="abstract"><p>{t.para()}</p></section></div>'
+            f'<div class="content-metadata-keywords">{keywords}</div>'
+            f'{"".join(body)}<div class="ref-list"><ol>{refs}</ol></div></body></html>')
+
+
+def iop(t, size):
+    nav, script, refs = _chrome(t)
+    tables, eqs = _layout(size)
+    body = []
+    for s in range(size['sections']):
+        body.append(f'<h2>{s + 1}. Section</h2><div class="article-text">')
+        body.extend(f'<p>{t.para()}</p>' for _ in range(size['paras']))
+        body.extend(f'<p><span class="eqn">σ = E ε + {k}</span></p>' for k in range(eqs.count(s)))
+        body.extend(f'<div class="table-wrap"><div class="caption">Table {s}.{k}</div>{_table(t, k)}</div>'
+                    for k in range(tables.count(s)))
+        body.append(f'<h3>{s + 1}.1 Sub</h3><p>{t.para()}</p></div>')
+    return (f'<html><head><meta name="citation_title" content="{t.title()}">{script}</head><body>{nav}'
+            f'<div class="wd-jnl-art-abstract"><p>{t.para()}</p></div>'
+            f'<div itemprop="articleBody">{"".join(body)}</div><ol class="references">{refs}</ol></body></html>')
+
+
+def elsevier(t, size):
+    tables, eqs = _layout(size)
+    o = ['<?xml version="1.0" encoding="UTF-8"?>',
+         '<full-text-retrieval-response xmlns="http://www.elsevier.com/xml/svapi/article/dtd" '
+         'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+         'xmlns:ce="http://www.elsevier.com/xml/common/dtd" xmlns:xocs="http://www.elsevier.com/xml/xocs/dtd" '
+         'xmlns:cals="http://www.elsevier.com/xml/common/cals/dtd" xmlns:mml="http://www.w3.org/1998/Math/MathML">',
+         f'<coredata><dc:title>{t.title()}</dc:title><dc:description>Abstract {t.para()}</dc:description>'
+         + ''.join(f'<dcterms:subject>{k}</dcterms:subject>' for k in t.keywords()) + '</coredata>',
+         '<originalText><xocs:doc><xocs:meta/><xocs:serial-item><article><body><ce:sections>']
+    for s in range(size['sections']):
+        o.append(f'<ce:section id="s{s}"><ce:label>{s + 1}</ce:label><ce:section-title>Section {s + 1}</ce:section-title>')
+        o.extend(f'<ce:para>{t.para()}</ce:para>' for _ in range(size['paras']))
+        o.extend(f'<ce:display><ce:formula id="e{s}.{k}"><mml:math><mml:mi>σ</mml:mi><mml:mo>=</mml:mo>'
+                 f'<mml:mn>{k}</mml:mn></mml:math></ce:formula></ce:display>' for k in range(eqs.count(s)))
+        o.append(f'<ce:section id="s{s}.1"><ce:section-title>Sub</ce:section-title><ce:para>{t.para()}</ce:para></ce:section></ce:section>')
+    o.append('</ce:sections></body><ce:floats>')
+    for k in range(size['tables']):
+        o.append(f'<ce:table id="t{k}"><ce:label>Table {k + 1}</ce:label><ce:caption><ce:simple-para>Fatigue results {k}'
+                 '</ce:simple-para></ce:caption><cals:tgroup cols="4"><cals:colspec colname="col1"/><cals:colspec colname="col2"/>'
+                 '<cals:colspec colname="col3"/><cals:colspec colname="col4"/><cals:thead><cals:row>'
+                 '<ce:entry morerows="1">Specimen</ce:entry><ce:entry namest="col2" nameend="col3">Stress</ce:entry>'
+                 '<ce:entry morerows="1">N<ce:inf>f</ce:inf></ce:entry></cals:row><cals:row><ce:entry colname="col2">max</ce:entry>'
+                 '<ce:entry colname="col3">amp</ce:entry></cals:row></cals:thead><cals:tbody>')
+        o.extend(f'<cals:row><ce:entry>S{i}</ce:entry><ce:entry>{300 - i * 20}</ce:entry><ce:entry>{150 - i * 10}</ce:entry>'
+                 f'<ce:entry>{10 ** (4 + i / 2):.3g}</ce:entry></cals:row>' for i in range(t.r.randint(6, 20)))
+        o.append('</cals:tbody></cals:tgroup></ce:table>')
+    o.append('</ce:floats></article></xocs:serial-item></xocs:doc></originalText></full-text-retrieval-response>')
+    return '\n'.join(o)
+
+
+GENERATORS = {'springer': springer, 'mdpi': mdpi, 'wiley': wiley, 'taylor': taylor, 'sage': sage,
+              'asme': asme, 'iop': iop, 'elsevier': elsevier}
+
+
+def generate(publisher, seed=0, size='medium'):
+    """One page as a str; ``size`` is a key of ``SIZES`` or a dict like them."""
+    if isinstance(size, str):
+        size = SIZES[size]
+    return GENERATORS[publisher](_Text(seed), size)
+
+
+def write_fixtures(out_dir, docs=50, size='medium', publishers=PUBLISHERS):
+    """Write ``docs`` pages per publisher, return ``{publisher: folder}``."""
+    folders = {}
+    for pub in publishers:
+        folder = os.path.join(out_dir, pub)
+        os.makedirs(folder, exist_ok=True)
+        prefix = 'S' if pub == 'elsevier' else PREFIX[pub] + '_'
+        for i in range(docs):
+            name = f'{prefix}{size}{i}{EXT.get(pub, ".html")}'
+            with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+                f.write(generate(pub, i, size))
+        folders[pub] = folder
+    return folders
+
+
+if __name__ == '__main__':
+    write_fixtures(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+                   sys.argv[3] if len(sys.argv) > 3 else 'medium')
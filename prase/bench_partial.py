@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Full vs partial (SoupStrainer) DOM parsing for the MDPI and Wiley parsers.
+
+    python bench_partial.py mdpi  F:\\html\\10.3390
+    python bench_partial.py wiley F:\\html\\wiley
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from batch_runner import load_script, list_inputs
+from partial_parse import parse_regions
+
+SCRIPTS = {'mdpi': 'html-mdpi-prase.py', 'wiley': 'html_parse_wiley.py'}
+
+
+def run(module, text, partial):
+    if partial:
+        doc = parse_regions(text, module.REGIONS, module.REQUIRED)
+    else:
+        doc = BeautifulSoup(text, 'lxml')
+    return module.parse_doc(doc)
+
+
+def bench(publisher, path):
+    module = load_script(SCRIPTS[publisher])
+    pages = []
+    for file in list_inputs(path):
+        with open(os.path.join(path, file), 'r', encoding='utf-8') as f:
+            pages.append((file, f.read()))
+    mb = sum(len(t) for _, t in pages) / 1e6
+
+    outs = {}
+    for partial in (0, 1):
+        name = 'partial' if partial else 'full'
+        t0 = time.perf_counter()
+        outs[name] = [run(module, text, partial) for _, text in pages]
+        dt = time.perf_counter() - t0
+
+        peaks = []
+        for _, text in pages[:20]:
+            tracemalloc.start()
+            run(module, text, partial)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        print(f'{name:8s} {len(pages) / dt:7.1f} docs/s  {dt / len(pages) * 1e3:7.2f} ms/doc  '
+              f'peak {max(peaks) / 1e6:6.1f} MB/doc  ({len(pages)} docs, {mb / len(pages) * 1e3:.0f} KB avg)')
+
+    same = sum(a == b for a, b in zip(outs['full'], outs['partial']))
+    print(f'identical output: {same}/{len(pages)}')
+
+
+if __name__ == '__main__':
+    bench(sys.argv[1], sys.argv[2])
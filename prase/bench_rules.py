@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Docs/sec of the bs4 and rules engines of one publisher's parser.
+
+    python bench_rules.py springer F:\\html\\10.1007 [repeat]
+
+Both engines go through the script's own ``load_doc``, so reading and
+decoding the file is timed too. Any page whose output differs is listed.
+"""
+import os
+import sys
+import time
+
+from batch_runner import load_script, list_inputs
+from dispatch import SCRIPTS
+
+
+def bench(pub, path, repeat=3):
+    module = load_script(SCRIPTS[pub])
+    files = list_inputs(path)
+    mb = sum(os.path.getsize(os.path.join(path, f)) for f in files) / 1e6
+
+    results = {}
+    for engine in ('bs4', 'rules'):
+        best = None
+        for _ in range(repeat):
+            out = {}
+            t0 = time.perf_counter()
+            for file in files:
+                try:
+                    out[file] = module.load_doc(os.path.join(path, file), engine)
+                except Exception as e:
+                    out[file] = repr(e)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        results[engine] = out
+        print(f'{engine:5s} {len(files) / best:8.1f} docs/s  {mb / best:6.2f} MB/s  ({len(files)} docs, best of {repeat})')
+
+    diff = [f for f in files if results['bs4'][f] != results['rules'][f]]
+    print(f'output mismatches: {len(diff)}', *diff[:10])
+    return results
+
+
+if __name__ == '__main__':
+    bench(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 3)
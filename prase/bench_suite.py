@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Throughput, latency and memory of every parser variant.
+
+    python bench_suite.py [docs] [size] [out.json]
+    python bench_suite.py compare old.json new.json
+
+Pages come from ``bench_fixtures`` (written once under
+``bench_results/fixtures/<size>``). Each variant runs in a fresh process,
+so its peak RSS is its own. Every page is parsed once untimed to warm up
+(``parse_single_table``: the first page only), then once timed. Per variant
+the run records docs/s, MB/s, p50/p99 per-document latency and peak RSS; a
+variant whose process dies or runs past ``TIMEOUT`` is recorded with an
+'error' instead. Results go to a JSON file, by default
+``bench_results/<date>-<size>.json``. ``compare`` prints two such files
+side by side.
+"""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import subprocess
+import multiprocessing as mp
+from queue import Empty
+
+from bench_fixtures import write_fixtures, PUBLISHERS
+from doc_timing import peak_rss_mb
+
+OUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results')
+TIMEOUT = 1800  # seconds a variant may take before it is stopped and reported as failed
+
+HTML = {'springer', 'mdpi', 'wiley', 'taylor', 'sage', 'asme', 'iop'}
+# (variant name, publisher of its pages)
+VARIANTS = ([(f'{pub}:{engine}', pub) for pub in PUBLISHERS if pub in HTML for engine in ('bs4', 'rules')]
+            + [('mdpi:bs4-full', 'mdpi'), ('wiley:bs4-full', 'wiley'),
+               ('elsevier:extract', 'elsevier'), ('elsevier:extract_all', 'elsevier')]
+            + [(f'tables:{pub}', pub) for pub in PUBLISHERS if pub in HTML])
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def make_parser(variant):
+    """``fn(file_path)`` for one variant; setup work is done here, untimed."""
+    family, _, kind = variant.partition(':')
+    if family == 'elsevier':
+        import elsevier_xml
+        return getattr(elsevier_xml, kind)
+    from batch_runner import load_script
+    from dispatch import SCRIPTS
+    module = load_script(SCRIPTS[family])
+    engine = 'rules' if kind == 'rules' else 'bs4'
+    if kind == 'bs4-full':
+        module.partial_dom = 0
+    return lambda file_path: module.load_doc(file_path, engine)
+
+
+def _table_jobs(files):
+    """``parse_single_table`` is timed on an already built soup, one call per page."""
+    from bs4 import BeautifulSoup
+    from html_table_parse import parse_single_table
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            doc = BeautifulSoup(f, 'lxml')
+        tables = doc.find_all('table')
+        yield lambda: parse_single_table(tables, 'Untitled')
+
+
+def _run_variant(variant, files, queue):
+    if variant.startswith('tables:'):
+        for job in _table_jobs(files[:1]):
+            job()
+        base = peak_rss_mb()
+        timings = []
+        for job in _table_jobs(files):
+            t0 = time.perf_counter()
+            job()
+            timings.append(time.perf_counter() - t0)
+    else:
+        parse = make_parser(variant)
+        for file_path in files:
+            parse(file_path)
+        base = peak_rss_mb()
+        timings = []
+        for file_path in files:
+            t0 = time.perf_counter()
+            parse(file_path)
+            timings.append(time.perf_counter() - t0)
+    queue.put((timings, base, peak_rss_mb()))
+
+
+def run_variant(variant, files, timeout=TIMEOUT):
+    """Run one variant in a fresh process; return its result record. A child
+    that dies (OOM, a crash in lxml) or runs past ``timeout`` gives a record
+    with an 'error' instead."""
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run_variant, args=(variant, files, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None and time.monotonic() < deadline:
+        exited = proc.exitcode is not None  # before the get: a result sent just before exiting is still read
+        try:
+            result = queue.get(timeout=1.0)
+        except Empty:
+            if exited:
+                break
+    if result is None:
+        if proc.exitcode is None:
+            proc.terminate()
+            error = f'no result after {timeout} s'
+        else:
+            error = f'process exited with code {proc.exitcode}'
+        proc.join()
+        return {'variant': variant, 'docs': len(files), 'error': error}
+    proc.join()
+    timings, base, peak = result
+    total = sum(timings)
+    ordered = sorted(timings)
+    mb = sum(os.path.getsize(f) for f in files) / 1e6
+    return {
+        'variant': variant,
+        'docs': len(files),
+        'seconds': round(total, 6),
+        'docs_per_s': round(len(files) / total, 2) if total else None,
+        'mb_per_s': round(mb / total, 3) if total else None,
+        'p50_ms': round(percentile(ordered, 50) * 1e3, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1e3, 3),
+        'base_rss_mb': None if base is None else round(base, 1),
+        'peak_rss_mb': None if peak is None else round(peak, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(docs=50, size='medium', out_path=None):
+    fixtures = os.path.join(OUT_DIR, 'fixtures', size)
+    folders = {pub: os.path.join(fixtures, pub) for pub in PUBLISHERS}
+    if not all(os.path.isdir(d) and len(os.listdir(d)) >= docs for d in folders.values()):
+        write_fixtures(fixtures, docs, size)
+
+    results = []
+    for variant, pub in VARIANTS:
+        files = sorted(os.path.join(folders[pub], f) for f in os.listdir(folders[pub]))[:docs]
+        res = run_variant(variant, files)
+        results.append(res)
+        if 'error' in res:
+            print(f"{variant:22s} FAILED: {res['error']}")
+            continue
+        print(f"{variant:22s} {res['docs_per_s']:8.1f} docs/s  p50 {res['p50_ms']:8.2f} ms  "
+              f"p99 {res['p99_ms']:8.2f} ms  peak RSS {res['peak_rss_mb']} MB")
+
+    report = {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': git_commit(), 'docs': docs, 'size': size,
+                 'python': platform.python_version(), 'platform': platform.platform()},
+        'results': results,
+    }
+    if out_path is None:
+        os.makedirs(OUT_DIR, exist_ok=True)
+        out_path = os.path.join(OUT_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{size}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print('results written to', out_path)
+    return report
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = {r['variant']: r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+    print(f"{'variant':22s} {'docs/s old':>11s} {'new':>9s} {'ratio':>7s} {'p99 old':>9s} {'new':>9s} {'RSS old':>8s} {'new':>7s}")
+    for r in new:
+        o = old.get(r['variant'])
+        if 'error' in r or (o is not None and 'error' in o):
+            print(f"{r['variant']:22s} FAILED: {r.get('error') or 'old run: ' + o['error']}")
+            continue
+        if o is None:
+            print(f"{r['variant']:22s} {'-':>11s} {r['docs_per_s']:9.1f}")
+            continue
+        print(f"{r['variant']:22s} {o['docs_per_s']:11.1f} {r['docs_per_s']:9.1f} {r['docs_per_s'] / o['docs_per_s']:6.2f}x "
+              f"{o['p99_ms']:9.2f} {r['p99_ms']:9.2f} {o['peak_rss_mb'] or 0:8.1f} {r['peak_rss_mb'] or 0:7.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+            sys.argv[2] if len(sys.argv) > 2 else 'medium',
+            sys.argv[3] if len(sys.argv) > 3 else None)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Compare section_tree with the recursive section_struct it replaced.
+
+    python check_section_tree.py [cases]
+
+Random id sequences are built with both implementations. Cases where the
+old code raised (a deeper heading before the only top-level one recursed
+forever) are counted, not compared. It also times both on one long,
+deeply nested section.
+"""
+import sys
+import time
+import random
+
+from section_tree import section_struct, split_section_struct
+
+
+def legacy_section_struct(ids, texts):
+    sec = {'sec_title': '', 'content': []}
+    minid = 100
+    record = []
+    for i in range(len(ids)):
+        if ids[i][0] == 'h':
+            current = int(ids[i][1:])
+            if current < minid:
+                minid = current
+
+    for i in range(len(ids)):
+        if ids[i][0] == 'h' and int(ids[i][1:]) == minid:
+            record.append(i)
+
+    if len(record) <= 1:
+        for i in range(len(ids)):
+            if ids[i][0] == 'h' and int(ids[i][1:]) == minid:
+                sec['sec_title'] = texts[i]
+            elif ids[i][0] == 'h' and int(ids[i][1:]) > minid:
+                tmp = legacy_section_struct(ids[i:], texts[i:])
+                sec['content'].append(tmp['content'])
+                return sec
+            else:
+                sec['content'].append(texts[i])
+        return sec
+    else:
+        for i in range(len(record) - 1):
+            sec['content'].append(legacy_section_struct(ids[record[i]:record[i + 1]], texts[record[i]:record[i + 1]]))
+        sec['content'].append(legacy_section_struct(ids[record[-1]:], texts[record[-1]:]))
+    return sec
+
+
+def legacy_split_section_struct(ids, txts):
+    node = {'sec_title':'', 'content':[]}
+    heads = [int(i[1]) for i in ids if i.startswith('h')] or [7]
+    top   = min(heads)
+    splits= [i for i,x in enumerate(ids) if x.startswith('h') and int(x[1])==top] + [len(ids)]
+    for a, b in zip(splits[:-1], splits[1:]):
+        title = txts[a]
+        sub_id, sub_txt = ids[a+1:b], txts[a+1:b]
+        if any(i.startswith('h') for i in sub_id):
+            node['content'].append(legacy_split_section_struct(sub_id, sub_txt) | {'sec_title': title})
+        else:
+            node['content'].append({'sec_title': title, 'content': sub_txt})
+    return node
+
+
+def random_section(rng, n):
+    ids = []
+    for _ in range(n):
+        if rng.random() < 0.3:
+            ids.append('h%d' % rng.randint(1, 6))
+        else:
+            ids.append(rng.choice(['p', 'p', 'p', 'li', 'eq', 'eq_num']))
+    if ids and rng.random() < 0.7:
+        ids[0] = 'h%d' % rng.randint(1, 3)
+    return ids, ['%s-%d' % (x, i) for i, x in enumerate(ids)]
+
+
+def nested_section(depth, width):
+    ids = []
+    def add(level):
+        ids.append('h%d' % level)
+        ids.extend(['p'] * width)
+        if level < depth:
+            for _ in range(3):
+                add(level + 1)
+    add(1)
+    return ids, ['%s-%d' % (x, i) for i, x in enumerate(ids)]
+
+
+def check(cases=20000, seed=0):
+    rng = random.Random(seed)
+    sys.setrecursionlimit(200)
+    same = raised = 0
+    for _ in range(cases):
+        ids, texts = random_section(rng, rng.randint(0, 40))
+        for new, old in ((section_struct, legacy_section_struct),
+                         (split_section_struct, legacy_split_section_struct)):
+            try:
+                expected = old(ids, texts)
+            except RecursionError:
+                raised += 1
+                continue
+            got = new(ids, texts)
+            if got != expected:
+                print('MISMATCH', new.__name__, ids)
+                print(' old', expected)
+                print(' new', got)
+                return False
+            same += 1
+    sys.setrecursionlimit(1000)
+    print(f'{same} identical, {raised} skipped (old code recursed forever)')
+    return True
+
+
+def bench(depth=6, width=20, repeat=3):
+    ids, texts = nested_section(depth, width)
+    for name, fn in (('legacy', legacy_section_struct), ('section_tree', section_struct),
+                     ('legacy split', legacy_split_section_struct), ('section_tree split', split_section_struct)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn(ids, texts)
+        print(f'{name:20s} {(time.perf_counter() - t0) / repeat * 1000:8.1f} ms  ({len(ids)} items)')
+
+
+if __name__ == '__main__':
+    if check(int(sys.argv[1]) if len(sys.argv) > 1 else 20000):
+        bench()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Score table_classify on labelled synthetic tables.
+
+    python check_table_classify.py [per template]
+
+S-N and e-N tables in the layouts the parsers produce (two-row headers,
+runouts, ``×10^n`` lives, Elsevier label/caption) are mixed with the tables
+they must not be confused with: chemical composition, welding and AM
+process parameters, tensile properties, hardness profiles, geometry, and
+test-condition tables. Prints precision and recall per template, then
+tables/s.
+"""
+import sys
+import time
+import random
+
+from table_classify import classify_table
+
+
+def _life(rng, k):
+    n = 10 ** (4 + k * rng.uniform(0.25, 0.5))
+    return rng.choice([f'{n:.3g}', f'{n / 10 ** int(len(str(int(n))) - 1):.2f}×10^{len(str(int(n))) - 1}', f'{int(n):,}'])
+
+
+def sn_two_row(rng, n):
+    body = [[f'S{k}', f'{300 - k * 15}', f'{150 - k * 8} ± 5', _life(rng, k)] for k in range(n)]
+    return {'title': 'Table 3 Fatigue test results', 'head': [['Specimen', 'Stress (MPa)', 'Stress (MPa)', 'N f'],
+                                                           ['Specimen', 'max', 'amp', 'N f']], 'body': body}
+
+
+def sn_elsevier(rng, n):
+    body = [[f'S{k}', f'{300 - k * 20}', f'{150 - k * 10}', _life(rng, k)] for k in range(n)]
+    return {'label': 'Table 4', 'caption': f'Results {rng.randint(1, 9)}', 'footnotes': [], 'table_footnote': '',
+            'head': [['Specimen', 'Stress', 'Stress', 'N f'], ['Specimen', 'max', 'amp', 'N f']], 'body': body}
+
+
+def sn_runout(rng, n):
+    body = [[f'{400 - k * 20}', _life(rng, k), rng.choice(['Surface', 'Pore', 'Subsurface'])] for k in range(n)]
+    body.append([f'{400 - n * 20}', '>10^7', 'Runout'])
+    return {'title': 'Untitled', 'head': [['σa (MPa)', 'Nf (cycles)', 'Remarks']], 'body': body}
+
+
+def sn_range(rng, n):
+    body = [[f'W{k}', f'{220 - k * 12}', _life(rng, k), rng.choice(['weld toe', 'weld root'])] for k in range(n)]
+    return {'title': 'Table 5', 'head': [['Joint', 'Δσ (MPa)', 'N', 'Failure location']], 'body': body}
+
+
+def en_strain(rng, n):
+    body = [[f'{0.8 - k * 0.06:.2f}', _life(rng, k), f'{420 - k * 10}'] for k in range(n)]
+    return {'title': 'Strain-controlled fatigue data', 'head': [['Δε/2 (%)', '2Nf (reversals)', 'σa (MPa)']], 'body': body}
+
+
+def en_mm(rng, n):
+    body = [[f'{0.008 - k * 0.0005:.4f}', _life(rng, k)] for k in range(n)]
+    return {'label': 'Table 2', 'caption': 'Low-cycle fatigue tests', 'head': [['Strain amplitude (mm/mm)', 'Cycles to failure']],
+            'body': body}
+
+
+def composition(rng, n):
+    els = ['C', 'Si', 'Mn', 'P', 'S', 'Cr', 'Ni', 'Mo', 'Fe']
+    body = [[f'Alloy {k}'] + [f'{rng.uniform(0, 20):.2f}' for _ in els[:-1]] + ['Bal.'] for k in range(n)]
+    return {'title': 'Table 1 Chemical composition (wt.%)', 'head': [['Material'] + els], 'body': body}
+
+
+def composition_bare(rng, n):
+    els = ['C', 'Si', 'Mn', 'Cr', 'Ni']
+    body = [[f'{rng.uniform(0, 20):.3f}' for _ in els] for k in range(n)]
+    return {'label': 'Table 1', 'caption': '', 'head': [els], 'body': body}
+
+
+def welding(rng, n):
+    body = [[f'{k + 1}', f'{rng.randint(120, 260)}', f'{rng.uniform(10, 30):.1f}', f'{rng.uniform(2, 8):.1f}',
+             f'{rng.uniform(0.5, 2):.2f}'] for k in range(n)]
+    return {'title': 'Welding parameters', 'head': [['Pass', 'Current (A)', 'Voltage (V)', 'Travel speed (mm/s)',
+                                                     'Heat input (kJ/mm)']], 'body': body}
+
+
+def am_process(rng, n):
+    body = [[f'{rng.randint(150, 400)}', f'{rng.randint(600, 1400)}', f'{rng.randint(60, 140)}', f'{rng.choice([30, 40, 60])}']
+            for _ in range(n)]
+    return {'title': 'Table 2 Process parameters', 'head': [['Laser power (W)', 'Scan speed (mm/s)', 'Hatch spacing (μm)',
+                                                             'Layer thickness (μm)']], 'body': body}
+
+
+def tensile(rng, n):
+    body = [[f'M{k}', f'{rng.randint(250, 900)}', f'{rng.randint(400, 1200)}', f'{rng.uniform(5, 40):.1f}'] for k in range(n)]
+    return {'title': 'Mechanical properties', 'head': [['Material', 'Yield strength (MPa)', 'Tensile strength (MPa)',
+                                                        'Elongation (%)']], 'body': body}
+
+
+def hardness(rng, n):
+    body = [[f'{k * 0.5:.1f}', f'{rng.randint(180, 320)}'] for k in range(n)]
+    return {'title': 'Untitled', 'head': [['Distance (mm)', 'Hardness (HV)']], 'body': body}
+
+
+def geometry(rng, n):
+    body = [[f'G{k}', f'{rng.choice([4, 6, 8, 10])}', f'{rng.randint(10, 40)}', f'{rng.uniform(1, 3):.2f}'] for k in range(n)]
+    return {'title': 'Specimen dimensions', 'head': [['Specimen', 'Thickness (mm)', 'Width (mm)', 'Kt']], 'body': body}
+
+
+def conditions(rng, n):
+    body = [['Frequency', f'{rng.choice([10, 20, 30])} Hz'], ['Load ratio R', '0.1'], ['Temperature', 'RT'],
+            ['Machine', 'MTS 810'], ['Control', 'Load']]
+    return {'title': 'Fatigue test parameters', 'head': [['Parameter', 'Value']], 'body': body}
+
+
+TEMPLATES = [('S-N', sn_two_row), ('S-N', sn_elsevier), ('S-N', sn_runout), ('S-N', sn_range),
+             ('e-N', en_strain), ('e-N', en_mm),
+             (None, composition), (None, composition_bare), (None, welding), (None, am_process),
+             (None, tensile), (None, hardness), (None, geometry), (None, conditions)]
+
+
+def run(per_template=200):
+    rng = random.Random(0)
+    cases = [(label, fn.__name__, fn(rng, rng.randint(3, 25))) for label, fn in TEMPLATES for _ in range(per_template)]
+    tp = fp = fn_ = 0
+    wrong_kind = 0
+    by_template = {}
+    t0 = time.perf_counter()
+    results = [classify_table(tb)[1] for _, _, tb in cases]
+    elapsed = time.perf_counter() - t0
+    for (label, name, _), kind in zip(cases, results):
+        hit = (kind is not None) == (label is not None)
+        by_template[name] = by_template.get(name, 0) + hit
+        if label and kind:
+            tp += 1
+            wrong_kind += kind != label
+        elif kind:
+            fp += 1
+        elif label:
+            fn_ += 1
+    for name, ok in by_template.items():
+        print(f'{name:18s} {ok / per_template:6.1%} right')
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn_) if tp + fn_ else 0.0
+    print(f'precision {precision:.3f}  recall {recall:.3f}  S-N/e-N mixed up {wrong_kind}  '
+          f'{len(cases) / elapsed:,.0f} tables/s')
+    return precision, recall
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Run the Springer linked-table fetcher against a local HTTP server.
+
+    python check_table_fetch.py [pages] [tables per page] [delay ms]
+
+Writes Springer-like pages whose tables sit behind "pill-button" links to a
+server on 127.0.0.1 that answers with ETag/Last-Modified and honours
+If-None-Match. The tables are parsed four ways and must come out the same:
+one request at a time (no fetcher), with a cold ``TableFetcher`` cache,
+again with a warm cache (every page a 304), and cache-only after the
+server is shut down. Also checks that no more than ``per_host`` requests
+were in flight at once.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from html_table_parse import process_html, parse_table_springer
+from table_fetch import TableFetcher
+
+PER_HOST = 4
+LAST_MODIFIED = formatdate(1700000000, usegmt=True)
+
+
+def table_page(path):
+    n = sum(map(ord, path))
+    rows = ''.join(f'<tr><td>{path} r{r}</td><td>{n * r % 997}</td><td>{r / 7:.3f}</td></tr>' for r in range(12))
+    return (f'<html><body><figure><figcaption>Table for {path}</figcaption>'
+            f'<table><thead><tr><th>Specimen</th><th>N</th><th>S</th></tr></thead>'
+            f'<tbody>{rows}</tbody></table></figure></body></html>').encode('utf-8')
+
+
+class Handler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    counts = {200: 0, 304: 0}
+    delay = 0.02
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            time.sleep(cls.delay)
+            etag = f'"{sum(map(ord, self.path)):x}"'
+            if self.headers.get('If-None-Match') == etag:
+                status, body = 304, b''
+            else:
+                status, body = 200, table_page(self.path)
+            self.send_response(status)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', LAST_MODIFIED)
+            if status == 200:
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with cls.lock:
+                cls.counts[status] += 1
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def write_pages(folder, base, n_pages, n_tables):
+    for i in range(n_pages):
+        boxes = ''.join(f'<div class="c-article-table"><figcaption>Table {t + 1}</figcaption>'
+                        f'<a class="c-article__pill-button" href="/article/10.1007/s{i}/tables/{t + 1}">Full size table</a></div>'
+                        for t in range(n_tables))
+        with open(os.path.join(folder, f'10.1007_s{i}.html'), 'w', encoding='utf-8') as f:
+            f.write(f'<html><head><meta property="og:url" content="{base}/article/10.1007/s{i}">'
+                    f'</head><body><h1>Article {i}</h1>{boxes}</body></html>')
+
+
+def timed(label, fn):
+    t0 = time.perf_counter()
+    res = fn()
+    print(f'{label:24s} {time.perf_counter() - t0:7.2f} s', file=sys.stderr)
+    return res
+
+
+def run(n_pages=20, n_tables=3, delay_ms=20):
+    Handler.delay = delay_ms / 1e3
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    tmp = tempfile.mkdtemp(prefix='prase-fetch-')
+    pages = os.path.join(tmp, 'html')
+    cache = os.path.join(tmp, 'cache')
+    os.makedirs(pages)
+    write_pages(pages, base, n_pages, n_tables)
+    n_links = n_pages * n_tables
+    ok = True
+    try:
+        sync = timed('one at a time', lambda: process_html(pages, parse_table_springer))
+        Handler.peak = 0
+        with TableFetcher(cache, per_host=PER_HOST) as fetcher:
+            cold = timed('fetcher, cold cache', lambda: process_html(pages, parse_table_springer, fetcher))
+            cold_stats = dict(fetcher.stats)
+        with TableFetcher(cache, per_host=PER_HOST) as fetcher:
+            warm = timed('fetcher, warm cache', lambda: process_html(pages, parse_table_springer, fetcher))
+            warm_stats = dict(fetcher.stats)
+        server.shutdown()
+        server.server_close()
+        with TableFetcher(cache, offline=True) as fetcher:
+            offline = timed('cache-only, no server', lambda: process_html(pages, parse_table_springer, fetcher))
+            offline_stats = dict(fetcher.stats)
+
+        checks = [
+            ('tables found', sum(len(v['tables']) for v in sync.values()) == n_links),
+            ('cold == one at a time', cold == sync),
+            ('warm == one at a time', warm == sync),
+            ('cache-only == one at a time', offline == sync),
+            ('cold fetched every link', cold_stats['fetched'] == n_links),
+            ('warm revalidated every link', warm_stats['revalidated'] == n_links),
+            ('cache-only served every link', offline_stats['hit'] == n_links),
+            (f'at most {PER_HOST} requests in flight (saw {Handler.peak})', Handler.peak <= PER_HOST),
+        ]
+        for name, passed in checks:
+            print(f"{'ok  ' if passed else 'FAIL'} {name}")
+            ok &= passed
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return ok
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:]]
+    sys.exit(0 if run(*args) else 1)
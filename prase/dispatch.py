@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Parse a folder that mixes pages from several publishers.
+
+Each HTML file is fingerprinted from its name and first bytes and handed to
+the matching parser script; outputs go to ``<txtpath>/<publisher>/``, laid
+out as that script lays them out (``data.jsonl``, ``json/all_data.jsonl``
+for Springer).
+
+    python dispatch.py F:\\html\\mixed F:\\prase-html\\mixed [--profile N] [--sharded]
+
+``--profile N`` re-runs the N slowest pages under cProfile afterwards and
+writes ``<txtpath>/profile/hotspots.txt`` (see doc_timing.py).
+``--sharded`` packs each publisher's txt/JSON files into
+``<txtpath>/<publisher>/shards/`` (see doc_store.py).
+
+``<txtpath>/dispatch.json`` has the pages per publisher parsed by the last
+run, and every page whose publisher could not be told (or that could not be
+read). Those are not recorded in the manifest, so each run tries them again.
+"""
+import os
+import re
+import sys
+import json
+from collections import Counter
+from functools import partial
+
+from batch_runner import Outputs, list_inputs, load_script, run_batch
+from doc_timing import profile_slowest
+from html_encoding import page_host
+from jsonl_io import jsonl_path
+from manifest import Manifest
+
+SCRIPTS = {
+    'springer': 'html-springer-prase.py',
+    'mdpi': 'html-mdpi-prase.py',
+    'wiley': 'html_parse_wiley.py',
+    'sage': 'html_parse_sage.py',
+    'taylor': 'html_parse_taylorfranics.py',
+    'asme': 'html_parse_asme.py',
+    'iop': 'html_parse_iop.py',
+}
+
+DOI_PREFIX = {
+    '10.1007': 'springer', '10.1038': 'springer', '10.1186': 'springer',
+    '10.3390': 'mdpi',
+    '10.1002': 'wiley', '10.1111': 'wiley',
+    '10.1177': 'sage',
+    '10.1080': 'taylor',
+    '10.1115': 'asme',
+    '10.1088': 'iop',
+}
+
+HOSTS = [
+    ('springer.com', 'springer'), ('nature.com', 'springer'), ('biomedcentral.com', 'springer'),
+    ('mdpi.com', 'mdpi'),
+    ('wiley.com', 'wiley'),
+    ('sagepub.com', 'sage'),
+    ('tandfonline.com', 'taylor'),
+    ('asme.org', 'asme'),
+    ('iop.org', 'iop'),
+]
+
+PUBLISHER_NAMES = [
+    (b'springer', 'springer'), (b'mdpi', 'mdpi'), (b'wiley', 'wiley'), (b'sage', 'sage'),
+    (b'taylor', 'taylor'), (b'american society of mechanical engineers', 'asme'), (b'asme', 'asme'),
+    (b'iop publishing', 'iop'),
+]
+
+# class names that only one publisher's article template uses
+MARKERS = [
+    (b'c-article-title', 'springer'),
+    (b'html-body', 'mdpi'),
+    (b'citation__title', 'wiley'),
+    (b'wd-jnl-art-abstract', 'iop'),
+    (b'hlFld-title', 'taylor'),
+    (b'article-title-main', 'asme'),
+]
+
+CITATION_DOI = re.compile(rb'<meta[^>]+name\s*=\s*["\'](?:citation_doi|dc\.identifier)["\'][^>]*content\s*=\s*["\'](?:doi:|https?://(?:dx\.)?doi\.org/)?(10\.\d+)', re.I)
+CITATION_PUBLISHER = re.compile(rb'<meta[^>]+name\s*=\s*["\'](?:citation_publisher|dc\.publisher)["\'][^>]*content\s*=\s*["\']([^"\']+)', re.I)
+
+HEAD = 16384       # enough for <head> metadata on most pages
+BODY = 262144      # how far to look for marker classes when the head is not conclusive
+
+
+def _from_host(host):
+    host = (host or '').lower()
+    for suffix, pub in HOSTS:
+        if host == suffix or host.endswith('.' + suffix):
+            return pub
+    return None
+
+
+def fingerprint(file, head):
+    """Publisher key for a page, or None if it cannot be told."""
+    pub = DOI_PREFIX.get(file.split('_', 1)[0])
+    if pub:
+        return pub
+    m = CITATION_DOI.search(head)
+    if m and m.group(1).decode() in DOI_PREFIX:
+        return DOI_PREFIX[m.group(1).decode()]
+    pub = _from_host(page_host(head))
+    if pub:
+        return pub
+    m = CITATION_PUBLISHER.search(head)
+    if m:
+        name = m.group(1).lower()
+        for key, pub in PUBLISHER_NAMES:
+            if key in name:
+                return pub
+    for marker, pub in MARKERS:
+        if marker in head:
+            return pub
+    return None
+
+
+def detect(file_path, data=None):
+    if data is not None:
+        pub = fingerprint(os.path.basename(file_path), data[:HEAD])
+        if pub is None and len(data) > HEAD:
+            pub = fingerprint(os.path.basename(file_path), data[:BODY])
+        return pub
+    with open(file_path, 'rb') as f:
+        head = f.read(HEAD)
+        pub = fingerprint(os.path.basename(file_path), head)
+        if pub is None and len(head) == HEAD:
+            pub = fingerprint(os.path.basename(file_path), head + f.read(BODY - HEAD))
+    return pub
+
+
+def jsonl_file(txtpath, pub, compress=None):
+    # where the publisher's own script puts it: json/all_data.jsonl for Springer
+    if pub == 'springer':
+        return jsonl_path(os.path.join(txtpath, pub, 'json'), compress, 'all_data')
+    return jsonl_path(os.path.join(txtpath, pub), compress)
+
+
+def _note_names(members, names):
+    # an archive is streamed: keep the name of every member that goes by
+    for member in members:
+        names.add(member.name)
+        yield member
+
+
+def dispatch_file(path, txtpath, file, data=None, sharded=0):
+    try:
+        pub = detect(os.path.join(path, file), data)
+    except OSError as e:
+        return f'{file} READ ERROR: {e}\n', file, None, None, None, None
+    if pub is None:
+        return f'{file} UNKNOWN PUBLISHER\n', file, None, None, None, None
+
+    module = load_script(SCRIPTS[pub])
+    module.sharded = sharded
+    out = os.path.join(txtpath, pub)
+    if pub == 'springer':
+        timer, doi, line, packed = module.process_file(path, out, os.path.join(out, 'json'), file, data)
+    else:
+        timer, doi, line, packed = module.process_file(path, out, file, data)
+    timer.publisher = pub
+    return timer, file, pub, doi, line, packed
+
+
+def run(path, txtpath, incremental=1, compress=None, profile=0, sharded=0):
+    for pub in SCRIPTS:
+        os.makedirs(os.path.join(txtpath, pub), exist_ok=True)
+    os.makedirs(os.path.join(txtpath, 'springer', 'json'), exist_ok=True)
+    logpath = os.path.join(txtpath, 'parse.log')
+
+    counts = Counter()
+    unknown = []
+    handled = set()
+    outputs = {pub: Outputs(os.path.join(txtpath, pub), jsonl_file(txtpath, pub, compress), append=incremental)
+               for pub in SCRIPTS}
+    version = '-'.join(str(getattr(load_script(s), 'PARSER_VERSION', 1)) for s in SCRIPTS.values())
+    manifest = Manifest(os.path.join(txtpath, 'manifest.sqlite'), 'dispatch.py', version,
+                        outputs.values()) if incremental else None
+
+    inputs = list_inputs(path)
+    listed = set()  # every input name, archive members included
+    if isinstance(inputs, list):
+        listed.update(inputs)
+    else:
+        inputs = _note_names(inputs, listed)
+
+    work = partial(dispatch_file, path, txtpath, sharded=sharded)
+    for timer, file, pub, doi, line, packed in run_batch(work, inputs, logpath, manifest=manifest, path=path):
+        handled.add(file)
+        if pub is None:
+            counts['unknown'] += 1
+            unknown.append(file)
+            continue
+        counts[pub] += 1
+        outputs[pub].put(timer, line, packed)
+    for out in outputs.values():
+        out.close()
+    if manifest is not None:
+        manifest.close()
+    if profile:
+        profile_slowest(logpath, profile, work, os.path.join(txtpath, 'profile'), path)
+
+    # unknown pages are never recorded, so an incremental run sees them again; keep any
+    # earlier ones it did not hand out if they are still in the folder or archive
+    report = os.path.join(txtpath, 'dispatch.json')
+    if incremental and os.path.exists(report):
+        with open(report, encoding='utf-8') as jf:
+            previous = json.load(jf).get('unknown', [])
+        unknown += [f for f in previous if f not in handled and f in listed]
+        if unknown:
+            counts['unknown'] = len(unknown)
+    with open(report, 'w', encoding='utf-8') as jf:
+        json.dump({'counts': counts, 'unknown': unknown}, jf, ensure_ascii=False, indent=2)
+    for pub, n in counts.most_common():
+        print(f'{pub:10s} {n}')
+    if unknown:
+        print(f'{len(unknown)} pages with unknown publisher, see dispatch.json')
+    return counts, unknown
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    n_profile = 0
+    if '--profile' in args:
+        i = args.index('--profile')
+        n_profile = int(args[i + 1])
+        del args[i:i + 2]
+    sharded = 0
+    if '--sharded' in args:
+        args.remove('--sharded')
+        sharded = 1
+    run(args[0], args[1], profile=n_profile, sharded=sharded)
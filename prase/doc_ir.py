@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Compact in-memory form of a parsed document.
+
+The parsers produce ``ids``/``texts`` as lists of lists, one small str per
+tag and per paragraph. ``DocIR`` keeps the same information in a few flat
+buffers. Tags are one-byte codes in an ``array('B')``. All paragraph texts
+are joined into one str, with their end offsets in an ``array('I')``, and
+each section is a ``Section`` record holding an item range. Workers return
+a ``DocIR`` instead of the nested doc dict, so the pool pickles a handful
+of buffers per document. The txt, JSON and Parquet writers read from it.
+"""
+from array import array
+
+from section_tree import section_tree
+
+TAGS = ('p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'eq', 'eq_num',
+        'li', 'ol', 'ul', 'div', 'span', 'table', 'figure')
+CODE = {tag: i for i, tag in enumerate(TAGS)}
+OTHER = 255  # tag not in TAGS, its name is kept in DocIR.other
+LEVEL = bytes(int(tag[1]) if tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6') else 0
+              for tag in TAGS) + bytes(256 - len(TAGS))
+
+
+class Section:
+    __slots__ = ('start', 'stop')
+
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+
+class DocIR:
+    __slots__ = ('title', 'abstract', 'keywords', 'path', 'file', 'doi',
+                 'split', 'tags', 'ends', 'text', 'sections', 'other')
+
+    def __init__(self, title='', abstract='', keywords=(), path='', file='', doi='', split=False):
+        self.title = title
+        self.abstract = abstract
+        self.keywords = list(keywords)
+        self.path = path
+        self.file = file
+        self.doi = doi
+        self.split = split      # section tree layout of ASME/IOP
+        self.tags = array('B')
+        self.ends = array('I')
+        self.text = ''
+        self.sections = []
+        self.other = None       # {item index: tag name} for OTHER codes
+
+    @classmethod
+    def from_lists(cls, title, abstract, keywords, ids, texts, path='', file='', doi='', split=False):
+        doc = cls(title, abstract, keywords, path, file, doi, split)
+        tags, ends = doc.tags, doc.ends
+        chunks = []
+        end = 0
+        for sec_ids, sec_texts in zip(ids, texts):
+            start = len(tags)
+            for tag, text in zip(sec_ids, sec_texts):
+                code = CODE.get(tag, OTHER)
+                if code == OTHER:
+                    if doc.other is None:
+                        doc.other = {}
+                    doc.other[len(tags)] = tag
+                tags.append(code)
+                end += len(text)
+                ends.append(end)
+                chunks.append(text)
+            doc.sections.append(Section(start, len(tags)))
+        doc.text = ''.join(chunks)
+        return doc
+
+    def tag(self, i):
+        code = self.tags[i]
+        return self.other[i] if code == OTHER else TAGS[code]
+
+    def item_text(self, i):
+        return self.text[self.ends[i - 1] if i else 0:self.ends[i]]
+
+    def items(self, sec=None):
+        """``(tag, text)`` for the items of section ``sec``, or of all sections."""
+        lo, hi = (0, len(self.tags)) if sec is None else (sec.start, sec.stop)
+        for i in range(lo, hi):
+            yield self.tag(i), self.item_text(i)
+
+    def section_texts(self, sec):
+        return [self.item_text(i) for i in range(sec.start, sec.stop)]
+
+    def section_struct(self, sec):
+        levels = [LEVEL[c] for c in self.tags[sec.start:sec.stop]]
+        return section_tree(levels, self.section_texts(sec), self.split)
+
+    def to_lists(self):
+        """The ``ids``/``texts`` lists of lists this IR was built from."""
+        ids, texts = [], []
+        for sec in self.sections:
+            ids.append([self.tag(i) for i in range(sec.start, sec.stop)])
+            texts.append(self.section_texts(sec))
+        return ids, texts
+
+    def to_dict(self):
+        """The dict ``doc_struct`` builds, as written to data.jsonl."""
+        return {
+            'title': self.title,
+            'abstract': self.abstract,
+            'keywords': self.keywords,
+            'path': self.path,
+            'file': self.file,
+            'doi': self.doi,
+            'content': [self.section_struct(sec) for sec in self.sections],
+        }
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Pack the per-document output files into a few large shards.
+
+    python doc_store.py <store> ls [pattern]
+    python doc_store.py <store> cat <name>
+    python doc_store.py <store> export <out dir> [pattern]
+
+With ``sharded = 1`` a parser does not create one ``.txt`` (and, for
+Springer and Elsevier XML, one ``.json``) per document. Each of those files
+is compressed on its own and appended to ``<output>/shards/shard-NNNNN.dat``,
+and a new shard is started once the current one reaches ``shard_mb``. The
+file's name relative to the output folder (``10.1007_s1.txt``,
+``json/10.1007_s1.json``) maps to its shard, offset and length in
+``index.sqlite``, so a single document is one index lookup and one read.
+A rerun appends, and the index then points at the newest copy.
+
+``export`` writes the files back out exactly as the parser would have
+written them, all of them or those matching a glob ``pattern``.
+"""
+import io
+import os
+import sys
+import zlib
+import sqlite3
+import fnmatch
+
+SHARD = 'shard-{:05d}.dat'
+
+
+def _compressor(codec):
+    if codec == 'zlib':
+        return lambda b: zlib.compress(b, 6)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress
+    if codec is None:
+        return bytes
+    raise ValueError(f'unknown compression {codec!r}')
+
+
+def _decompress(codec, blob):
+    if codec == 'zlib':
+        return zlib.decompress(blob)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return blob
+
+
+def _open_index(folder):
+    db = sqlite3.connect(os.path.join(folder, 'index.sqlite'))
+    db.execute('''CREATE TABLE IF NOT EXISTS docs (
+        name TEXT PRIMARY KEY, shard INTEGER, offset INTEGER, length INTEGER, codec TEXT)''')
+    return db
+
+
+class ShardWriter:
+    """Append named text files to size-bounded shards under ``folder``.
+
+    Without ``append`` an existing store in ``folder`` is emptied first.
+    """
+
+    def __init__(self, folder, shard_mb=256, compress='zlib', append=False):
+        os.makedirs(folder, exist_ok=True)
+        if not append:
+            for name in os.listdir(folder):
+                if name.startswith('shard-') or name == 'index.sqlite':
+                    os.remove(os.path.join(folder, name))
+        self.folder = folder
+        self.limit = shard_mb * 2**20
+        self.codec = compress
+        self.compress = _compressor(compress)
+        self.db = _open_index(folder)
+        shards = sorted(n for n in os.listdir(folder) if n.startswith('shard-'))
+        self.shard = int(shards[-1][6:11]) if shards else 0
+        self.f = open(os.path.join(folder, SHARD.format(self.shard)), 'ab')
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, name, text):
+        blob = self.compress(text.encode('utf-8'))
+        if self.f.tell() and self.f.tell() + len(blob) > self.limit:
+            self.f.close()
+            self.shard += 1
+            self.f = open(os.path.join(self.folder, SHARD.format(self.shard)), 'ab')
+        offset = self.f.tell()
+        self.f.write(blob)
+        self.db.execute('INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)',
+                        (name.replace(os.sep, '/'), self.shard, offset, len(blob), self.codec))
+        self._pending += 1
+        if self._pending >= 500:
+            self.flush()
+
+    def flush(self):
+        # the index never points past what is on disk
+        self.f.flush()
+        self.db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.f.close()
+        self.db.commit()
+        self.db.close()
+
+
+class ShardReader:
+    def __init__(self, folder):
+        self.folder = folder
+        self.db = _open_index(folder)
+        self._files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def names(self, pattern=None):
+        names = (r[0] for r in self.db.execute('SELECT name FROM docs ORDER BY shard, offset'))
+        return [n for n in names if pattern is None or fnmatch.fnmatch(n, pattern)]
+
+    def get(self, name):
+        """The file's text, or None if the store does not have it."""
+        row = self.db.execute('SELECT shard, offset, length, codec FROM docs WHERE name = ?',
+                              (name.replace(os.sep, '/'),)).fetchone()
+        if row is None:
+            return None
+        shard, offset, length, codec = row
+        f = self._files.get(shard)
+        if f is None:
+            f = self._files[shard] = open(os.path.join(self.folder, SHARD.format(shard)), 'rb')
+        f.seek(offset)
+        return _decompress(codec, f.read(length)).decode('utf-8')
+
+    def export(self, out_dir, pattern=None):
+        """Write the files (those matching ``pattern``) under ``out_dir``."""
+        names = self.names(pattern)
+        for name in names:
+            out_path = os.path.join(out_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(self.get(name))
+        return len(names)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self.db.close()
+
+
+class _PackedFile(io.StringIO):
+    def __init__(self, name, packed):
+        super().__init__()
+        self.name = name
+        self.packed = packed
+
+    def close(self):
+        if not self.closed:
+            self.packed.append((self.name, self.getvalue()))
+        super().close()
+
+
+def open_output(folder, name, packed=None):
+    """``open(os.path.join(folder, name), 'w', encoding='utf-8')``, or, when
+    ``packed`` is a list, a text buffer that adds ``(name, text)`` to it on
+    close. Workers use it to hand their files to the main process, which
+    owns the ``ShardWriter``."""
+    if packed is None:
+        return open(os.path.join(folder, name), 'w', encoding='utf-8')
+    return _PackedFile(name, packed)
+
+
+if __name__ == '__main__':
+    store, cmd, *args = sys.argv[1:]
+    with ShardReader(store) as reader:
+        if cmd == 'ls':
+            for name in reader.names(args[0] if args else None):
+                print(name)
+        elif cmd == 'cat':
+            text = reader.get(args[0])
+            if text is None:
+                sys.exit(f'{args[0]} is not in {store}')
+            sys.stdout.write(text)
+        elif cmd == 'export':
+            n = reader.export(args[0], args[1] if len(args) > 1 else None)
+            print(f'{n} files written to {args[0]}')
+        else:
+            sys.exit(f'unknown command {cmd!r}: ls, cat or export')
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""Per-document stage timings for parse.log, and cProfile of the slowest pages.
+
+    python doc_timing.py <parse.log> [top]
+
+Workers fill one ``DocTimer`` per page. ``mark(stage)`` adds the time
+since the previous mark to that stage. The stages are read (bytes off
+disk), decode, dom (BeautifulSoup or lxml tree), extract (title, abstract,
+keywords, sections), ir (``DocIR``), tree (``section_struct``, via
+``DocIR.to_dict``) and write (txt/JSON/JSONL). Appending the JSONL line
+and the shard entries happens in the main process, which adds that time to
+write before ``run_batch`` writes the line. Each line also carries the input size and the worker's
+peak RSS so far: a page that pushes it up shows where memory goes.
+
+Run on a log, this module prints stage totals per publisher and the
+slowest pages. ``profile_slowest`` runs the N slowest pages again under
+cProfile and writes a hotspot report.
+"""
+import os
+import sys
+import time
+from collections import defaultdict
+
+STAGES = ('read', 'decode', 'dom', 'extract', 'ir', 'tree', 'write')
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, None where unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+class DocTimer:
+    __slots__ = ('file', 'publisher', 'times', 'size', 'rss', 'error', '_t')
+
+    def __init__(self, file, publisher=None):
+        self.file = file
+        self.publisher = publisher
+        self.times = {}
+        self.size = None
+        self.rss = None
+        self.error = None
+        self._t = time.perf_counter()
+
+    def start(self):
+        """Restart the clock, e.g. once the record reaches the main process."""
+        self._t = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.times[stage] = self.times.get(stage, 0.0) + now - self._t
+        self._t = now
+
+    def finish(self):
+        self.rss = peak_rss_mb()
+
+    def total(self):
+        return sum(self.times.values())
+
+    def __str__(self):
+        fields = [f'total={self.total() * 1e3:.2f}ms']
+        fields += [f'{s}={self.times[s] * 1e3:.2f}ms' for s in STAGES if s in self.times]
+        if self.size is not None:
+            fields.append(f'bytes={self.size}')
+        if self.rss is not None:
+            fields.append(f'rss={self.rss:.1f}MB')
+        line = ('' if self.publisher is None else f'[{self.publisher}] ') + f'{self.file}\t' + ' '.join(fields)
+        if self.error is not None:
+            line += f'\tPARSE ERROR: {self.error}'
+        return line + '\n'
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+class _NoTimer:
+    size = None
+
+    def mark(self, stage):
+        pass
+
+
+NO_TIMER = _NoTimer()
+
+
+def read_text(file_path, errors='strict', timer=NO_TIMER, data=None):
+    """What ``open(file_path, encoding='utf-8', errors=errors).read()`` gives,
+    with reading and decoding timed apart. ``data`` is the file's bytes when
+    they were already read (from an archive)."""
+    if data is not None:
+        raw = data
+    else:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    timer.size = len(raw)
+    timer.mark('read')
+    text = raw.decode('utf-8', errors)
+    if '\r' in text:
+        # text mode translates newlines
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    timer.mark('decode')
+    return text
+
+
+def parse_log(logpath):
+    """One dict per timed line of a parse.log: file, publisher, stage
+    seconds, total, bytes, rss and error."""
+    with open(logpath, encoding='utf-8') as f:
+        for line in f:
+            head, sep, rest = line.rstrip('\n').partition('\t')
+            if not sep:
+                continue
+            publisher = None
+            if head.startswith('[') and '] ' in head:
+                publisher, head = head[1:].split('] ', 1)
+            fields, _, error = rest.partition('\tPARSE ERROR: ')
+            rec = {'file': head, 'publisher': publisher, 'times': {}, 'error': error or None,
+                   'bytes': None, 'rss': None}
+            for field in fields.split():
+                key, _, value = field.partition('=')
+                if key == 'bytes':
+                    rec['bytes'] = int(value)
+                elif key == 'rss':
+                    rec['rss'] = float(value[:-2])
+                elif key == 'total':
+                    rec['total'] = float(value[:-2]) / 1e3
+                else:
+                    rec['times'][key] = float(value[:-2]) / 1e3
+            yield rec
+
+
+def report(logpath, top=20, out=sys.stdout):
+    recs = list(parse_log(logpath))
+    by_pub = defaultdict(lambda: defaultdict(float))
+    count = defaultdict(int)
+    for rec in recs:
+        pub = rec['publisher'] or '-'
+        count[pub] += 1
+        by_pub[pub]['total'] += rec['total']
+        for stage, sec in rec['times'].items():
+            by_pub[pub][stage] += sec
+    wall = sum(t['total'] for t in by_pub.values()) or 1.0
+
+    out.write(f"{'publisher':10s} {'docs':>6s} {'share':>6s} {'total s':>9s}" +
+              ''.join(f' {s:>8s}' for s in STAGES) + '\n')
+    for pub, t in sorted(by_pub.items(), key=lambda kv: -kv[1]['total']):
+        out.write(f"{pub:10s} {count[pub]:6d} {t['total'] / wall:6.1%} {t['total']:9.2f}" +
+                  ''.join(f' {t.get(s, 0.0):8.2f}' for s in STAGES) + '\n')
+
+    out.write(f'\nslowest {top} pages\n')
+    for rec in sorted(recs, key=lambda r: -r['total'])[:top]:
+        stage = max(rec['times'], key=rec['times'].get) if rec['times'] else '-'
+        out.write(f"{rec['total'] * 1e3:9.1f} ms  {rec['publisher'] or '-':9s} {rec['file']}  "
+                  f"(mostly {stage}, {rec['bytes'] or 0} bytes{', PARSE ERROR' if rec['error'] else ''})\n")
+    return recs
+
+
+def profile_slowest(logpath, n, work, out_dir, path=None, top=30):
+    """Run ``work(file)`` again under cProfile for the ``n`` slowest pages of
+    ``logpath``. Writes one ``.prof`` per page and ``hotspots.txt`` with the
+    top functions of each page and of all of them together. When the input
+    ``path`` is an archive the pages are read back out of it and handed to
+    ``work(file, data)``."""
+    import cProfile
+    import pstats
+    from batch_runner import list_inputs
+
+    recs = sorted(parse_log(logpath), key=lambda r: -r['total'])[:n]
+    args = {rec['file']: () for rec in recs}
+    inputs = list_inputs(path) if path is not None else []
+    if not isinstance(inputs, list):
+        for member in inputs:
+            if member.name in args:
+                args[member.name] = (member.data,)
+    os.makedirs(out_dir, exist_ok=True)
+    combined = None
+    with open(os.path.join(out_dir, 'hotspots.txt'), 'w', encoding='utf-8') as out:
+        for rec in recs:
+            prof = cProfile.Profile()
+            prof.runcall(work, rec['file'], *args[rec['file']])
+            prof.dump_stats(os.path.join(out_dir, rec['file'] + '.prof'))
+            out.write(f"==== {rec['file']} [{rec['publisher'] or '-'}] {rec['total'] * 1e3:.1f} ms in the batch\n")
+            pstats.Stats(prof, stream=out).sort_stats('cumulative').print_stats(top)
+            if combined is None:
+                combined = pstats.Stats(prof, stream=out)
+            else:
+                combined.add(prof)
+        if combined is not None:
+            out.write(f'==== all {len(recs)} pages, by own time\n')
+            combined.sort_stats('tottime').print_stats(top)
+    print(f'profiles of {len(recs)} pages written to {out_dir}')
+
+
+if __name__ == '__main__':
+    report(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 20)
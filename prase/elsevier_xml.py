@@ -0,0 +1,272 @@
+import re
+import xml.etree.ElementTree as ET
+
+ns = {
+    'dcterms': 'http://purl.org/dc/terms/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'ce': 'http://www.elsevier.com/xml/common/dtd',
+    'xocs': 'http://www.elsevier.com/xml/xocs/dtd',
+    'cals': 'http://www.elsevier.com/xml/common/cals/dtd',
+    'mml': 'http://www.w3.org/1998/Math/MathML',
+}
+
+TITLE = '{%s}title' % ns['dc']
+DESCRIPTION = '{%s}description' % ns['dc']
+SUBJECT = '{%s}subject' % ns['dcterms']
+RAWTEXT = '{%s}rawtext' % ns['xocs']
+SECTION = '{%s}section' % ns['ce']
+TABLE = '{%s}table' % ns['ce']
+
+LABEL = '{%s}label' % ns['ce']
+CAPTION = '{%s}caption' % ns['ce']
+SIMPLE_PARA = '{%s}simple-para' % ns['ce']
+FOOTNOTE = '{%s}footnote' % ns['ce']
+TABLE_FOOTNOTE = '{%s}table-footnote' % ns['ce']
+ENTRY = '{%s}entry' % ns['ce']
+TGROUP = '{%s}tgroup' % ns['cals']
+COLSPEC = '{%s}colspec' % ns['cals']
+THEAD = '{%s}thead' % ns['cals']
+TBODY = '{%s}tbody' % ns['cals']
+ROW = '{%s}row' % ns['cals']
+MATH = '{%s}math' % ns['mml']
+
+
+def clean_text(text):
+    text = re.sub(r'\n\s*\n', '\n', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+    return text.strip()
+
+
+def extract_full_text(entry):
+    texts = []
+    if entry.text:
+        texts.append(entry.text.strip())
+    for child in entry.iter():
+        if child is not entry and child.text:
+            texts.append(child.text.strip())
+    return ' '.join(texts)
+
+
+def extract_math_text(entry):
+    texts = []
+    for child in entry.iter():
+        if child.tag.endswith('mi') or child.tag.endswith('mn') or child.tag.endswith('mo') or child.tag.endswith('msup') or child.tag.endswith('msub'):
+            if child.text:
+                texts.append(child.text.strip())
+    return ' '.join(texts)
+
+
+def _cals_rows(block, colnames, body):
+    """Expand the rows of a CALS thead/tbody into a rectangular grid.
+
+    ``namest``/``nameend`` spans are repeated across the columns they cover
+    and ``morerows`` spans down the following rows, the same way
+    ``html_table_parse`` fills ``colspan``/``rowspan``.
+    """
+    grid = []
+    pending = {}  # column -> [rows still covered, text]
+    for row in block.findall(ROW):
+        cells = {}
+        for c, (left, text) in list(pending.items()):
+            cells[c] = text
+            if left == 1:
+                del pending[c]
+            else:
+                pending[c] = [left - 1, text]
+
+        c = 0
+        for entry in row.findall(ENTRY):
+            if body and entry.find('.//' + MATH) is not None:
+                text = extract_math_text(entry)
+            else:
+                text = extract_full_text(entry)
+
+            start = entry.get('colname') or entry.get('namest')
+            if start in colnames:
+                c = colnames[start]
+            else:
+                while c in cells:
+                    c += 1
+            end = max(colnames.get(entry.get('nameend'), c), c)
+
+            more = int(entry.get('morerows', 0) or 0)
+            for k in range(c, end + 1):
+                cells[k] = text
+                if more > 0:
+                    pending[k] = [more, text]
+            c = end + 1
+        grid.append(cells)
+
+    width = max((max(r) + 1 for r in grid if r), default=0)
+    return [[r.get(c, '') for c in range(width)] for r in grid]
+
+
+def parse_cals_table(table):
+    """Turn one ``ce:table`` into a dict, walking its subtree only once."""
+    label = caption = thead = tbody = tgroup = table_footnote = None
+    footnotes = []
+    colnames = {}
+    for el in table.iter():
+        tag = el.tag
+        if tag == LABEL:
+            if label is None:
+                label = el
+        elif tag == CAPTION:
+            if caption is None:
+                caption = el
+        elif tag == FOOTNOTE:
+            footnotes.append(extract_full_text(el))
+        elif tag == TABLE_FOOTNOTE:
+            if table_footnote is None:
+                table_footnote = el
+        elif tag == TGROUP:
+            if tgroup is None:
+                tgroup = el
+        elif tag == COLSPEC:
+            name = el.get('colname')
+            if name is not None and name not in colnames:
+                colnum = el.get('colnum')
+                colnames[name] = int(colnum) - 1 if colnum else len(colnames)
+        elif tag == THEAD:
+            if thead is None:
+                thead = el
+        elif tag == TBODY:
+            if tbody is None:
+                tbody = el
+
+    caption_text = ''
+    if caption is not None:
+        simple_para = caption.find('.//' + SIMPLE_PARA)
+        if simple_para is not None:
+            caption_text = extract_full_text(simple_para)
+
+    head = _cals_rows(thead, colnames, False) if thead is not None else []
+    body = _cals_rows(tbody, colnames, True) if tbody is not None else []
+    width = int(tgroup.get('cols', 0) or 0) if tgroup is not None else 0
+    width = max([width] + [len(r) for r in head + body])
+    for r in head + body:
+        r.extend([''] * (width - len(r)))
+
+    return {
+        'label': extract_full_text(label) if label is not None else '',
+        'caption': caption_text,
+        'footnotes': footnotes,
+        'table_footnote': extract_full_text(table_footnote) if table_footnote is not None else '',
+        'head': head,
+        'body': body,
+    }
+
+
+def table_lines(tb):
+    """The text block ``xml-table-prase.py`` writes for one table."""
+    lines = ['Footnote: ' + note for note in tb['footnotes']]
+    if tb['table_footnote']:
+        lines.append('Table footnotes: ' + tb['table_footnote'])
+    if tb['caption']:
+        lines.append(f"{tb['label']} : {tb['caption']}")
+    for row in tb['head']:
+        lines.append('Header row: ' + ' | '.join(row))
+    for row in tb['body']:
+        lines.append('Data row: ' + ' | '.join(row))
+    lines.append('')
+    return lines
+
+
+def _scan(source, metadata_only, want_tables, want_text=True):
+    title = None
+    abstract = None
+    keywords = []
+    rawtext = None
+    raw_seen = False
+    sections = []         # filled in document order, like findall('.//ce:section')
+    open_sections = []
+    tables = []
+
+    stack = []            # open elements, to know the parent of the abstract
+    in_section = 0
+    in_table = 0
+    stop_at = None        # element whose end finishes a metadata-only read
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(elem)
+            if elem.tag == SECTION:
+                in_section += 1
+                open_sections.append(len(sections))
+                sections.append(None)
+            elif elem.tag == TABLE:
+                in_table += 1
+            continue
+
+        stack.pop()
+        tag = elem.tag
+        if tag == TITLE:
+            if title is None:
+                title = elem.text or ''
+        elif tag == DESCRIPTION:
+            if abstract is None:
+                abstract = clean_text(elem.text) if elem.text is not None else ''
+                if metadata_only:
+                    stop_at = stack[-1] if stack else elem
+        elif tag == SUBJECT:
+            if elem.text is not None:
+                keywords.append(elem.text)
+        elif tag == RAWTEXT:
+            if not raw_seen:
+                raw_seen = True
+                if elem.text is not None:
+                    rawtext = clean_text(elem.text)
+        elif tag == SECTION:
+            in_section -= 1
+            slot = open_sections.pop()
+            if want_text and rawtext is None:
+                section_text = ''.join(elem.itertext())
+                if section_text:
+                    sections[slot] = clean_text(section_text)
+        elif tag == TABLE:
+            in_table -= 1
+            if want_tables:
+                tables.append(parse_cals_table(elem))
+
+        if elem is stop_at:
+            break
+        if not in_section and not in_table:
+            elem.clear()
+            # and drop it from its parent, or the emptied shells pile up. Earlier
+            # siblings went the same way, so it is the first child; later ones may
+            # already be attached, since the parser reads ahead of the events
+            if stack and len(stack[-1]) and stack[-1][0] is elem:
+                del stack[-1][0]
+
+    if metadata_only:
+        body_content = ''
+    elif rawtext is not None:
+        body_content = rawtext
+    else:
+        sections = [t for t in sections if t is not None]
+        body_content = '\n\n'.join(sections) if sections else 'No body content found'
+
+    return title or '', abstract or '', keywords, body_content, tables
+
+
+def extract(source, metadata_only=False):
+    """Read one Elsevier full-text XML in a single streaming pass.
+
+    Returns ``(title, abstract, keywords, body_content)`` with the same values
+    the tree-based ``xml-prase.py`` produced. Elements are cleared and
+    detached from their parent as soon as they are finished, except inside
+    ``ce:section``/``ce:table`` where the enclosing element still needs them,
+    so memory stays flat however long the document is. With ``metadata_only``
+    the parse stops once the element holding the abstract is closed, so the
+    body is never read; ``body_content`` is then ``''``.
+    """
+    return _scan(source, metadata_only, False)[:4]
+
+
+def extract_all(source):
+    """``extract`` plus the parsed ``ce:table`` list, from the same pass."""
+    return _scan(source, False, True)
+
+
+def extract_tables(source):
+    return _scan(source, False, True, want_text=False)[4]
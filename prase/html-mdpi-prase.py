@@ -4,7 +4,24 @@ from bs4 import BeautifulSoup
 import os
 import json
 from openpyxl import load_workbook, Workbook
-import chardet
+
+from batch_runner import main
+from partial_parse import parse_regions
+from html_encoding import resolve_encoding, page_host
+from doc_ir import DocIR
+from doc_timing import DocTimer, NO_TIMER
+from doc_store import open_output
+import publisher_rules
+
+PARSER_VERSION = 1  # bump when the parsing logic changes, forces a full rerun
+incremental = 1  # Set to 1 to skip inputs unchanged since the last run
+partial_dom = 1  # Set to 1 to build the DOM only for title/abstract/keywords/body
+engine = 'bs4'  # 'bs4' or 'rules' (publisher_rules.py: lxml + precompiled XPath, same output)
+profile = 0  # >0: re-run the N slowest pages under cProfile after the batch (see doc_timing.py)
+sharded = 0  # 1: pack the per-document txt files into compressed shards (doc_store.py)
+
+REGIONS = ['hypothesis_container', 'art-abstract', 'art-keywords', 'html-body']
+REQUIRED = [['hypothesis_container'], ['art-abstract'], ['html-body']]
 
 
 def ifskip(string):
@@ -130,96 +147,89 @@ def parse_doc(doc):
     return title, abstract, keywords, idlst, textlst
 
 
-def section_struct(ids, texts):
-    sec = {'sec_title': '', 'content': []}
-    minid = 100
-    record = []
-
-    # Get the minimum id of paragraph
-    for i in range(0, len(ids)):
-        if ids[i][0] == 'h':
-            current = int(ids[i][1:])
-            if current < minid:
-                minid = current
-
-    for i in range(0, len(ids)):
-        if ids[i][0] == 'h':
-            current = int(ids[i][1:])
-            if current == minid:
-                record.append(i)
-
-    if len(record) <= 1:
-        for i in range(0, len(ids)):
-            if (ids[i][0] == 'h') and (int(ids[i][1:]) == minid):
-                sec['sec_title'] = texts[i]
-            elif (ids[i][0] == 'h') and (int(ids[i][1:]) > minid):
-                tmp = section_struct(ids[i:], texts[i:])
-                sec['content'].append(tmp['content'])
-                return sec
-            else:
-                sec['content'].append(texts[i])
-        return sec
+def detect_encoding(file_path, raw=None):
+    if raw is None:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    # the input directory stands in for the host when the page has no og:url
+    return resolve_encoding(raw, host=page_host(raw) or os.path.dirname(file_path))
+
+
+def read_html_file(file_path, timer=NO_TIMER, data=None):
+    """Raw bytes (``data`` if already read) and their encoding."""
+    if data is not None:
+        raw = data
+    else:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+    timer.size = len(raw)
+    timer.mark('read')
+    encoding = detect_encoding(file_path, raw)
+    timer.mark('decode')
+    return raw, encoding
+
+
+def parse_html_file(file_path, partial=None, timer=NO_TIMER, data=None):
+    if partial is None:
+        partial = partial_dom
+    raw, encoding = read_html_file(file_path, timer, data)
+    # bs4 decodes the bytes itself, that time counts as 'dom'
+    if partial:
+        doc = parse_regions(raw, REGIONS, REQUIRED, from_encoding=encoding)
     else:
-        for i in range(0, len(record) - 1):
-            sec['content'].append(section_struct(ids[record[i]:record[i + 1]], texts[record[i]:record[i + 1]]))
-        sec['content'].append(section_struct(ids[record[-1]:], texts[record[-1]:]))
-    return sec
-
-
-def doc_struct(title, abstract, keywords, ids, texts, path, file, doi):
-    doc = {}
-    doc['title'] = title
-    doc['abstract'] = abstract
-    doc['keywords'] = keywords
-    doc['path'] = path
-    doc['file'] = file
-    doc['doi'] = doi
-    doc['content'] = []
-    for i in range(0, len(ids)):
-        doc['content'].append(section_struct(ids[i], texts[i]))
+        doc = BeautifulSoup(raw, 'lxml', from_encoding=encoding)
+    timer.mark('dom')
     return doc
 
-def detect_encoding(file_path):
-    with open(file_path, 'rb') as f:
-        raw_data = f.read()
-        result = chardet.detect(raw_data)
-        return result['encoding']
 
-
-def parse_html_file(file_path):
-    encoding = detect_encoding(file_path)
-    with open(file_path, 'r', encoding=encoding) as f:
-        soup = BeautifulSoup(f, 'lxml')
-    return soup
+def load_doc(file_path, engine='bs4', timer=NO_TIMER, data=None):
+    if engine == 'rules':
+        raw, encoding = read_html_file(file_path, timer, data)
+        text = raw.decode(encoding, 'replace')
+        timer.mark('decode')
+        res = publisher_rules.parse_doc(text, 'mdpi', timer=timer)
+    else:
+        res = parse_doc(parse_html_file(file_path, timer=timer, data=data))
+    timer.mark('extract')
+    return res
+
+
+def process_file(input_dir, output_dir, filename, data=None):
+    input_file_path = os.path.join(input_dir, filename)
+    doi = filename[:-5].replace('_', '/')
+    packed = [] if sharded else None
+
+    print(f"Processing: {filename}")
+
+    timer = DocTimer(filename)
+    try:
+        title, abstract, keywords, ids, texts = load_doc(input_file_path, engine, timer, data)
+        ir = DocIR.from_lists(title, abstract, keywords, ids, texts, input_dir, filename)
+        timer.mark('ir')
+    except Exception as e:
+        print(f"Error processing {filename}: {e}")
+        timer.error = repr(e)
+        timer.finish()
+        return timer, doi, None, packed
+
+    # 保存解析结果
+    with open_output(output_dir, f"{filename}.txt", packed) as fout:
+        fout.write(title + '\n\n')
+        fout.write('Abstract\n\n')
+        fout.write(abstract + '\n\n')
+        fout.write('Keywords\n\n')
+        fout.write(', '.join(keywords) + '\n\n')
+        fout.write('Content\n\n')
+        for _, text in ir.items():
+            fout.write(text + '\n\n')
+    timer.mark('write')
+    timer.finish()
+    return timer, doi, None, packed  # no JSONL for MDPI
 
 
 def process_directory(input_dir, output_dir):
-    for filename in os.listdir(input_dir):
-        if filename.endswith('.html'):
-            input_file_path = os.path.join(input_dir, filename)
-            output_file_path = os.path.join(output_dir, f"{filename}.txt")
-
-            print(f"Processing: {filename}")
-
-            try:
-                doc = parse_html_file(input_file_path)
-                title, abstract, keywords, ids, texts = parse_doc(doc)
-                ifsuccess = 1
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                continue
-
-            # 保存解析结果
-            with open(output_file_path, 'w', encoding='utf-8') as fout:
-                fout.write(title + '\n\n')
-                fout.write('Abstract\n\n')
-                fout.write(abstract + '\n\n')
-                fout.write('Keywords\n\n')
-                fout.write(', '.join(keywords) + '\n\n')
-                fout.write('Content\n\n')
-                for i in range(0, len(texts)):
-                    for j in range(0, len(texts[i])):
-                        fout.write(texts[i][j] + '\n\n')
+    main(process_file, input_dir, output_dir, os.path.basename(__file__), PARSER_VERSION, incremental,
+         profile=profile)
 
 
 if __name__ == "__main__":
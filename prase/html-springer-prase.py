@@ -4,6 +4,13 @@ from bs4 import BeautifulSoup
 import os
 import json
 
+from batch_runner import main
+from jsonl_io import jsonl_line, jsonl_path
+from doc_ir import DocIR
+from doc_timing import DocTimer, NO_TIMER, read_text
+from doc_store import open_output
+import publisher_rules
+
 def ifskip(string):
     flag = 0
     stop = ['abbre', 'Bib', 'Ack', 'author', 'affiliation', 'corresponding',
@@ -114,109 +121,79 @@ def parse_doc(doc):
 
     return title, abstract, keywords, idlst, textlst
 
-def section_struct(ids, texts):
-    sec = {'sec_title': '', 'content': []}
-    minid = 100
-    record = []
-    ct = 0
-    for i in range(0, len(ids)):
-        if ids[i][0] == 'h':
-            ct += 1
-            current = int(ids[i][1:])
-            if current < minid:
-                minid = current
-
-    for i in range(0, len(ids)):
-        if ids[i][0] == 'h':
-            current = int(ids[i][1:])
-            if current == minid:
-                record.append(i)
-
-    if len(record) == 1:
-        for i in range(0, len(ids)):
-            if (ids[i][0] == 'h') and (int(ids[i][1:]) == minid):
-                sec['sec_title'] = texts[i]
-            elif (ids[i][0] == 'h') and (int(ids[i][1:]) > minid):
-                tmp = section_struct(ids[i:], texts[i:])
-                sec['content'].append(tmp['content'])
-                return sec
-            else:
-                sec['content'].append(texts[i])
-        return sec
+def load_doc(file_path, engine='bs4', timer=NO_TIMER, data=None):
+    text = read_text(file_path, timer=timer, data=data)
+    if engine == 'rules':
+        res = publisher_rules.parse_doc(text, 'springer', timer=timer)
     else:
-        for i in range(0, len(record) - 1):
-            sec['content'].append(section_struct(ids[record[i]:record[i + 1]], texts[record[i]:record[i + 1]]))
-        sec['content'].append(section_struct(ids[record[-1]:], texts[record[-1]:]))
-    return sec
-
-def doc_struct(title, abstract, keywords, ids, texts, path, file, doi):
-    doc = {}
-    doc['title'] = title
-    doc['abstract'] = abstract
-    doc['keywords'] = keywords
-    doc['path'] = path
-    doc['file'] = file
-    doc['doi'] = doi
-    doc['content'] = []
-    for i in range(0, len(ids)):
-        doc['content'].append(section_struct(ids[i], texts[i]))
-    return doc
-
-
-path = r'F:\html\10.1007' # input
-txtpath = r'F:\prase-html\10.1007' # output
-jsonpath = os.path.join(txtpath, 'json')
-logpath = os.path.join(txtpath, 'parse.log')
-
-if not os.path.exists(jsonpath):
-    os.makedirs(jsonpath)
-
+        doc = BeautifulSoup(text, "lxml")
+        timer.mark('dom')
+        res = parse_doc(doc)
+    timer.mark('extract')
+    return res
+
+PARSER_VERSION = 1  # bump when the parsing logic changes, forces a full rerun
+incremental = 1  # Set to 1 to skip inputs unchanged since the last run
 iftxt = 1  # Set to 1 if you want to export text files
 ifjson = 1  # Set to 1 if you want to export JSON files
-
-doc_dict = {}
-
-log = open(logpath, 'w')
-
-for file in os.listdir(path):
-    leng = len(file)
-    if leng > 5 and file[leng-5:leng] == '.html':
-        filename = file[0:leng-5]
-        doi = filename.replace("_", "/").replace(":", "_")
-        print(file)
-        log.write(file + '\n')
-        try:
-            with open(os.path.join(path, file), 'r', encoding='utf-8') as f:
-                doc = BeautifulSoup(f, "lxml")
-            title, abstract, keywords, ids, texts = parse_doc(doc)
-            ifsuccess = 1
-        except:
-            ifsuccess = 0
-        if iftxt:
-            txt_filename = os.path.join(txtpath, filename + '.txt')
-            with open(txt_filename, 'w', encoding='utf-8') as fout:
-                if ifsuccess:
-                    fout.write(title + '\n\n')
-                    fout.write('Abstract\n\n')
-                    fout.write(abstract + '\n\n')
-                    fout.write('Keywords\n\n')
-                    for kw in keywords:
-                        fout.write(kw + ', ')
-                    fout.write('\n\n')
-                    for i in range(0, len(texts)):
-                        for j in range(0, len(texts[i])):
-                            fout.write(texts[i][j] + '\n\n')
-                else:
-                    fout.write(file + ' PARSE ERROR\n')
-        if ifjson:
-            doc_info = doc_struct(title, abstract, keywords, ids, texts, path, filename, doi)
-            json_filename = os.path.join(jsonpath, filename + '.json')
-            with open(json_filename, 'w', encoding='utf-8') as json_file:
-                json.dump(doc_info, json_file, ensure_ascii=False, indent=4)
-        log.write('\n' if ifsuccess else ' PARSE ERROR\n')
-
-log.close()
-
-if ifjson:
-    with open(os.path.join(jsonpath, 'all_data.json'), 'w') as json_file:
-        json.dump(doc_dict, json_file, ensure_ascii=False, indent=4)
\ No newline at end of file
+jsonl_compress = None  # compression of all_data.jsonl: None, 'gzip' or 'zstd'
+engine = 'bs4'  # 'bs4' or 'rules' (publisher_rules.py: lxml + precompiled XPath, same output)
+profile = 0  # >0: re-run the N slowest pages under cProfile after the batch (see doc_timing.py)
+sharded = 0  # 1: pack the per-document txt/JSON files into compressed shards (doc_store.py)
+
+def process_file(path, txtpath, jsonpath, file, data=None):
+    filename = file[:-5]
+    doi = filename.replace("_", "/").replace(":", "_")
+    print(file)
+    ir = None
+    timer = DocTimer(file)
+    packed = [] if sharded else None
+    try:
+        title, abstract, keywords, ids, texts = load_doc(os.path.join(path, file), engine, timer, data)
+        ir = DocIR.from_lists(title, abstract, keywords, ids, texts, path, filename, doi)
+        timer.mark('ir')
+        ifsuccess = 1
+    except Exception as e:
+        timer.error = repr(e)
+        ifsuccess = 0
+    if iftxt:
+        with open_output(txtpath, filename + '.txt', packed) as fout:
+            if ifsuccess:
+                fout.write(title + '\n\n')
+                fout.write('Abstract\n\n')
+                fout.write(abstract + '\n\n')
+                fout.write('Keywords\n\n')
+                for kw in keywords:
+                    fout.write(kw + ', ')
+                fout.write('\n\n')
+                for _, text in ir.items():
+                    fout.write(text + '\n\n')
+            else:
+                fout.write(file + ' PARSE ERROR\n')
+    timer.mark('write')
+    line = None
+    if ifjson and ifsuccess:
+        doc = ir.to_dict()
+        timer.mark('tree')
+        # named relative to txtpath, so the shards export back into json/
+        json_filename = os.path.join(os.path.relpath(jsonpath, txtpath), filename + '.json')
+        with open_output(txtpath, json_filename, packed) as json_file:
+            json.dump(doc, json_file, ensure_ascii=False, indent=4)
+        # the section tree is built once, here: the main process only appends this line
+        line = jsonl_line(doc)
+        timer.mark('write')
+    timer.finish()
+    return timer, doi, line, packed
+
+
+if __name__ == '__main__':
+    path = r'F:\html\10.1007' # input
+    txtpath = r'F:\prase-html\10.1007' # output
+    jsonpath = os.path.join(txtpath, 'json')
+
+    if not os.path.exists(jsonpath):
+        os.makedirs(jsonpath)
+
+    # all documents, one compact JSON line each, written as soon as they are parsed
+    main(process_file, path, txtpath, os.path.basename(__file__), PARSER_VERSION, incremental,
+         jsonl_path(jsonpath, jsonl_compress, 'all_data') if ifjson else None, profile, args=(jsonpath,))
@@ -2,6 +2,13 @@
 from bs4 import BeautifulSoup
 import os, json
 
+from batch_runner import main
+from jsonl_io import jsonl_line, jsonl_path
+from doc_ir import DocIR
+from doc_timing import DocTimer, NO_TIMER, read_text
+from doc_store import open_output
+import publisher_rules
+
 def clean(t: str) -> str:
     return ' '.join(t.strip().split())
 
@@ -42,73 +49,66 @@ def parse_doc_asme(soup: BeautifulSoup):
 
     return title, abstract, keywords, idlst, textlst
 
-def section_struct(ids, txts):
-    node = {'sec_title':'', 'content':[]}
-    heads = [int(i[1]) for i in ids if i.startswith('h')] or [7]
-    top   = min(heads)
-    splits= [i for i,x in enumerate(ids) if x.startswith('h') and int(x[1])==top] + [len(ids)]
-    for a, b in zip(splits[:-1], splits[1:]):
-        title = txts[a]
-        sub_id, sub_txt = ids[a+1:b], txts[a+1:b]
-        if any(i.startswith('h') for i in sub_id):
-            node['content'].append(section_struct(sub_id, sub_txt) | {'sec_title': title})
-        else:
-            node['content'].append({'sec_title': title, 'content': sub_txt})
-    return node
-
-def doc_struct(title, abstract, keywords, ids, txts, path, file, doi):
-    return {
-        'title': title,
-        'abstract': abstract,
-        'keywords': keywords,
-        'path': path,
-        'file': file,
-        'doi': doi,
-        'content': [section_struct(ids[i], txts[i]) for i in range(len(ids))]
-    }
-
-path    = r"F:\html\asme" # input
-txtpath = r"F:\prase-html\asme" # output
-logpath = os.path.join(txtpath, "parse.log")
+def load_doc(file_path, engine='bs4', timer=NO_TIMER, data=None):
+    text = read_text(file_path, errors='ignore', timer=timer, data=data)
+    if engine == 'rules':
+        res = publisher_rules.parse_doc(text, 'asme', timer=timer)
+    else:
+        doc = BeautifulSoup(text, 'lxml')
+        timer.mark('dom')
+        res = parse_doc_asme(doc)
+    timer.mark('extract')
+    return res
+
+PARSER_VERSION = 1  # bump when the parsing logic changes, forces a full rerun
+incremental = 1  # Set to 1 to skip inputs unchanged since the last run
 iftxt   = 1 # Set to 1 if you want to export text files
 ifjson  = 1 # Set to 1 if you want to export JSON files
-
-os.makedirs(txtpath, exist_ok=True)
-doc_dict = {}
-
-with open(logpath, 'w', encoding='utf-8') as log:
-    for file in os.listdir(path):
-        if not file.endswith('.html'):
-            continue
-        filename = file[:-5]
-        doi = filename.replace('_', '/')
-        try:
-            with open(os.path.join(path, file), 'r', encoding='utf-8', errors='ignore') as f:
-                soup = BeautifulSoup(f, 'lxml')
-            title, abstract, kw, ids, txts = parse_doc_asme(soup)
-            ok = True
-            log.write(file + '\n')
-        except Exception as e:
-            ok = False
-            log.write(f"{file} PARSE ERROR: {e}\n")
-
-        # —— TXT
-        if iftxt:
-            with open(os.path.join(txtpath, filename + '.txt'), 'w', encoding='utf-8') as out:
-                if ok:
-                    out.write(f"{title}\n\nAbstract\n{abstract}\n\nKeywords\n")
-                    out.write(', '.join(kw) + '\n\n')
-                    for tags, paras in zip(ids, txts):
-                        for tag, txt in zip(tags, paras):
-                            out.write(f"[{tag}]\n{txt}\n")
-                else:
-                    out.write(f"{file} PARSE ERROR\n")
-
-        # —— JSON
-        if ok:
-            doc_dict[doi] = doc_struct(title, abstract, kw, ids, txts,
-                                       path, file, doi)
-
-if ifjson:
-    with open(os.path.join(path, 'data.json'), 'w', encoding='utf-8') as jf:
-        json.dump(doc_dict, jf, ensure_ascii=False, indent=2)
+jsonl_compress = None  # compression of data.jsonl: None, 'gzip' or 'zstd'
+engine = 'bs4'  # 'bs4' or 'rules' (publisher_rules.py: lxml + precompiled XPath, same output)
+profile = 0  # >0: re-run the N slowest pages under cProfile after the batch (see doc_timing.py)
+sharded = 0  # 1: pack the per-document txt files into compressed shards (doc_store.py)
+
+def process_file(path, txtpath, file, data=None):
+    filename = file[:-5]
+    doi = filename.replace('_', '/')
+    ir = None
+    timer = DocTimer(file)
+    packed = [] if sharded else None
+    try:
+        title, abstract, kw, ids, txts = load_doc(os.path.join(path, file), engine, timer, data)
+        ir = DocIR.from_lists(title, abstract, kw, ids, txts, path, file, doi, split=True)
+        timer.mark('ir')
+        ok = True
+    except Exception as e:
+        ok = False
+        timer.error = repr(e)
+
+    # —— TXT
+    if iftxt:
+        with open_output(txtpath, filename + '.txt', packed) as out:
+            if ok:
+                out.write(f"{title}\n\nAbstract\n{abstract}\n\nKeywords\n")
+                out.write(', '.join(kw) + '\n\n')
+                for tag, txt in ir.items():
+                    out.write(f"[{tag}]\n{txt}\n")
+            else:
+                out.write(f"{file} PARSE ERROR\n")
+
+    timer.mark('write')
+    line = None
+    if ifjson and ok:
+        doc = ir.to_dict()
+        timer.mark('tree')
+        # the section tree is built here, in the worker: the main process only appends the line
+        line = jsonl_line(doc)
+        timer.mark('write')
+    timer.finish()
+    return timer, doi, line, packed
+
+if __name__ == '__main__':
+    path    = r"F:\html\asme" # input
+    txtpath = r"F:\prase-html\asme" # output
+    # one compact JSON line per document, written as soon as it is parsed
+    main(process_file, path, txtpath, os.path.basename(__file__), PARSER_VERSION, incremental,
+         jsonl_path(txtpath, jsonl_compress) if ifjson else None, profile)
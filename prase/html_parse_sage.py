@@ -4,6 +4,13 @@ import os
 import json
 import re
 
+from batch_runner import main
+from jsonl_io import jsonl_line, jsonl_path
+from doc_ir import DocIR
+from doc_timing import DocTimer, NO_TIMER, read_text
+from doc_store import open_output
+import publisher_rules
+
 def ifskip(string):
     flag = 0
     stop = [
@@ -112,98 +119,68 @@ def parse_doc(doc):
 
     return title, abstract, keywords, idlst_all, textlst_all
 
-def section_struct(ids, texts):
-    sec = {'sec_title': '', 'content': []}
-    minid = 100
-    record = []
-
-    # get the minimum id of paragraph
-    for i in range(len(ids)):
-        if ids[i][0] == 'h':
-            current = int(ids[i][1:])
-            minid = min(minid, current)
-
-    for i in range(len(ids)):
-        if ids[i][0] == 'h' and int(ids[i][1:]) == minid:
-            record.append(i)
-
-    if len(record) <= 1:
-        for i in range(len(ids)):
-            if ids[i][0] == 'h' and int(ids[i][1:]) == minid:
-                sec['sec_title'] = texts[i]
-            elif ids[i][0] == 'h' and int(ids[i][1:]) > minid:
-                tmp = section_struct(ids[i:], texts[i:])
-                sec['content'].append(tmp['content'])
-                return sec
-            else:
-                sec['content'].append(texts[i])
-        return sec
+def load_doc(file_path, engine='bs4', timer=NO_TIMER, data=None):
+    text = read_text(file_path, errors='ignore', timer=timer, data=data)
+    if engine == 'rules':
+        res = publisher_rules.parse_doc(text, 'sage', timer=timer)
     else:
-        for i in range(len(record) - 1):
-            sec['content'].append(
-                section_struct(ids[record[i]:record[i + 1]], texts[record[i]:record[i + 1]]))
-        sec['content'].append(
-            section_struct(ids[record[-1]:], texts[record[-1]:]))
-    return sec
-
-
-def doc_struct(title, abstract, keywords, ids, texts, path, file, doi):
-    doc = {
-        'title': title,
-        'abstract': abstract,
-        'keywords': keywords,
-        'path': path,
-        'file': file,
-        'doi': doi,
-        'content': []
-    }
-    for i in range(len(ids)):
-        doc['content'].append(section_struct(ids[i], texts[i]))
-    return doc
-
-
-path = r'F:\html\sage' # input
-txtpath = r'F:\prase-html\sage' # output
-logpath = os.path.join(txtpath, 'parse.log')
-iftxt = 1  # Set to 1 if you want to export text files
-ifjson = 1  # Set to 1 if you want to export JSON files
+        doc = BeautifulSoup(text, 'lxml')
+        timer.mark('dom')
+        res = parse_doc(doc)
+    timer.mark('extract')
+    return res
 
-os.makedirs(txtpath, exist_ok=True)
-doc_dict = {}
 
-with open(logpath, 'w', encoding='utf-8') as log:
-    for file in os.listdir(path):
-        if not file.endswith('.html'):
-            continue
-
-        filename = file[:-5]
-        doi = filename.replace('_', '/')
-
-        try:
-            with open(os.path.join(path, file), 'r', encoding='utf-8', errors='ignore') as f:
-                soup = BeautifulSoup(f, 'lxml')
-            title, abstract, kw, ids, txts = parse_doc(soup)
-            ok = True
-            log.write(file + '\n')
-        except Exception as e:
-            ok = False
-            log.write(f"{file} PARSE ERROR: {e}\n")
-
-        if iftxt:
-            with open(os.path.join(txtpath, filename + '.txt'), 'w', encoding='utf-8') as out:
-                if ok:
-                    out.write(f"{title}\n\nAbstract\n{abstract}\n\nKeywords\n")
-                    out.write(', '.join(kw) + '\n\n')
-                    for tags, paras in zip(ids, txts):
-                        for tag, txt in zip(tags, paras):
-                            out.write(f"[{tag}]\n{txt}\n")
-                else:
-                    out.write(f"{file} PARSE ERROR\n")
-
-        if ok:
-            doc_dict[doi] = doc_struct(title, abstract, kw, ids, txts,
-                                       path, file, doi)
-
-if ifjson:
-    with open(os.path.join(path, 'data.json'), 'w', encoding='utf-8') as jf:
-        json.dump(doc_dict, jf, ensure_ascii=False, indent=2)
+PARSER_VERSION = 1  # bump when the parsing logic changes, forces a full rerun
+incremental = 1  # Set to 1 to skip inputs unchanged since the last run
+iftxt = 1  # Set to 1 if you want to export text files
+ifjson = 1  # Set to 1 if you want to export JSON files
+jsonl_compress = None  # compression of data.jsonl: None, 'gzip' or 'zstd'
+engine = 'bs4'  # 'bs4' or 'rules' (publisher_rules.py: lxml + precompiled XPath, same output)
+profile = 0  # >0: re-run the N slowest pages under cProfile after the batch (see doc_timing.py)
+sharded = 0  # 1: pack the per-document txt files into compressed shards (doc_store.py)
+
+def process_file(path, txtpath, file, data=None):
+    filename = file[:-5]
+    doi = filename.replace('_', '/')
+    ir = None
+    timer = DocTimer(file)
+    packed = [] if sharded else None
+
+    try:
+        title, abstract, kw, ids, txts = load_doc(os.path.join(path, file), engine, timer, data)
+        ir = DocIR.from_lists(title, abstract, kw, ids, txts, path, file, doi)
+        timer.mark('ir')
+        ok = True
+    except Exception as e:
+        ok = False
+        timer.error = repr(e)
+
+    if iftxt:
+        with open_output(txtpath, filename + '.txt', packed) as out:
+            if ok:
+                out.write(f"{title}\n\nAbstract\n{abstract}\n\nKeywords\n")
+                out.write(', '.join(kw) + '\n\n')
+                for tag, txt in ir.items():
+                    out.write(f"[{tag}]\n{txt}\n")
+            else:
+                out.write(f"{file} PARSE ERROR\n")
+
+    timer.mark('write')
+    line = None
+    if ifjson and ok:
+        doc = ir.to_dict()
+        timer.mark('tree')
+        # the section tree is built here, in the worker: the main process only appends the line
+        line = jsonl_line(doc)
+        timer.mark('write')
+    timer.finish()
+    return timer, doi, line, packed
+
+
+if __name__ == '__main__':
+    path = r'F:\html\sage' # input
+    txtpath = r'F:\prase-html\sage' # output
+    # one compact JSON line per document, written as soon as it is parsed
+    main(process_file, path, txtpath, os.path.basename(__file__), PARSER_VERSION, incremental,
+         jsonl_path(txtpath, jsonl_compress) if ifjson else None, profile)
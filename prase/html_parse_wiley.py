@@ -3,6 +3,26 @@ from bs4 import BeautifulSoup
 import os
 import json
 
+from batch_runner import main
+from jsonl_io import jsonl_line, jsonl_path
+from partial_parse import parse_regions
+from doc_ir import DocIR
+from doc_timing import DocTimer, NO_TIMER, read_text
+from doc_store import open_output
+import publisher_rules
+
+PARSER_VERSION = 1  # bump when the parsing logic changes, forces a full rerun
+incremental = 1  # Set to 1 to skip inputs unchanged since the last run
+iftxt = 1
+jsonl_compress = None  # compression of data.jsonl: None, 'gzip' or 'zstd'
+partial_dom = 1  # Set to 1 to build the DOM only for title/abstract/full text
+engine = 'bs4'  # 'bs4' or 'rules' (publisher_rules.py: lxml + precompiled XPath, same output)
+profile = 0  # >0: re-run the N slowest pages under cProfile after the batch (see doc_timing.py)
+sharded = 0  # 1: pack the per-document txt files into compressed shards (doc_store.py)
+
+REGIONS = ['citation__title', 'abstract-group', 'article-section__abstract', 'article-section__full']
+REQUIRED = [['citation__title'], ['abstract-group', 'article-section__abstract'], ['article-section__full']]
+
 def ifskip(string):
     flag = 0
     stop = ['abbre', 'Bib', 'Ack', 'author', 'affiliation', 'corresponding',
@@ -100,93 +120,64 @@ def parse_doc(doc):
 
     return title, abstract, keywords, idlst, textlst
 
-def section_struct(ids, texts):
-    sec = {'sec_title': '', 'content': []}
-    minid = 100
-    record = []
-
-    for i in range(len(ids)):
-        if ids[i][0] == 'h':
-            current = int(ids[i][1:])
-            if current < minid:
-                minid = current
-
-    for i in range(len(ids)):
-        if ids[i][0] == 'h' and int(ids[i][1:]) == minid:
-            record.append(i)
-
-    if len(record) <= 1:
-        for i in range(len(ids)):
-            if ids[i][0] == 'h' and int(ids[i][1:]) == minid:
-                sec['sec_title'] = texts[i]
-            elif ids[i][0] == 'h' and int(ids[i][1:]) > minid:
-                tmp = section_struct(ids[i:], texts[i:])
-                sec['content'].append(tmp['content'])
-                return sec
-            else:
-                sec['content'].append(texts[i])
-        return sec
+def load_doc(file_path, engine='bs4', timer=NO_TIMER, data=None):
+    text = read_text(file_path, timer=timer, data=data)
+    if engine == 'rules':
+        res = publisher_rules.parse_doc(text, 'wiley', timer=timer)
     else:
-        for i in range(len(record) - 1):
-            sec['content'].append(section_struct(ids[record[i]:record[i + 1]], texts[record[i]:record[i + 1]]))
-        sec['content'].append(section_struct(ids[record[-1]:], texts[record[-1]:]))
-    return sec
-
-def doc_struct(title, abstract, keywords, ids, texts, path, file, doi):
-    return {
-        'title': title,
-        'abstract': abstract,
-        'keywords': keywords,
-        'path': path,
-        'file': file,
-        'doi': doi,
-        'content': [section_struct(ids[i], texts[i]) for i in range(len(ids))]
-    }
-
-
-path = r'F:\html\wiley' # input
-txtpath = r'F:\prase-html\wiley' # output
-logpath = os.path.join(txtpath, 'parse.log')
-iftxt = 1
-filelist = os.listdir(path)
-doc_dict = {}
-
-log = open(logpath, 'w', encoding='utf-8')
-
-for file in filelist:
-    if file.endswith('.html'):
-        filename = file[:-5]
-        doi = filename.replace('_', '/')
-        print(file)
-        log.write(file)
-
-        try:
-            with open(os.path.join(path, file), 'r', encoding='utf-8') as f:
-                doc = BeautifulSoup(f, "lxml")
-            title, abstract, keywords, ids, texts = parse_doc(doc)
-            ifsuccess = True
-        except Exception as e:
-            print(f"PRASE ERROR: {e}")
-            log.write(' PRASE ERROR\n')
-            ifsuccess = False
-
-        if iftxt:
-            with open(os.path.join(txtpath, filename + '.txt'), 'w', encoding='utf-8') as fout:
-                if ifsuccess:
-                    doc_dict[doi] = doc_struct(title, abstract, keywords, ids, texts, path, file, doi)
-                    log.write('\n')
-                    fout.write(f'E:/Data/Literature Data/AM fatigue/{filename}.pdf\n')
-                    fout.write(title + '\n')
-                    fout.write('Abstract\n' + abstract + '\n')
-                    fout.write('Keywords\n' + ', '.join(keywords) + '\n')
-                    for i in range(len(texts)):
-                        fout.write(f'[Section {i + 1}]\n')
-                        for j in range(len(texts[i])):
-                            fout.write(f'[{ids[i][j]}]\n{texts[i][j]}\n')
-                else:
-                    fout.write(file + ' PARSE ERROR\n')
-
-log.close()
-
-with open(os.path.join(path, 'data.json'), 'w', encoding='utf-8') as f:
-    json.dump(doc_dict, f, ensure_ascii=False, indent=2)
+        doc = parse_regions(text, REGIONS, REQUIRED) if partial_dom else BeautifulSoup(text, "lxml")
+        timer.mark('dom')
+        res = parse_doc(doc)
+    timer.mark('extract')
+    return res
+
+def process_file(path, txtpath, file, data=None):
+    filename = file[:-5]
+    doi = filename.replace('_', '/')
+    print(file)
+    ir = None
+    timer = DocTimer(file)
+    packed = [] if sharded else None
+
+    try:
+        title, abstract, keywords, ids, texts = load_doc(os.path.join(path, file), engine, timer, data)
+        ir = DocIR.from_lists(title, abstract, keywords, ids, texts, path, file, doi)
+        timer.mark('ir')
+        ifsuccess = True
+    except Exception as e:
+        print(f"PRASE ERROR: {e}")
+        timer.error = repr(e)
+        ifsuccess = False
+
+    if iftxt:
+        with open_output(txtpath, filename + '.txt', packed) as fout:
+            if ifsuccess:
+                fout.write(f'E:/Data/Literature Data/AM fatigue/{filename}.pdf\n')
+                fout.write(title + '\n')
+                fout.write('Abstract\n' + abstract + '\n')
+                fout.write('Keywords\n' + ', '.join(keywords) + '\n')
+                for i, sec in enumerate(ir.sections):
+                    fout.write(f'[Section {i + 1}]\n')
+                    for tag, text in ir.items(sec):
+                        fout.write(f'[{tag}]\n{text}\n')
+            else:
+                fout.write(file + ' PARSE ERROR\n')
+
+    timer.mark('write')
+    line = None
+    if iftxt and ifsuccess:
+        doc = ir.to_dict()
+        timer.mark('tree')
+        # the section tree is built here, in the worker: the main process only appends the line
+        line = jsonl_line(doc)
+        timer.mark('write')
+    timer.finish()
+    return timer, doi, line, packed
+
+
+if __name__ == '__main__':
+    path = r'F:\html\wiley' # input
+    txtpath = r'F:\prase-html\wiley' # output
+    # one compact JSON line per document, written as soon as it is parsed
+    main(process_file, path, txtpath, os.path.basename(__file__), PARSER_VERSION, incremental,
+         jsonl_path(txtpath, jsonl_compress), profile)
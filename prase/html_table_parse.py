@@ -7,6 +7,11 @@ import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 
+from table_fetch import TableFetcher
+from table_classify import tag_tables
+
+_session = None  # keep-alive session for _fetch_remote calls without prefetched pages
+
 def get_max_column(table):
     return max((len(r) for r in table), default=0)
 
@@ -68,12 +73,22 @@ def parse_single_table(tables, title):
         out.append({'title': title, 'head': head, 'body': body})
     return join_table(out)
 
-def _fetch_remote(a_tag, base):
+def _fetch_remote(a_tag, base, pages=None):
+    """Tables of the page a "pill-button" link points to. ``pages`` holds the
+    pages already fetched by a ``TableFetcher`` (None: not available)."""
+    global _session
     if not a_tag or not a_tag.has_attr('href'):
         return []
     url = urljoin(base, a_tag['href'])
     try:
-        html = requests.get(url, timeout=15).text
+        if pages is not None:
+            html = pages.get(url)
+            if html is None:
+                return []
+        else:
+            if _session is None:
+                _session = requests.Session()
+            html = _session.get(url, timeout=15).text
         sub = BeautifulSoup(html, 'lxml')
         caption = sub.find('figcaption')
         title = caption.get_text(strip=True) if caption else url
@@ -82,42 +97,79 @@ def _fetch_remote(a_tag, base):
         print(f'WARNING  {url}: {e}', file=sys.stderr)
         return []
 
-def parse_table_springer(doc):
+def _springer_boxes(doc):
+    return doc.find_all(
+            lambda t: t.name in ('div','figure')
+            and t.get('class')
+            and any('article-table' in c for c in t['class']))
+
+def _page_base(doc):
+    base = urlparse(doc.find('meta', property='og:url')['content'])
+    return f'{base.scheme}://{base.netloc}'
+
+def springer_table_links(doc):
+    """URLs of the tables ``parse_table_springer`` would fetch."""
+    urls = []
+    for box in _springer_boxes(doc):
+        if not box.find('table'):
+            pill = box.find('a', class_=lambda c:c and 'pill-button' in c)
+            if pill and pill.has_attr('href'):
+                urls.append(urljoin(_page_base(doc), pill['href']))
+    return urls
+
+def _tag_source(tables, source):
+    for tb in tables:
+        tb['source'] = source
+    return tables
+
+def parse_table_springer(doc, pages=None):
+    """Tables of a Springer page. Each gets a 'source': 'inline' (in a table
+    box), 'remote' (fetched from the box's link), 'page' (any <table> on the
+    page, when no box gave one) or 'pandas' (``pd.read_html``, only when
+    none of those page tables has a single filled cell)."""
     art_title = (doc.find('h1') or
                  doc.find('meta', attrs={'name':'dc.title'}))
     art_title = art_title.get_text(strip=True) if art_title else 'Untitled'
     tables = []
 
-    for box in doc.find_all(
-            lambda t: t.name in ('div','figure')
-            and t.get('class')
-            and any('article-table' in c for c in t['class'])):
+    for box in _springer_boxes(doc):
 
         caption = box.find('figcaption')
         ttl = caption.get_text(strip=True) if caption else art_title
         inner = box.find_all('table')
         if inner:
-            tables.extend(parse_single_table(inner, ttl))
+            tables.extend(_tag_source(parse_single_table(inner, ttl), 'inline'))
         else:
             pill = box.find('a', class_=lambda c:c and 'pill-button' in c)
-            base = urlparse(doc.find('meta', property='og:url')['content'])
-            base = f'{base.scheme}://{base.netloc}'
-            tables.extend(_fetch_remote(pill, base))
+            tables.extend(_tag_source(_fetch_remote(pill, _page_base(doc), pages), 'remote'))
+
+    candidates = doc.find_all('table') if not tables else []
+    if candidates:
+        tables.extend(_tag_source(parse_single_table(candidates, art_title), 'page'))
+        if not any(_has_cells(tb) for tb in tables):
+            # e.g. every cell a <th> outside <thead>: parse_rows found nothing, pandas does
+            tables = _pandas_tables(candidates, art_title) or tables
+    return tables
 
-    if not tables:
-        tables.extend(parse_single_table(doc.find_all('table'), art_title))
+def _has_cells(tb):
+    return any(str(c).strip() for row in tb['head'] + tb['body'] for c in row)
 
-    if not tables:
-        sio = StringIO(str(doc))
-        for flav in ('lxml','bs4'):
-            try:
-                for i,df in enumerate(pd.read_html(sio, flavor=flav),1):
-                    tables.append({'title':f'{art_title} (fallback {i})',
-                                   'head':[list(df.columns)],
-                                   'body':df.values.tolist()})
-                break
-            except ValueError:
-                sio.seek(0)
+def _pandas_tables(candidates, title):
+    # pd.read_html only ever finds <table> elements, so it is given the
+    # outermost ones (nested tables come with them) instead of the whole page
+    outer = [t for t in candidates if t.find_parent('table') is None]
+    sio = StringIO(''.join(str(t) for t in outer))
+    tables = []
+    for flav in ('lxml','bs4'):
+        try:
+            for i,df in enumerate(pd.read_html(sio, flavor=flav),1):
+                tables.append({'title':f'{title} (fallback {i})',
+                               'head':[list(r) for r in zip(*df.columns)] if df.columns.nlevels > 1 else [list(df.columns)],
+                               'body':df.values.tolist(),
+                               'source':'pandas'})
+            break
+        except ValueError:
+            sio.seek(0)
     return tables
 
 def parse_table_wiley(doc):
@@ -156,41 +208,71 @@ def table_to_markdown(tb):
     md.append('')
     return '\n'.join(md)
 
-def dump_markdown(data:dict, out_path:str):
+def dump_markdown(data:dict, out_path:str, fatigue_only=False):
+    """``fatigue_only``: write only the tables tagged S-N/e-N (table_classify.py)."""
     lines = ['# Tables Extracted\n']
     for paper_id, item in data.items():
+        tables = [tb for tb in item['tables'] if tb.get('fatigue')] if fatigue_only else item['tables']
         lines.append(f'## {paper_id}')
-        if not item['tables']:
+        if not tables:
             lines.append('*No tables found.*\n')
             continue
-        for tb in item['tables']:
+        for tb in tables:
             lines.append(table_to_markdown(tb))
     with open(out_path, 'w', encoding='utf-8') as fp:
         fp.write('\n'.join(lines))
     print(f'Markdown saved → {out_path}')
 
-def process_html(dir_path, parser):
-    data = {}
-    for fn in os.listdir(dir_path):
-        if not fn.endswith('.html'):
-            continue
-        with open(os.path.join(dir_path, fn), encoding='utf-8') as f:
-            soup = BeautifulSoup(f, 'lxml')
+def _parse_batch(dir_path, batch, parser, fetcher, data):
+    kw = {}
+    if fetcher is not None and parser is parse_table_springer:
+        # the linked tables of the whole batch are fetched together
+        urls = []
+        for _, soup in batch:
+            try:
+                urls.extend(springer_table_links(soup))
+            except Exception:
+                pass  # reported by the parser below
+        kw['pages'] = fetcher.fetch(urls)
+    for fn, soup in batch:
         try:
-            tables = parser(soup)
+            tables = tag_tables(parser(soup, **kw))
             data[os.path.splitext(fn)[0]] = {
                 'path': dir_path, 'file': fn, 'tables': tables}
             print(f'{fn}: {len(tables)} tables')
         except Exception as e:
             print(f'{fn}: PARSE ERROR {e}', file=sys.stderr)
+
+def process_html(dir_path, parser, fetcher=None, window=32):
+    """``fetcher``: a ``TableFetcher`` for Springer's linked tables, used
+    ``window`` pages at a time. Without it they are fetched one by one."""
+    data = {}
+    batch = []
+    for fn in os.listdir(dir_path):
+        if not fn.endswith('.html'):
+            continue
+        with open(os.path.join(dir_path, fn), encoding='utf-8') as f:
+            soup = BeautifulSoup(f, 'lxml')
+        batch.append((fn, soup))
+        if fetcher is None or len(batch) >= window:
+            _parse_batch(dir_path, batch, parser, fetcher, data)
+            batch = []
+    if batch:
+        _parse_batch(dir_path, batch, parser, fetcher, data)
     return data
 
 if __name__ == '__main__':
     ROOT = r'F:\html\springer'   # ← Replace with your directory
     DATA_JSON = os.path.join(ROOT, 'data_table.json')
     DATA_MD   = os.path.join(ROOT, 'data_table.md.txt')
+    CACHE_DIR = os.path.join(ROOT, 'table_cache')  # Springer tables behind a link, revalidated by ETag/Last-Modified
+    CACHE_ONLY = 0  # Set to 1 to use only cached linked tables, without any network access
+    PER_HOST  = 4   # concurrent connections per host
+    FATIGUE_ONLY = 0  # Set to 1 to put only the tables tagged S-N/e-N in the Markdown (all stay in the JSON)
 
-    data = process_html(ROOT, parse_table_springer)   # Switching the parser allows parsing of Wiley/MDPI.
+    with TableFetcher(CACHE_DIR, per_host=PER_HOST, offline=bool(CACHE_ONLY)) as fetcher:
+        data = process_html(ROOT, parse_table_springer, fetcher)   # Switching the parser allows parsing of Wiley/MDPI.
+    print('linked tables:', ', '.join(f'{k} {v}' for k, v in fetcher.stats.items()))
 
     # Save JSON
     with open(DATA_JSON, 'w', encoding='utf-8') as fp:
@@ -198,4 +280,4 @@ if __name__ == '__main__':
     print(f'JSON saved → {DATA_JSON}')
 
     # Save Markdown
-    dump_markdown(data, DATA_MD)
+    dump_markdown(data, DATA_MD, FATIGUE_ONLY)
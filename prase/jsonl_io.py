@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import gzip
+import json
+import zlib
+
+EXT = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+MAGIC = {'gzip': b'\x1f\x8b\x08', 'zstd': b'\x28\xb5\x2f\xfd'}
+
+
+def _member_writer(raw, compress):
+    """Text handle writing one gzip member / zstd frame to binary ``raw``;
+    closing it ends the member and leaves ``raw`` open."""
+    if compress == 'gzip':
+        return io.TextIOWrapper(gzip.GzipFile(fileobj=raw, mode='wb'), encoding='utf-8')
+    if compress == 'zstd':
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw, closefd=False), encoding='utf-8')
+    raise ValueError(f'unknown compression {compress!r}')
+
+
+def _decompressor(compress):
+    if compress == 'gzip':
+        return zlib.decompressobj(31), zlib.error
+    if compress == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj(), zstandard.ZstdError
+    raise ValueError(f'unknown compression {compress!r}')
+
+
+def _members(f, compress, size=1 << 20):
+    """The decompressed gzip members / zstd frames of binary stream ``f``.
+
+    A member cut off by a killed writer (no trailer), or one that does not
+    decompress, is left out whole, and reading goes on at the next member
+    header after its start. Each member is held in memory until its end
+    is checked, which JsonlWriter keeps to ``flush_every`` records.
+    """
+    magic = MAGIC[compress]
+    rest = b''
+    while True:
+        chunks = [rest] if rest else []
+        if not chunks:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            chunks.append(chunk)
+        d, error = _decompressor(compress)
+        out = []
+        try:
+            i = 0
+            while not d.eof:
+                if i == len(chunks):
+                    chunk = f.read(size)
+                    if not chunk:
+                        raise EOFError('member has no end')
+                    chunks.append(chunk)
+                out.append(d.decompress(chunks[i]))
+                i += 1
+        except (error, EOFError):
+            raw = b''.join(chunks)
+            start = raw.find(magic, 1)
+            while start < 0:
+                # keep a possible partial header at the end, and read on for the next member
+                chunk = f.read(size)
+                if not chunk:
+                    return
+                raw = raw[-(len(magic) - 1):] + chunk
+                start = raw.find(magic)
+            rest = raw[start:]
+            continue
+        # what followed this member's end in the last chunk, and any chunks not fed
+        rest = d.unused_data + b''.join(chunks[i:])
+        yield b''.join(out)
+
+
+def _lines(path, compress):
+    if compress is None:
+        with open(path, encoding='utf-8') as f:
+            yield from f
+        return
+    with open(path, 'rb') as f:
+        for member in _members(f, compress):
+            # members end at line ends; split on '\n' only, JSON strings may hold U+2028
+            yield from member.decode('utf-8').split('\n')
+
+
+def jsonl_line(record):
+    """The compact JSON line ``JsonlWriter.write`` writes for ``record`` (no newline)."""
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def jsonl_path(folder, compress=None, name='data'):
+    return os.path.join(folder, name + '.jsonl' + EXT[compress])
+
+
+def guess_compress(path):
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return None
+
+
+def _drop_partial_line(path, size=1 << 16):
+    """Cut a plain JSONL file back to its last newline: a killed run can leave
+    half a line, which the next appended line would otherwise run into."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'r+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(pos - size, 0)
+            f.seek(start)
+            i = f.read(pos - start).rfind(b'\n')
+            if i >= 0:
+                pos = start + i + 1
+                break
+            pos = start
+        if pos != end:
+            f.truncate(pos)
+
+
+class JsonlWriter:
+    """Append one compact JSON line per record as soon as it is produced.
+
+    The file is flushed every ``flush_every`` records. A gzip/zstd file
+    gets a complete member/frame per flush, so what was flushed can always
+    be read back: a crash loses at most ``flush_every`` records, and
+    ``iter_jsonl`` skips the cut-off member the crash left, also when a
+    later run appended more to the file. Appending to a plain file first
+    cuts off a half-written last line.
+    """
+
+    def __init__(self, path, compress=None, flush_every=100, append=False):
+        self.compress = compress if compress is not None else guess_compress(path)
+        if self.compress is None:
+            if append:
+                _drop_partial_line(path)
+            self.raw = None
+            self.f = open(path, 'a' if append else 'w', encoding='utf-8')
+        else:
+            self.raw = open(path, 'ab' if append else 'wb')
+            self.f = None  # the member being written, started by the first line after a flush
+        self.flush_every = flush_every
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        self.write_line(jsonl_line(record))
+
+    def write_line(self, line):
+        """Append a line already made by ``jsonl_line`` (e.g. in a worker process)."""
+        if self.f is None:
+            self.f = _member_writer(self.raw, self.compress)
+        self.f.write(line)
+        self.f.write('\n')
+        self.count += 1
+        if self.flush_every and self.count % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        if self.raw is None:
+            self.f.flush()
+            return
+        if self.f is not None:
+            self.f.close()  # writes the gzip trailer / ends the zstd frame
+            self.f = None
+        self.raw.flush()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+        if self.raw is not None:
+            self.raw.close()
+
+
+def iter_jsonl(path, compress=None, key=None):
+    """Lazily yield the records of a JSONL file.
+
+    With ``key`` (e.g. 'doi') a record is only yielded if no later record in
+    the file has the same key, which is what incremental reruns that append
+    to the same file need. A gzip/zstd member that was cut off is skipped
+    (see ``JsonlWriter``).
+    """
+    compress = compress if compress is not None else guess_compress(path)
+    last = None
+    if key is not None:
+        last = {}
+        for i, line in enumerate(_lines(path, compress)):
+            if line.strip():
+                last[json.loads(line).get(key)] = i
+    for i, line in enumerate(_lines(path, compress)):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if last is None or last[record.get(key)] == i:
+            yield record
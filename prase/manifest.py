@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import hashlib
+import sqlite3
+
+from archive_source import Member
+
+
+def file_digest(file_path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def data_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class Manifest:
+    """SQLite record of which inputs a parser has already processed.
+
+    A file is skipped on the next run when the parser version is the same
+    and its size/mtime are unchanged; if only the mtime moved, the content
+    hash decides. Archive members are keyed by name like files and compared
+    on size and hash. Bump ``version`` to force a full rerun.
+
+    ``outputs`` (anything with a ``flush()``: the JSONL writer, the shard
+    store) are flushed before every commit, so no file is committed as done
+    ahead of what was written for it. Close them before the manifest.
+    """
+
+    def __init__(self, dbpath, parser, version, outputs=()):
+        self.parser = parser
+        self.version = str(version)
+        self.outputs = list(outputs)
+        self.db = sqlite3.connect(dbpath)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS files (
+            parser TEXT, source TEXT, size INTEGER, mtime_ns INTEGER,
+            digest TEXT, version TEXT, extra TEXT, updated REAL,
+            PRIMARY KEY (parser, source))''')
+        self.rows = {r[0]: r[1:] for r in self.db.execute(
+            'SELECT source, size, mtime_ns, digest, version, extra FROM files WHERE parser = ?', (parser,))}
+        self._digests = {}
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def changed(self, path, files):
+        """The subset of ``files`` (names inside ``path``) that need parsing.
+
+        ``files`` may also be a stream of ``archive_source.Member``s (see
+        ``batch_runner.list_inputs``); it is then filtered lazily, on size and
+        content hash."""
+        if not isinstance(files, (list, tuple)):
+            return (m for m in files if self.member_changed(m))
+        todo = []
+        for file in files:
+            file_path = os.path.join(path, file)
+            row = self.rows.get(file)
+            if row is None or row[3] != self.version:
+                todo.append(file)
+                continue
+            st = os.stat(file_path)
+            if st.st_size != row[0]:
+                todo.append(file)
+            elif st.st_mtime_ns != row[1]:
+                digest = self._digests[file] = file_digest(file_path)
+                if digest == row[2]:
+                    self.record(path, file, row[4] and json.loads(row[4]))
+                else:
+                    todo.append(file)
+        return todo
+
+    def extra(self, file):
+        row = self.rows.get(file)
+        return json.loads(row[4]) if row and row[4] else None
+
+    def member_changed(self, member):
+        """Whether an ``archive_source.Member`` needs parsing."""
+        row = self.rows.get(member.name)
+        if row is None or row[3] != self.version or row[0] != len(member.data):
+            return True
+        return row[2] != data_digest(member.data)
+
+    def record(self, path, file, extra=None):
+        if isinstance(file, Member):
+            self._store(file.name, len(file.data), file.mtime_ns, data_digest(file.data), extra)
+            return
+        file_path = os.path.join(path, file)
+        try:
+            st = os.stat(file_path)
+            digest = self._digests.pop(file, None) or file_digest(file_path)
+        except OSError:
+            return  # unreadable or gone: left out, so the next run tries it again
+        self._store(file, st.st_size, st.st_mtime_ns, digest, extra)
+
+    def _store(self, file, size, mtime_ns, digest, extra):
+        extra = json.dumps(extra) if extra is not None else None
+        self.db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                        (self.parser, file, size, mtime_ns, digest, self.version, extra, time.time()))
+        self.rows[file] = (size, mtime_ns, digest, self.version, extra)
+        self._pending += 1
+        if self._pending >= 500:
+            self.commit()
+
+    def commit(self):
+        for out in self.outputs:
+            out.flush()
+        self.db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
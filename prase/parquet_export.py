@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Flatten parsed documents to paragraph rows and write them as Parquet.
+
+One row per paragraph: doi, publisher, section_path, level, para_index, text.
+``level`` is the number of titled sections above the paragraph.
+The abstract is written as level 0 under the section path 'Abstract'. The
+output is a hive-partitioned dataset (``<out>/publisher=<key>/part-*.parquet``)
+with the repeated string columns dictionary-encoded, so pandas gets
+categoricals and filters on doi/publisher/section are column scans.
+
+    python parquet_export.py F:\\corpus-parquet F:\\prase-html\\wiley\\data.jsonl ...
+
+    import pyarrow.dataset as ds
+    df = ds.dataset(out, partitioning='hive').to_table(filter=ds.field('publisher') == 'wiley').to_pandas()
+"""
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from dispatch import DOI_PREFIX, SCRIPTS
+from doc_ir import DocIR
+from jsonl_io import iter_jsonl
+
+PATH_SEP = ' > '          # joins the section titles of section_path
+batch_rows = 65536        # rows per record batch handed to the writer
+
+SCHEMA = pa.schema([
+    ('doi', pa.dictionary(pa.int32(), pa.string())),
+    ('publisher', pa.dictionary(pa.int32(), pa.string())),
+    ('section_path', pa.dictionary(pa.int32(), pa.string())),
+    ('level', pa.int8()),
+    ('para_index', pa.int32()),
+    ('text', pa.string()),
+])
+
+
+def _walk(content, titles, level, out):
+    # section_struct content mixes paragraphs, child sections and, for a
+    # heading that sits under a same-level one, bare lists of child content;
+    # untitled wrapper sections add no level
+    for item in content:
+        if isinstance(item, str):
+            out.append((PATH_SEP.join(titles), level, item))
+        elif isinstance(item, dict):
+            title = item.get('sec_title', '')
+            if title:
+                _walk(item.get('content', []), titles + [title], level + 1, out)
+            else:
+                _walk(item.get('content', []), titles, level, out)
+        elif isinstance(item, list):
+            _walk(item, titles, level, out)
+
+
+def flatten_doc(doc):
+    """``(section_path, level, text)`` for every paragraph of a doc_struct dict."""
+    rows = []
+    if doc.get('abstract'):
+        rows.append(('Abstract', 0, doc['abstract']))
+    _walk(doc.get('content', []), [], 0, rows)
+    return rows
+
+
+def publisher_of(doc, default=None):
+    pub = DOI_PREFIX.get((doc.get('doi') or '').split('/', 1)[0])
+    return pub or default or 'unknown'
+
+
+def _batch(cols):
+    arrays = [pa.array(cols[name], type=SCHEMA.field(name).type.value_type).dictionary_encode()
+              for name in ('doi', 'publisher', 'section_path')]
+    arrays += [pa.array(cols['level'], pa.int8()),
+               pa.array(cols['para_index'], pa.int32()),
+               pa.array(cols['text'], pa.string())]
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def iter_batches(sources):
+    """Record batches of paragraph rows from ``(docs, publisher)`` pairs.
+
+    ``docs`` is a JSONL path or an iterable of doc dicts / ``DocIR``.
+    """
+    cols = {name: [] for name in SCHEMA.names}
+    for docs, default_pub in sources:
+        if isinstance(docs, str):
+            docs = iter_jsonl(docs, key='doi')
+        for doc in docs:
+            if isinstance(doc, DocIR):
+                doc = doc.to_dict()
+            doi = doc.get('doi') or doc.get('file', '')
+            pub = publisher_of(doc, default_pub)
+            for i, (section_path, level, text) in enumerate(flatten_doc(doc)):
+                cols['doi'].append(doi)
+                cols['publisher'].append(pub)
+                cols['section_path'].append(section_path)
+                cols['level'].append(level)
+                cols['para_index'].append(i)
+                cols['text'].append(text)
+            if len(cols['text']) >= batch_rows:
+                yield _batch(cols)
+                cols = {name: [] for name in SCHEMA.names}
+    if cols['text']:
+        yield _batch(cols)
+
+
+def export(sources, out_dir):
+    """Write the paragraphs of ``sources`` to a Parquet dataset under ``out_dir``.
+
+    ``sources`` are JSONL files written by the parsers, or ``(path or docs,
+    publisher)`` pairs; the publisher is taken from the DOI prefix when it
+    is known and otherwise from the pair or the name of the file's folder.
+    """
+    pairs = []
+    for src in sources:
+        if isinstance(src, str):
+            folder = os.path.basename(os.path.dirname(os.path.abspath(src)))
+            src = (src, folder if folder in SCRIPTS else None)
+        pairs.append(src)
+    ds.write_dataset(iter_batches(pairs), out_dir, schema=SCHEMA, format='parquet',
+                     partitioning=ds.partitioning(pa.schema([('publisher', pa.string())]), flavor='hive'),
+                     existing_data_behavior='delete_matching',
+                     max_rows_per_group=batch_rows)
+
+
+if __name__ == '__main__':
+    export(sys.argv[2:], sys.argv[1])
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+def region_strainer(classes):
+    """SoupStrainer that keeps only elements carrying one of ``classes``
+    (plus everything inside them)."""
+    wanted = set(classes)
+    # the callable sees the raw attribute value, e.g. 'title hypothesis_container'
+    return SoupStrainer(class_=lambda c: c is not None and not wanted.isdisjoint(c.split()))
+
+
+def parse_regions(markup, classes, required=(), **kwargs):
+    """Build a soup holding only the ``classes`` regions of the page.
+
+    ``required`` is a list of class-name groups; if for any group none of
+    its classes is in the partial tree the whole page is parsed instead, so
+    callers always see at least what a full parse would give them.
+    """
+    soup = BeautifulSoup(markup, 'lxml', parse_only=region_strainer(classes), **kwargs)
+    for group in required:
+        if not any(soup.find(class_=c) is not None for c in group):
+            return BeautifulSoup(markup, 'lxml', **kwargs)
+    return soup
@@ -0,0 +1,409 @@
+# -*- coding: utf-8 -*-
+"""Publisher profiles for the HTML parsers, run by one lxml traversal.
+
+Each publisher is a small dict that lists:
+- where the title, abstract and keywords are (XPath);
+- which elements are body sections;
+- how to walk a section.
+
+``PROFILES`` are compiled once at import. XPaths become ``etree.XPath``
+objects, walk rules become a per-tag dispatch table, and each profile's
+section skip words become one regex. ``parse_doc`` then gives the same
+``(title, abstract, keywords, ids, texts)`` as the script's bs4 ``parse_doc``.
+
+In the XPaths below ``.name`` is shorthand for "has class name". Walk rule
+selectors are ``tag``, ``tag.class``, ``tag^class`` (first class) or
+``tag[attr=value]``; ``h*`` is any of h1-h6. Actions are:
+- ``recurse``: walk the element's children;
+- ``heading:<op>``: a heading item;
+- ``<id>:<op>``: one item with that id;
+- ``list:<op>``: one item per child, the id being the child's tag.
+``<op>`` is a key of ``OPS``.
+"""
+import re
+
+import lxml.html
+from lxml import etree
+
+HEADINGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+NAMESPACES = {'re': 'http://exslt.org/regular-expressions'}
+X_TEXT = etree.XPath('string()', smart_strings=False)
+H2_H6 = '(.//h2|.//h3|.//h4|.//h5|.//h6)[1]'
+
+SECTION_SKIP = ['abbreviation', 'references', 'acknow', 'author information', 'editor information',
+                'rights and permissions', 'copyright information', 'about this paper', 'abstract',
+                'additional information', 'ethics', 'funding', 'notes', 'supplementary', 'about this article',
+                'avail']
+
+
+def _string(x):
+    return x if isinstance(x, str) else X_TEXT(x)
+
+
+def _strings(x):
+    return (x,) if isinstance(x, str) else x.itertext()
+
+
+# bs4 equivalents: .text, .text.replace('\n', ''), .text.strip(), ...,
+# get_text(strip=True) and get_text(separator=' ', strip=True)
+OPS = {
+    'text': _string,
+    'nl': lambda x: _string(x).replace('\n', ''),
+    'strip': lambda x: _string(x).strip(),
+    'nl_strip': lambda x: _string(x).replace('\n', '').strip(),
+    'clean': lambda x: ' '.join(_string(x).split()),
+    'words': lambda x: ''.join(s.strip() for s in _strings(x)),
+    'spaced': lambda x: ' '.join(s for s in (t.strip() for t in _strings(x)) if s),
+}
+
+PROFILES = {
+    'springer': {
+        'require_title': True,
+        'title': [("//h1[.c-article-title]", 'text')],
+        'abstract': {'scope': ["//section[@data-title][contains(@data-title, 'Abstract')]"], 'pick': -1,
+                     'blocks': "(.//div[.c-article-section__content])[1]", 'paras': "(.//p)[1]", 'op': 'nl'},
+        'keywords': {'scope': ["//section[@data-title][contains(@data-title, 'Abstract')]"], 'pick': -1,
+                     'items': "(.//div[.c-article-section__content])[1]//li[.c-article-subject-list__subject]",
+                     'op': 'text'},
+        'sections': "//section[@data-title]",
+        'skip_title': "string(@data-title)",
+        'walk': [('div^c-article-equation__number', 'eq_num:text'), ('div^c-article-equation', 'eq:text'),
+                 ('div', 'recurse'), ('h*', 'heading:text'), ('p', 'p:nl'), ('ol', 'list:nl')],
+    },
+    'mdpi': {
+        'title': [("//h1[@class='title hypothesis_container']", 'strip')],
+        'abstract': {'blocks': "//div[.art-abstract]", 'op': 'nl'},
+        'keywords': {'scope': ["//div[.art-keywords]"], 'single': True,
+                     'items': "(.//span[@itemprop='keywords'])[1]", 'op': 'text', 'split': ';'},
+        'sections': "(//div[.html-body])[1]//section[.//h2[@data-nested='1']]",
+        'walk': [('section', 'recurse'), ('h*', 'heading:text'), ('div.html-p', 'p:nl')],
+    },
+    'wiley': {
+        'title': [("//h1[.citation__title]", 'text')],
+        'abstract': {'scope': ["(//div[.abstract-group])[1]", "(//section[.article-section__abstract])[1]"],
+                     'blocks': ".//section[.article-section__contect or .article-section__abstract]",
+                     'paras': ".//p", 'op': 'nl', 'repeat': True},
+        'sections': "(//section[.article-section__full])[1]//section[.article-section__content]",
+        'walk': [('section', 'recurse'), ('h*', 'heading:strip'), ('p', 'p:nl'), ('ol', 'list:nl')],
+    },
+    'taylor': {
+        'title': [("//span[.hlFld-title]", 'strip')],
+        'abstract': {'scope': ["(//div[.abstractSection])[1]"], 'paras': ".//p[not(.summary-title)]",
+                     'op': 'nl_strip'},
+        'keywords': {'scope': ["//div[.abstractKeywords]"], 'single': True, 'items': ".//a", 'op': 'strip'},
+        'sections': "(//div[.hlFld-Fulltext])[1]/*[.NLM_sec]",
+        'walk': [('div.NLM_sec', 'recurse'), ('h*', 'heading:strip'), ('p', 'p:nl_strip'), ('ul', 'p:nl_strip')],
+    },
+    'sage': {
+        'require': "//article",
+        'title': [("(//article)[1]//h1", 'words'), ("//div[.publicationContentTitle]", 'words'), ("//title", 'text')],
+        'abstract': {'scope': ["(//section[@id='abstract'])[1]"], 'paras': "./p | ./div", 'op': 'spaced',
+                     'join': ' ', 'fallback': "string((//meta[@name='description'])[1]/@content)"},
+        'keywords': {'scope': ["(//section[@id='keywords'])[1]"], 'items': ".//a", 'op': 'words',
+                     'fallback': "string((//meta[@name='keywords'])[1]/@content)", 'fallback_split': ','},
+        'sections': "(//article)[1]//section[re:test(@id, '^sec-[0-9]+$')]",
+        'skip_title': "string(%s)" % H2_H6,
+        'skip': [w if w != 'copyright information' else 'copyright' for w in SECTION_SKIP],
+        'heading_first': 'words',
+        'drop_empty': True,
+        'walk': [('section', 'recurse'), ('p', 'p:spaced'), ('div[role=paragraph]', 'p:spaced')],
+    },
+    'asme': {
+        'title': [("//h1[.article-title-main]", 'clean')],
+        'abstract': {'scope': ["(//section[.abstract])[1]"], 'paras': ".//p", 'op': 'clean', 'join': ' '},
+        'keywords': {'scope': ["(//div[.content-metadata-keywords])[1]"], 'items': ".//a", 'op': 'strip',
+                     'fallback': "//meta[@name='citation_keyword']/@content"},
+        'sections': "//div[.article-section-wrapper][not(.//section[.abstract])]",
+        'flat': {'heading': H2_H6, 'paras': ".//p", 'op': 'clean'},
+        'drop_empty': True,
+    },
+    'iop': {
+        'title': [("string((//meta[@name='citation_title'])[1]/@content)", 'strip')],
+        'abstract': {'scope': ["(//div[.wd-jnl-art-abstract])[1]"], 'paras': ".//p", 'op': 'strip', 'join': ' '},
+        # the body is one flat list: every h2 starts a section
+        'split': {'container': "(//div[@itemprop='articleBody'])[1]", 'at': 'h2',
+                  'headings': ('h3', 'h4', 'h5', 'h6'), 'op': 'strip', 'walk': 'div.article-text'},
+        'walk': [('h*', 'heading:strip'), ('p', 'p:nl'), ('div.article-text', 'recurse')],
+    },
+}
+
+CLASS_TEST = re.compile(r"(?<![\w.\])])\.([A-Za-z_][\w-]*)")
+SELECTOR = re.compile(r"^(\w+|h\*)(?:([.^])([\w-]+)|\[([\w-]+)=([^\]]*)\])?$")
+
+
+def _xpath(expr):
+    expr = CLASS_TEST.sub(lambda m: "contains(concat(' ', normalize-space(@class), ' '), ' %s ')" % m.group(1), expr)
+    return etree.XPath(expr, namespaces=NAMESPACES, smart_strings=False)
+
+
+def _test(kind, name, attr, value):
+    if kind == '.':
+        return lambda el: name in (el.get('class') or '').split()
+    if kind == '^':
+        return lambda el: (el.get('class') or '').split()[:1] == [name]
+    if attr:
+        return lambda el: el.get(attr) == value
+    return None
+
+
+def _compile_walk(rules):
+    """``{tag: [(test or None, action, id, op), ...]}`` in rule order."""
+    table = {}
+    for selector, action in rules:
+        tag, kind, name, attr, value = SELECTOR.match(selector).groups()
+        test = _test(kind, name, attr, value)
+        action, _, op = action.partition(':')
+        entry = (test, action, action, OPS[op] if op else None)
+        for t in (HEADINGS if tag == 'h*' else (tag,)):
+            table.setdefault(t, []).append(entry)
+    return table
+
+
+def _compile_part(spec):
+    part = dict(spec)
+    part['scope'] = [_xpath(x) for x in spec.get('scope', ())]
+    for key in ('blocks', 'paras', 'items', 'fallback'):
+        if key in spec:
+            part[key] = _xpath(spec[key])
+    part['op'] = OPS[spec.get('op', 'text')]
+    return part
+
+
+def compile_profile(spec):
+    prof = {
+        'require': _xpath(spec['require']) if 'require' in spec else None,
+        'require_title': spec.get('require_title', False),
+        'title': [(_xpath(x), OPS[op]) for x, op in spec.get('title', ())],
+        'abstract': _compile_part(spec['abstract']) if 'abstract' in spec else None,
+        'keywords': _compile_part(spec['keywords']) if 'keywords' in spec else None,
+        'sections': _xpath(spec['sections']) if 'sections' in spec else None,
+        'skip_title': _xpath(spec['skip_title']) if 'skip_title' in spec else None,
+        'skip': re.compile('|'.join(map(re.escape, spec.get('skip', SECTION_SKIP)))),
+        'heading_first': OPS[spec['heading_first']] if 'heading_first' in spec else None,
+        'drop_empty': spec.get('drop_empty', False),
+        'walk': _compile_walk(spec.get('walk', ())),
+        'flat': None,
+        'split': None,
+    }
+    if 'flat' in spec:
+        flat = spec['flat']
+        prof['flat'] = (_xpath(flat['heading']), _xpath(flat['paras']), OPS[flat['op']])
+    if 'split' in spec:
+        split = spec['split']
+        tag, kind, name, attr, value = SELECTOR.match(split['walk']).groups()
+        prof['split'] = (_xpath(split['container']), split['at'], set(split['headings']), OPS[split['op']],
+                         tag, _test(kind, name, attr, value))
+    return prof
+
+
+COMPILED = {name: compile_profile(spec) for name, spec in PROFILES.items()}
+
+
+def _children(el, heading_first, ids, texts):
+    if heading_first is None:
+        return iter(el)
+    for child in el:
+        if child.tag in HEADINGS:
+            ids.append(child.tag)
+            texts.append(heading_first(child))
+            return (c for c in el if c is not child)
+    return iter(el)
+
+
+def walk(el, prof, ids, texts):
+    """Append the items under ``el`` to ``ids``/``texts``, depth first, with
+    an explicit stack instead of one Python call per nested container."""
+    table = prof['walk']
+    heading_first = prof['heading_first']
+    stack = [_children(el, heading_first, ids, texts)]
+    while stack:
+        for child in stack[-1]:
+            rules = table.get(child.tag)
+            if rules is None:
+                continue
+            for test, action, item_id, op in rules:
+                if test is None or test(child):
+                    break
+            else:
+                continue
+            if action == 'recurse':
+                stack.append(_children(child, heading_first, ids, texts))
+                break
+            if action == 'heading':
+                ids.append(child.tag)
+                texts.append(op(child))
+            elif action == 'list':
+                for item in child:
+                    if isinstance(item.tag, str):
+                        ids.append(item.tag)
+                        texts.append(op(item))
+            else:
+                ids.append(item_id)
+                texts.append(op(child))
+        else:
+            stack.pop()
+
+
+def _scope(doc, part):
+    if not part['scope']:
+        return doc
+    for x in part['scope']:
+        found = x(doc)
+        if found:
+            return found[part.get('pick', 0)]
+    return None
+
+
+def _abstract(doc, part):
+    scope = _scope(doc, part)
+    texts = []
+    if scope is not None:
+        blocks = part['blocks'](scope) if 'blocks' in part else [scope]
+        op = part['op']
+        for block in blocks:
+            for para in (part['paras'](block) if 'paras' in part else [block]):
+                text = op(para)
+                if part.get('repeat'):
+                    # the Wiley parser adds a paragraph once per child node
+                    text *= (1 if para.text else 0) + sum(1 + (1 if c.tail else 0) for c in para)
+                texts.append(text)
+    abstract = part.get('join', '').join(texts)
+    if not abstract and 'fallback' in part:
+        abstract = part['fallback'](doc).strip()
+    return abstract
+
+
+def _keywords(doc, part):
+    keywords = []
+    if part.get('single'):
+        found = part['scope'][0](doc)
+        scope = found[0] if len(found) == 1 else None
+    else:
+        scope = _scope(doc, part)
+    if scope is not None:
+        op = part['op']
+        for item in part['items'](scope):
+            if 'split' in part:
+                if item.text or len(item):
+                    keywords.extend(k.strip() for k in op(item).split(part['split']))
+            else:
+                keywords.append(op(item))
+    if not keywords and 'fallback' in part:
+        found = part['fallback'](doc)
+        if isinstance(found, str):
+            found = found.split(part['fallback_split'])
+        keywords = [k.strip() for k in found if k.strip()]
+    return keywords
+
+
+def _split_sections(doc, prof, idlst, textlst):
+    container, at, headings, op, walk_tag, walk_test = prof['split']
+    found = container(doc)
+    if not found:
+        return
+    for child in found[0]:
+        tag = child.tag
+        if tag == at or tag in headings:
+            if tag == at or not idlst:
+                idlst.append([])
+                textlst.append([])
+            idlst[-1].append(tag)
+            textlst[-1].append(op(child))
+        elif tag == walk_tag and (walk_test is None or walk_test(child)):
+            ids, texts = [], []
+            walk(child, prof, ids, texts)
+            if ids:
+                if not idlst:
+                    idlst.append([])
+                    textlst.append([])
+                idlst[-1].extend(ids)
+                textlst[-1].extend(texts)
+
+
+ASCII_SPACES = str.maketrans('', '', ' \n\t\f\r')
+X_PRESERVED = etree.XPath('//pre | //pre//* | //textarea | //textarea//*')
+
+
+def _bs4_whitespace(doc):
+    """Collapse whitespace-only strings to '\\n' or ' ' as bs4 does when it
+    builds its tree (except inside pre/textarea)."""
+    keep = set(X_PRESERVED(doc))
+    for el in doc.iter():
+        text = el.text
+        if text and not text.translate(ASCII_SPACES) and isinstance(el.tag, str) and el not in keep:
+            el.text = '\n' if '\n' in text else ' '
+        tail = el.tail
+        if tail and not tail.translate(ASCII_SPACES) and el.getparent() not in keep:
+            el.tail = '\n' if '\n' in tail else ' '
+
+
+def parse_tree(doc, prof):
+    """``(title, abstract, keywords, ids, texts)`` from an lxml.html tree."""
+    if isinstance(prof, str):
+        prof = COMPILED[prof]
+    _bs4_whitespace(doc)
+    # bs4's .text leaves out script/style/template strings
+    etree.strip_elements(doc, 'script', 'style', 'template', with_tail=False)
+    if prof['require'] is not None and not prof['require'](doc):
+        raise ValueError('page has no element matching the profile')
+
+    title = ''
+    for x, op in prof['title']:
+        found = x(doc)
+        if isinstance(found, str):
+            if found:
+                title = op(found)
+                break
+        elif found:
+            title = op(found[0])
+            break
+    else:
+        if prof['require_title']:
+            raise ValueError('no title')
+
+    abstract = _abstract(doc, prof['abstract']) if prof['abstract'] else ''
+    keywords = _keywords(doc, prof['keywords']) if prof['keywords'] else []
+
+    idlst, textlst = [], []
+    if prof['split'] is not None:
+        _split_sections(doc, prof, idlst, textlst)
+    else:
+        skip_title, skip = prof['skip_title'], prof['skip']
+        for sec in prof['sections'](doc):
+            if skip_title is not None and skip.search(skip_title(sec).lower()):
+                continue
+            ids, texts = [], []
+            if prof['flat'] is not None:
+                heading, paras, op = prof['flat']
+                h = heading(sec)
+                if h:
+                    ids.append(h[0].tag)
+                    texts.append(op(h[0]))
+                for p in paras(sec):
+                    text = op(p)
+                    if text:
+                        ids.append('p')
+                        texts.append(text)
+            else:
+                walk(sec, prof, ids, texts)
+            if ids or not prof['drop_empty']:
+                idlst.append(ids)
+                textlst.append(texts)
+    return title, abstract, keywords, idlst, textlst
+
+
+_parsers = {}
+
+
+def parse_doc(markup, profile, encoding='utf-8', timer=None):
+    """Parse ``markup`` (str, or bytes in ``encoding``) with a profile name.
+    A ``doc_timing.DocTimer`` gets the tree building as its 'dom' stage."""
+    if isinstance(markup, str):
+        markup, encoding = markup.encode('utf-8'), 'utf-8'
+    parser = _parsers.get(encoding)
+    if parser is None:
+        parser = _parsers[encoding] = lxml.html.HTMLParser(encoding=encoding)
+    doc = lxml.html.document_fromstring(markup, parser=parser)
+    if timer is not None:
+        timer.mark('dom')
+    return parse_tree(doc, profile)
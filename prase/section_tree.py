@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Build the nested section dicts from the flat ``ids``/``texts`` lists.
+
+Both builders give the same output as the recursive ``section_struct``
+functions the parsers used to carry, but they neither rescan nor slice
+the lists. Three pointer arrays are filled by one right-to-left pass with
+monotonic stacks. From them the smallest heading level in any range,
+and every heading at that level, can be reached by following pointers.
+Each element is then visited a bounded number of times.
+
+Only ids ``h1``..``h6`` count as headings. The old code treated any id
+starting with 'h' as one and raised on ids such as 'hr'.
+"""
+import re
+
+HEADING = re.compile(r'h[1-6]$')
+
+
+def heading_levels(ids):
+    return [int(x[1]) if HEADING.match(x) else 0 for x in ids]
+
+
+class _Headings:
+
+    def __init__(self, levels):
+        n = len(levels)
+        self.n = n
+        self.level = lv = levels
+        self.next_head = nh = [n] * (n + 1)   # first heading at or after i
+        self.lower = lower = [n] * n          # next heading with a smaller level
+        self.upto = upto = [n] * n            # next heading with a smaller or equal level
+        strict, loose = [], []
+        for i in range(n - 1, -1, -1):
+            nh[i] = i if lv[i] else nh[i + 1]
+            if not lv[i]:
+                continue
+            while strict and lv[strict[-1]] >= lv[i]:
+                strict.pop()
+            while loose and lv[loose[-1]] > lv[i]:
+                loose.pop()
+            if strict:
+                lower[i] = strict[-1]
+            if loose:
+                upto[i] = loose[-1]
+            strict.append(i)
+            loose.append(i)
+
+    def first_top(self, lo, hi):
+        """First heading of the smallest level in ``[lo, hi)``, or ``hi``."""
+        r = self.next_head[lo]
+        if r >= hi:
+            return hi
+        while self.lower[r] < hi:
+            r = self.lower[r]
+        return r
+
+
+def _nested(h, texts, lo, hi):
+    sec = {'sec_title': '', 'content': []}
+    content = sec['content']
+    top = h.first_top(lo, hi)
+    if top < hi and h.upto[top] < hi:
+        # several headings share the top level: one child per heading,
+        # anything before the first of them is dropped
+        while top < hi:
+            end = min(h.upto[top], hi)
+            content.append(_nested(h, texts, top, end))
+            top = end
+        return sec
+
+    lv = h.level
+    for i in range(lo, hi):
+        if not lv[i] or i < top:
+            # a heading deeper than the title but before it sent the old
+            # code into endless recursion; keep its text as a paragraph
+            content.append(texts[i])
+        elif i == top:
+            sec['sec_title'] = texts[i]
+        else:
+            # the first deeper heading: its title is not kept, only the
+            # content of the rest of the range, as one nested list
+            content.append(_nested(h, texts, i, hi)['content'])
+            break
+    return sec
+
+
+def section_struct(ids, texts):
+    """Tree of one section in the layout the Springer, MDPI, Wiley, SAGE and
+    Taylor & Francis parsers write (quirks included)."""
+    return _nested(_Headings(heading_levels(ids)), texts, 0, len(ids))
+
+
+def _split(h, texts, lo, hi):
+    content = []
+    top = h.first_top(lo, hi)
+    while top < hi:
+        end = min(h.upto[top], hi)
+        if h.next_head[top + 1] < end:
+            content.append({'sec_title': texts[top], 'content': _split(h, texts, top + 1, end)})
+        else:
+            content.append({'sec_title': texts[top], 'content': texts[top + 1:end]})
+        top = end
+    return content
+
+
+def split_section_struct(ids, texts):
+    """Tree of one section in the layout the ASME and IOP parsers write:
+    every heading becomes a child holding what follows it up to the next
+    heading of the same or a higher level."""
+    return {'sec_title': '', 'content': _split(_Headings(heading_levels(ids)), texts, 0, len(ids))}
+
+
+def section_tree(levels, texts, split=False):
+    """``section_struct`` (or ``split_section_struct``) from heading levels
+    already known, 0 for items that are not headings."""
+    h = _Headings(levels)
+    if split:
+        return {'sec_title': '', 'content': _split(h, texts, 0, len(levels))}
+    return _nested(h, texts, 0, len(levels))
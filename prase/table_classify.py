@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Tell S-N / e-N fatigue data tables from the rest (composition, welding
+parameters, tensile properties...).
+
+``classify_table(tb)`` scores one parsed table, either an ``html_table_parse``
+dict (title/head/body) or an ``elsevier_xml`` one (label/caption/head/body).
+It adds up evidence from:
+- the header and caption vocabulary: cycles, N_f, stress/strain amplitude,
+  Δσ, runout, S-N... Composition, welding and tensile words count against it;
+- the share of numeric body cells;
+- a life column: numbers reaching 10^4 that vary at least threefold;
+- the trend that goes with it: the other numeric columns fall as life grows.
+The sum goes through a logistic, so ``score`` is in 0..1; ``kind`` is
+'S-N' or 'e-N' when score >= ``threshold``, else None. No model and no
+pandas: a table costs a few regex matches per header and cell.
+
+``tag_tables(tables)`` writes both into each dict as 'fatigue' and
+'fatigue_score'.
+"""
+import re
+import math
+
+threshold = 0.5  # score from which a table is tagged S-N/e-N
+
+# (pattern, weight, group): group 'S'/'e' also decides the kind
+VOCABULARY = [(re.compile(p, re.I), w, g) for p, w, g in [
+    (r'\bcycles?\b|cycles to failure|number of cycles', 2.0, None),
+    (r'\bn\s*_?\s*f\b|\bn_?f\b|fatigue life|\blives?\b|\blife\b', 2.0, None),
+    (r'run[\s-]?outs?\b', 1.5, None),
+    (r'\bs\s*[-–]\s*n\b|w[öo]e?hler|endurance|fatigue', 1.5, None),
+    (r'stress amplitude|stress range|[δΔ]\s*σ|σ\s*_?\s*(?:a|max|amp)\b|\bs\s*_?\s*a\b|max(?:imum)?\.?\s+stress', 2.0, 'S'),
+    (r'strain amplitude|strain range|total strain|[δΔ]\s*ε|ε\s*_?\s*(?:a|amp|t)\b|\b[εe]\s*[-–]\s*n\b|mm/mm', 2.0, 'e'),
+    (r'\bamp(?:litude)?\b', 0.5, None),
+    (r'\br\s*=|load ratio|stress ratio|strain ratio|\bfrequency\b|\bhz\b', 0.5, None),
+    (r'composition|chemical|wt\.?\s*%|at\.?\s*%|\bbal(?:ance)?\.?$', -3.0, None),
+    (r'voltage|current|welding speed|travel speed|heat input|wire feed|shielding|interpass|preheat', -2.0, None),
+    (r'hardness|grain size|yield strength|tensile strength|elongation|young|reduction of area', -1.0, None),
+]]
+ELEMENT = re.compile(r'^(?:c|si|mn|cr|ni|mo|cu|al|ti|fe|v|nb|p|s|n|co|w|mg|zn|zr|b|o|h)$', re.I)
+NUMBER = re.compile(r'^[~≈<>≤≥]?\s*([-+−]?\d[\d,]*(?:\.\d+)?)\s*(?:[eE]\s*([-+−]?\d+)|[×x·*]\s*10\s*\^?\s*([-+−⁻]?[\d⁰¹²³⁴⁵⁶⁷⁸⁹]+))?')
+SUPERSCRIPT = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁻−', '0123456789--')
+
+BIAS = 3.0          # evidence needed for a score of 0.5
+LIFE_MIN = 1e4      # a life column reaches at least this many cycles
+
+
+def number(cell):
+    """The leading number of a cell (``350 ± 12``, ``2.1×10⁶``, ``1.5E+05``), or None."""
+    m = NUMBER.match(cell.strip())
+    if m is None:
+        return None
+    mantissa, e1, e2 = m.groups()
+    try:
+        value = float(mantissa.replace(',', '').replace('−', '-'))
+        exp = e1 or e2
+        return value * 10 ** int(exp.translate(SUPERSCRIPT)) if exp else value
+    except (ValueError, OverflowError):
+        return None
+
+
+def _ranks(values):
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    for rank, i in enumerate(order):
+        ranks[i] = float(rank)
+    return ranks
+
+
+def _spearman(xs, ys):
+    n = len(xs)
+    if n < 3:
+        return 0.0
+    rx, ry = _ranks(xs), _ranks(ys)
+    mean = (n - 1) / 2
+    cov = sum((a - mean) * (b - mean) for a, b in zip(rx, ry))
+    var = sum((a - mean) ** 2 for a in rx)
+    return cov / var if var else 0.0
+
+
+def _text(tb):
+    parts = [tb.get('title') or '', tb.get('label') or '', tb.get('caption') or '']
+    parts += [str(c) for row in tb.get('head') or () for c in row]
+    return ' \n '.join(p for p in parts if p)
+
+
+def classify_table(tb):
+    """``(score, kind)`` of one parsed table; kind is 'S-N', 'e-N' or None."""
+    text = _text(tb)
+    evidence = 0.0
+    group = {'S': 0.0, 'e': 0.0}
+    for pattern, weight, g in VOCABULARY:
+        if pattern.search(text):
+            evidence += weight
+            if g:
+                group[g] += weight
+    head_cells = [str(c).strip() for row in tb.get('head') or () for c in row]
+    if sum(bool(ELEMENT.match(c)) for c in set(head_cells)) >= 3:
+        evidence -= 3.0  # C, Si, Mn, ... columns
+
+    body = [[number(str(c)) if c is not None else None for c in row] for row in tb.get('body') or ()]
+    cells = [v for row in body for v in row]
+    filled = sum(1 for row in tb.get('body') or () for c in row if c is not None and str(c).strip())
+    density = sum(v is not None for v in cells) / filled if filled else 0.0
+    evidence += 2.0 * density - 1.0
+
+    width = max((len(r) for r in body), default=0)
+    columns = [[row[c] if c < len(row) else None for row in body] for c in range(width)]
+    for life in columns:
+        values = [v for v in life if v is not None and v > 0]
+        if len(values) < 3 or max(values) < LIFE_MIN or max(values) / min(values) < 3:
+            continue
+        evidence += 1.5
+        # stress/strain falls as life grows
+        trend = 0.0
+        for other in columns:
+            if other is life:
+                continue
+            pairs = [(a, b) for a, b in zip(other, life) if a is not None and b is not None]
+            if len(pairs) >= 3 and len({a for a, _ in pairs}) > 1:
+                trend = min(trend, _spearman([a for a, _ in pairs], [b for _, b in pairs]))
+        if trend <= -0.6:
+            evidence += 1.5
+        break
+    if len(body) < 3:
+        evidence -= 1.0
+
+    score = 1 / (1 + math.exp(BIAS - evidence))
+    if score < threshold:
+        return score, None
+    # strain-life tables often list the stress response too, S-N ones hardly ever a strain
+    return score, 'e-N' if group['e'] else 'S-N'
+
+
+def tag_tables(tables):
+    """Set 'fatigue' ('S-N', 'e-N' or None) and 'fatigue_score' on each table."""
+    for tb in tables:
+        score, kind = classify_table(tb)
+        tb['fatigue'] = kind
+        tb['fatigue_score'] = round(score, 3)
+    return tables
+
+
+def fatigue_tables(tables):
+    """The tables ``classify_table`` takes for S-N/e-N data."""
+    return [tb for tb in tables if classify_table(tb)[1] is not None]
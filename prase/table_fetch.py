@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Fetch the pages behind Springer's "pill-button" table links.
+
+``TableFetcher.fetch(urls)`` downloads a batch of pages concurrently over
+one aiohttp session. Connections are kept alive between batches, with at
+most ``per_host`` open per host and ``limit`` in total. Every page is kept
+in ``<cache_dir>/cache.sqlite``, keyed by URL, along with its ETag and
+Last-Modified headers. A later run sends If-None-Match/If-Modified-Since,
+and a 304 reply reuses the cached page. A page fetched less than
+``max_age`` seconds ago is not revalidated at all. With ``offline=True``
+(cache-only) the network is never used: cached pages are returned and the
+rest come back as None. If a fetch fails, the stale cached copy is used
+when there is one.
+
+``check_table_fetch.py`` runs it against a local HTTP server.
+"""
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import asyncio
+
+USER_AGENT = 'Mozilla/5.0 (compatible; prase table fetcher)'
+
+
+class TableFetcher:
+    def __init__(self, cache_dir, per_host=4, limit=16, timeout=15, offline=False, max_age=0):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'cache.sqlite'))
+        self.db.execute('''CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, fetched REAL)''')
+        self.per_host = per_host
+        self.limit = limit
+        self.timeout = timeout
+        self.offline = offline
+        self.max_age = max_age
+        self.stats = {'hit': 0, 'revalidated': 0, 'fetched': 0, 'missed': 0, 'failed': 0}
+        self.loop = None
+        self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _cached(self, url):
+        row = self.db.execute('SELECT etag, last_modified, body, fetched FROM pages WHERE url = ?',
+                              (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body, fetched = row
+        return etag, last_modified, zlib.decompress(body).decode('utf-8'), fetched
+
+    def fetch(self, urls):
+        """``{url: page text or None}`` for ``urls``; failures are warned about."""
+        pages = {}
+        todo = []
+        for url in dict.fromkeys(urls):
+            row = self._cached(url)
+            if self.offline or (row is not None and time.time() - row[3] < self.max_age):
+                pages[url] = row[2] if row is not None else None
+                self.stats['hit' if row is not None else 'missed'] += 1
+            else:
+                todo.append((url, row))
+        if todo:
+            if self.loop is None:
+                # one loop for the fetcher's lifetime, so the session's connections stay open
+                self.loop = asyncio.new_event_loop()
+            pages.update(self.loop.run_until_complete(self._fetch_all(todo)))
+            self.db.commit()
+        return pages
+
+    async def _fetch_all(self, todo):
+        if self.session is None:
+            import aiohttp
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.per_host),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT})
+        return dict(await asyncio.gather(*(self._get(url, row) for url, row in todo)))
+
+    async def _get(self, url, row):
+        headers = {}
+        if row is not None:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        try:
+            async with self.session.get(url, headers=headers) as resp:
+                if resp.status == 304 and row is not None:
+                    self.db.execute('UPDATE pages SET fetched = ? WHERE url = ?', (time.time(), url))
+                    self.stats['revalidated'] += 1
+                    return url, row[2]
+                resp.raise_for_status()
+                body = await resp.read()
+                text = body.decode(resp.charset or 'utf-8', 'replace')
+                self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                                (url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'),
+                                 zlib.compress(text.encode('utf-8')), time.time()))
+                self.stats['fetched'] += 1
+                return url, text
+        except Exception as e:
+            print(f'WARNING  {url}: {e!r}' + (' (using the cached copy)' if row is not None else ''),
+                  file=sys.stderr)
+            self.stats['failed'] += 1
+            return url, row[2] if row is not None else None
+
+    def close(self):
+        if self.session is not None:
+            self.loop.run_until_complete(self.session.close())
+        if self.loop is not None:
+            self.loop.close()
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Numeric table cells as typed values, written to Parquet.
+
+    python table_values.py F:\\table-values F:\\html\\springer\\data_table.json F:\\elsevier-xml ...
+
+Sources are ``data_table.json`` files written by ``html_table_parse.py``,
+and folders or archives of Elsevier XML (their tables are read with
+``elsevier_xml.extract_tables``). All body cells of all tables are
+normalized in one pass of pandas string operations:
+- ``−`` becomes ``-`` and thousands separators are dropped;
+- superscript exponents become ``^``, and ``2.1×10^6``/``2.1 x 10⁶`` become ``2.1e6``;
+- ``+/-`` and ``+-`` become ``±``.
+The result is matched as value, optional uncertainty and optional unit
+(MPa, GPa, ksi, Hz, kHz, cycles, %).
+
+A column is numeric when at least ``numeric_share`` of its non-empty cells
+parse. Its unit is the most common unit on its cells, else the unit named
+in its header (``Stress (MPa)``, ``N [cycles]``). One row is written per
+parsed cell of a numeric column:
+- doi, publisher, table_index, row, col;
+- header, text;
+- value and err (float64), unit.
+Elsevier files are keyed by their file name (the PII), not a DOI. The output is a
+hive-partitioned dataset by publisher, like ``parquet_export.py``:
+
+    import pyarrow.dataset as ds
+    t = ds.dataset(out, partitioning='hive').to_table(filter=ds.field('unit') == 'MPa')
+"""
+import io
+import os
+import re
+import sys
+import json
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from archive_source import Member
+from batch_runner import list_inputs
+from parquet_export import publisher_of
+
+numeric_share = 0.6  # share of a column's non-empty cells that must parse for it to count as numeric
+
+UNITS = r'MPa|GPa|ksi|kHz|Hz|cycles?|%'
+NUMBER = r'(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+CELL = re.compile(rf'^(?P<value>[-+]?{NUMBER})\s*(?:±\s*(?P<err>{NUMBER}))?\s*(?P<unit>{UNITS})?$', re.I)
+HEADER_UNIT = re.compile(rf'[(\[]\s*(?P<unit>{UNITS})\s*[)\]]', re.I)
+SUPERSCRIPT = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁺⁻', '0123456789+-')
+CANONICAL = {'mpa': 'MPa', 'gpa': 'GPa', 'ksi': 'ksi', 'khz': 'kHz', 'hz': 'Hz',
+             'cycle': 'cycles', 'cycles': 'cycles', '%': '%'}
+
+SCHEMA = pa.schema([
+    ('doi', pa.dictionary(pa.int32(), pa.string())),
+    ('publisher', pa.dictionary(pa.int32(), pa.string())),
+    ('table_index', pa.int32()),
+    ('row', pa.int32()),
+    ('col', pa.int32()),
+    ('header', pa.dictionary(pa.int32(), pa.string())),
+    ('text', pa.string()),
+    ('value', pa.float64()),
+    ('err', pa.float64()),
+    ('unit', pa.dictionary(pa.int32(), pa.string())),
+])
+
+
+def normalize(text):
+    """The cells of the Series ``text`` rewritten into what ``CELL`` reads."""
+    s = text.str.strip()
+    s = s.str.replace(r'[⁺⁻]?[⁰¹²³⁴⁵⁶⁷⁸⁹]+', lambda m: '^' + m.group(0).translate(SUPERSCRIPT), regex=True)
+    s = s.str.replace('−', '-', regex=False)
+    s = s.str.replace(r'(?<=\d),(?=\d{3}(?!\d))', '', regex=True)
+    s = s.str.replace(r'\s*[×xX*·]\s*10\s*\^\s*', 'e', regex=True)
+    s = s.str.replace(r'^10\s*\^\s*', '1e', regex=True)
+    return s.str.replace(r'\+/-|\+-', '±', regex=True)
+
+
+def parse_cells(text):
+    """value, err (float) and unit (canonical spelling) of the Series ``text``."""
+    parts = normalize(text).str.extract(CELL)
+    return pd.DataFrame({
+        'value': pd.to_numeric(parts['value'], errors='coerce'),
+        'err': pd.to_numeric(parts['err'], errors='coerce'),
+        'unit': parts['unit'].str.lower().map(CANONICAL),
+    }, index=text.index)
+
+
+def header_unit(header):
+    m = HEADER_UNIT.search(header)
+    return CANONICAL[m.group('unit').lower()] if m else None
+
+
+def _column_headers(head, width):
+    headers = []
+    for c in range(width):
+        parts = []
+        for row in head:
+            cell = str(row[c]).strip() if c < len(row) else ''
+            if cell and cell not in parts:
+                parts.append(cell)
+        headers.append(' / '.join(parts))
+    return headers
+
+
+def table_values(tables):
+    """Typed rows for ``tables``, a list of ``(doi, publisher, table_index,
+    head, body)``, as a DataFrame with the columns of ``SCHEMA``."""
+    keys, cells, headers = [], [], {}
+    for t, (doi, pub, index, head, body) in enumerate(tables):
+        keys.append((doi, pub, index))
+        width = max((len(r) for r in list(head) + list(body)), default=0)
+        for c, header in enumerate(_column_headers(head, width)):
+            headers[t, c] = header
+        for r, row in enumerate(body):
+            for c, cell in enumerate(row):
+                cells.append((t, r, c, '' if cell is None else str(cell)))
+    df = pd.DataFrame(cells, columns=['t', 'row', 'col', 'text'])
+    df = df[df['text'].str.strip() != '']
+    df = df.join(parse_cells(df['text']))
+
+    parsed = df['value'].notna()
+    share = parsed.groupby([df['t'], df['col']]).mean()
+    numeric = share[share >= numeric_share].index
+    df = df[parsed & pd.MultiIndex.from_arrays([df['t'], df['col']]).isin(numeric)].copy()
+
+    # column unit: the most common one on its cells, else the header's
+    col_unit = df.dropna(subset=['unit']).groupby(['t', 'col'])['unit'].agg(lambda u: u.mode().iat[0])
+    columns = {k: (headers.get(k, ''), col_unit.get(k) or header_unit(headers.get(k, '')))
+               for k in numeric}
+    where = list(zip(df['t'], df['col']))
+    df['header'] = [columns[k][0] for k in where]
+    df['unit'] = df['unit'].fillna(pd.Series([columns[k][1] for k in where], index=df.index, dtype=object))
+
+    key = pd.DataFrame(keys, columns=['doi', 'publisher', 'table_index'])
+    df = df.join(key, on='t')
+    return df[SCHEMA.names].reset_index(drop=True)
+
+
+def _json_tables(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    folder = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    for paper_id, item in data.items():
+        doi = paper_id.replace('_', '/').replace(':', '_')
+        pub = publisher_of({'doi': doi}, folder)
+        for i, tb in enumerate(item['tables']):
+            yield doi, pub, i, tb['head'], tb['body']
+
+
+def _xml_tables(path):
+    from elsevier_xml import extract_tables
+    for item in list_inputs(path, '.xml'):
+        if isinstance(item, Member):
+            name, src = item.name, io.BytesIO(item.data)
+        else:
+            name, src = item, open(os.path.join(path, item), 'rb')
+        with src:
+            tables = extract_tables(src)
+        for i, tb in enumerate(tables):
+            yield os.path.splitext(name)[0], 'elsevier', i, tb['head'], tb['body']
+
+
+def iter_tables(sources):
+    for src in sources:
+        if src.endswith('.json'):
+            yield from _json_tables(src)
+        else:
+            yield from _xml_tables(src)
+
+
+def _batches(sources, per_batch=2000):
+    batch = []
+    for table in iter_tables(sources):
+        batch.append(table)
+        if len(batch) >= per_batch:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export(sources, out_dir):
+    """Write the numeric cells of the tables in ``sources`` under ``out_dir``."""
+    def record_batches():
+        for batch in _batches(sources):
+            df = table_values(batch)
+            if len(df):
+                yield pa.RecordBatch.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    ds.write_dataset(record_batches(), out_dir, schema=SCHEMA, format='parquet',
+                     partitioning=ds.partitioning(pa.schema([('publisher', pa.string())]), flavor='hive'),
+                     existing_data_behavior='delete_matching')
+
+
+if __name__ == '__main__':
+    export(sys.argv[2:], sys.argv[1])
@@ -1,68 +1,93 @@
+import io
 import os
-import xml.etree.ElementTree as ET
 import json
-import re
-
-input_folder = r'F:\elsevier-xml'  # input
-output_txt_folder = r'F:\prase-xml'  # output
-output_json_folder = os.path.join(output_txt_folder, 'json')
-
-os.makedirs(output_txt_folder, exist_ok=True)
-os.makedirs(output_json_folder, exist_ok=True)
-
-ns = {
-    'dcterms': 'http://purl.org/dc/terms/',
-    'dc': 'http://purl.org/dc/elements/1.1/',
-    'ce': 'http://www.elsevier.com/xml/common/dtd',
-    'xocs': 'http://www.elsevier.com/xml/xocs/dtd'
-}
-
-def clean_text(text):
-    text = re.sub(r'\n\s*\n', '\n', text)
-    text = re.sub(r'\s{2,}', ' ', text)
-    return text.strip()
-
-for filename in os.listdir(input_folder):
-    if filename.endswith('.xml'):
-        input_file = os.path.join(input_folder, filename)
-
-        tree = ET.parse(input_file)
-        root = tree.getroot()
-
-        title = root.find('.//dc:title', ns).text if root.find('.//dc:title', ns) is not None and root.find(
-            './/dc:title', ns).text is not None else ''
-        abstract = clean_text(root.find('.//dc:description', ns).text) if root.find('.//dc:description',
-                                                                                    ns) is not None and root.find(
-            './/dc:description', ns).text is not None else ''
-        keywords = [kw.text for kw in root.findall('.//dcterms:subject', ns) if kw is not None and kw.text is not None]
-
-        raw_text_elem = root.find('.//xocs:rawtext', ns)
-        if raw_text_elem is not None and raw_text_elem.text is not None:
-            body_content = clean_text(raw_text_elem.text)
-        else:
-            body_content_list = []
-            for section in root.findall('.//ce:section', ns):
-                section_text = ''.join(section.itertext()) if section is not None else ''
-                if section_text:
-                    body_content_list.append(clean_text(section_text))
-            body_content = '\n\n'.join(body_content_list) if body_content_list else 'No body content found'
-
-
-
-        output_txt_file = os.path.join(output_txt_folder, f"{os.path.splitext(filename)[0]}.txt")
-        output_json_file = os.path.join(output_json_folder, f"{os.path.splitext(filename)[0]}.json")
-
-        with open(output_txt_file, 'w', encoding='utf-8') as file:
-            file.write(f"Title: {title}\n\n")
-            file.write(f"Abstract: {abstract}\n\n")
-            file.write("Keywords: " + ", ".join(keywords) + "\n\n")
-            file.write(body_content)
 
-        data = {"Title": title, "Abstract": abstract, "Keywords": keywords, "Body Content": body_content}
-
-        with open(output_json_file, 'w', encoding='utf-8') as json_file:
-            json.dump(data, json_file, ensure_ascii=False, indent=4)
-
-        print(f"Parsing completed：{filename}")
-
-print(f"Literature parsing completed and saved to {output_txt_folder} and {output_json_folder}")
+from archive_source import Member
+from batch_runner import list_inputs
+from doc_store import ShardWriter, open_output
+from elsevier_xml import extract, extract_all, table_lines
+from table_classify import tag_tables
+from manifest import Manifest
+
+PARSER_VERSION = 2  # bump when the parsing logic changes, forces a full rerun
+incremental = 1    # Set to 1 to skip inputs unchanged since the last run
+metadata_only = 0  # Set to 1 to read only title/abstract/keywords (stops before the body)
+iftable = 1        # Set to 1 to also write the CALS tables (replaces running xml-table-prase.py)
+fatigue_tables_only = 0  # Set to 1 to write only the tables tagged S-N/e-N to the txt (all stay in the JSON)
+sharded = 0        # Set to 1 to pack the txt/JSON files into compressed shards (doc_store.py)
+
+
+def process_file(input_folder, output_txt_folder, output_json_folder, filename, data=None):
+    input_file = os.path.join(input_folder, filename)
+    packed = [] if sharded else None
+
+    tables = []
+    # data: the file's bytes, when it comes out of an archive
+    with (io.BytesIO(data) if data is not None else open(input_file, 'rb')) as f:
+        if iftable and not metadata_only:
+            title, abstract, keywords, body_content, tables = extract_all(f)
+            tag_tables(tables)
+        else:
+            title, abstract, keywords, body_content = extract(f, metadata_only=metadata_only)
+
+    output_txt_file = f"{os.path.splitext(filename)[0]}.txt"
+    # named relative to the txt folder, so the shards export back into json/
+    output_json_file = os.path.join(os.path.relpath(output_json_folder, output_txt_folder),
+                                    f"{os.path.splitext(filename)[0]}.json")
+
+    with open_output(output_txt_folder, output_txt_file, packed) as file:
+        file.write(f"Title: {title}\n\n")
+        file.write(f"Abstract: {abstract}\n\n")
+        file.write("Keywords: " + ", ".join(keywords) + "\n\n")
+        file.write(body_content)
+        txt_tables = [tb for tb in tables if tb['fatigue']] if fatigue_tables_only else tables
+        if txt_tables:
+            file.write('\n')
+            for tb in txt_tables:
+                file.write('\n'.join(table_lines(tb)) + '\n')
+
+    data = {"Title": title, "Abstract": abstract, "Keywords": keywords}
+    if not metadata_only:
+        data["Body Content"] = body_content
+    if tables:
+        data["Tables"] = tables
+
+    with open_output(output_txt_folder, output_json_file, packed) as json_file:
+        json.dump(data, json_file, ensure_ascii=False, indent=4)
+
+    print(f"Parsing completed：{filename}")
+    return packed
+
+
+if __name__ == '__main__':
+    input_folder = r'F:\elsevier-xml'  # input: folder, or a zip / tar.gz / tar.zst / WARC of the XML files
+    output_txt_folder = r'F:\prase-xml'  # output
+    output_json_folder = os.path.join(output_txt_folder, 'json')
+
+    os.makedirs(output_txt_folder, exist_ok=True)
+    os.makedirs(output_json_folder, exist_ok=True)
+
+    files = list_inputs(input_folder, '.xml')
+    # the outputs depend on the switches too
+    version = f'{PARSER_VERSION}-{metadata_only}-{iftable}-{fatigue_tables_only}'
+    manifest = Manifest(os.path.join(output_txt_folder, 'manifest.sqlite'), 'xml-prase.py', version) if incremental else None
+    if manifest is not None:
+        files = manifest.changed(input_folder, files)
+
+    store = ShardWriter(os.path.join(output_txt_folder, 'shards'), append=incremental) if sharded else None
+
+    for item in files:
+        if isinstance(item, Member):
+            packed = process_file(input_folder, output_txt_folder, output_json_folder, item.name, item.data)
+        else:
+            packed = process_file(input_folder, output_txt_folder, output_json_folder, item)
+        for name, text in packed or ():
+            store.put(name, text)
+        if manifest is not None:
+            manifest.record(input_folder, item)
+    if store is not None:
+        store.close()
+    if manifest is not None:
+        manifest.close()
+
+    print(f"Literature parsing completed and saved to {output_txt_folder} and {output_json_folder}")
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Drive ExtractionEngine's retry and circuit-breaker paths with a fake client.
+
+    python check_llm_engine.py
+
+The fake client answers from a script of outcomes (200, 429, 500, or an
+exception that is not an openai error), so no network or API key is needed.
+Each case must finish within a few seconds and leave the breaker closed, or
+open with no probe outstanding.
+"""
+import sys
+import asyncio
+from types import SimpleNamespace
+
+import openai
+
+from llm_engine import ExtractionEngine, CircuitBreaker
+
+MESSAGES = [{'role': 'system', 'content': 'extract'}, {'role': 'user', 'content': 'document'}]
+
+
+def fake_response(status, headers=None):
+    # duck-types the httpx response the openai errors read
+    return SimpleNamespace(status_code=status, headers=headers or {}, request=None)
+
+
+def completion():
+    return openai.types.chat.ChatCompletion.model_validate({
+        'id': 'x', 'object': 'chat.completion', 'created': 0, 'model': 'fake',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'ok'}}],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 1, 'total_tokens': 11}})
+
+
+class FakeClient:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kw):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        await asyncio.sleep(0.01)
+        if outcome == 429:
+            raise openai.RateLimitError('slow down', response=fake_response(429, {'retry-after': '0'}), body=None)
+        if outcome == 500:
+            raise openai.InternalServerError('boom', response=fake_response(500), body=None)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion()
+
+
+def engine(outcomes):
+    return ExtractionEngine(FakeClient(outcomes), 'fake', rpm=0, max_tokens=10, max_retries=5,
+                            backoff=0.01, breaker=CircuitBreaker(2, 0.1))
+
+
+async def probe_429():
+    e = engine([500, 500, 429])
+    response = await asyncio.wait_for(e.complete(MESSAGES), 5)
+    return response is not None and e.breaker.opened_at is None and not e.breaker.probing
+
+
+async def probe_429_many_workers():
+    e = engine([500, 500, 429, 429])
+    results = await asyncio.wait_for(asyncio.gather(*(e.complete(MESSAGES) for _ in range(6))), 10)
+    return all(r is not None for r in results) and not e.breaker.probing
+
+
+async def probe_other_exception():
+    e = engine([500, 500, RuntimeError('not an openai error')])
+    try:
+        await asyncio.wait_for(e.complete(MESSAGES), 5)
+    except RuntimeError:
+        pass
+    else:
+        return False
+    # the breaker is still open, but the next call may probe again and closes it
+    response = await asyncio.wait_for(e.complete(MESSAGES), 5)
+    return response is not None and e.breaker.opened_at is None and not e.breaker.probing
+
+
+async def probe_cancelled():
+    e = engine([500, 500])
+    await asyncio.wait_for(e.complete(MESSAGES), 5)  # 500, 500, then the probe closes it
+    e.breaker.failures = 0
+    e.client.outcomes = [500, 500]
+    e.max_retries = 2
+    await asyncio.wait_for(e.complete(MESSAGES), 5)  # fails twice: breaker open
+    await asyncio.sleep(0.15)
+    task = asyncio.ensure_future(e.complete(MESSAGES))  # becomes the probe
+    await asyncio.sleep(0.005)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    return not e.breaker.probing
+
+
+async def main():
+    ok = True
+    for name, case in [('probe answered with 429', probe_429),
+                       ('probe 429 with 6 workers waiting', probe_429_many_workers),
+                       ('probe raising a non-openai error', probe_other_exception),
+                       ('probe cancelled', probe_cancelled)]:
+        try:
+            passed = await case()
+        except asyncio.TimeoutError:
+            passed = False
+        print(f"{'ok  ' if passed else 'FAIL'} {name}")
+        ok &= passed
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if asyncio.run(main()) else 1)
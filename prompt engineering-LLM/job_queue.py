@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Durable queue of extraction jobs, one row per input file.
+
+``JobQueue(path)`` is a SQLite file (``jobs.sqlite`` in the output folder).
+Each job has a state:
+- ``pending``: not run yet, or its input, the ``version`` (a fingerprint of
+  the prompt and model settings) or its output file changed since;
+- ``running``: claimed by a worker;
+- ``done``: written to ``output_path``;
+- ``failed``: its last attempt failed, with ``last_error`` saying why.
+
+It also has an attempt count. A failed job is tried again, ``retry_delay``
+seconds later at the earliest, until it has had ``max_attempts`` attempts.
+
+Several workers (processes, or machines sharing the folder) can run on the
+same queue. ``claim()`` takes a job inside one ``BEGIN IMMEDIATE``
+transaction, so no job goes to two workers. A running worker refreshes the
+heartbeat of its jobs (``heartbeat()``). A job whose heartbeat is older than
+``lease`` seconds belongs to a worker that was killed. It is marked failed
+and retried like any other failed job. ``next_retry()`` counts those leases
+too, so a run restarted right after a kill waits for them instead of
+exiting. Restarting the script therefore resumes exactly where it stopped.
+
+All methods may be called from any thread (the script runs them through
+``asyncio.to_thread``, so a busy database never stalls the event loop).
+"""
+import os
+import time
+import socket
+import sqlite3
+import threading
+from functools import wraps
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+def _locked(method):
+    # one connection shared by threads: one statement or transaction at a time
+    @wraps(method)
+    def call(self, *args):
+        with self.lock:
+            return method(self, *args)
+    return call
+
+
+class JobQueue:
+    def __init__(self, path, max_attempts=3, retry_delay=60.0, lease=300.0, version=''):
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None,  # transactions are explicit
+                                  check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS jobs (
+            name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, state TEXT,
+            attempts INTEGER, last_error TEXT, output_path TEXT,
+            worker TEXT, heartbeat REAL, not_before REAL, updated REAL, version TEXT)''')
+        if 'version' not in [r[1] for r in self.db.execute('PRAGMA table_info(jobs)')]:
+            self.db.execute('ALTER TABLE jobs ADD COLUMN version TEXT')  # queues made before the column
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)')
+        self.version = str(version)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @_locked
+    def add(self, path, files):
+        """Queue ``files`` (names inside ``path``). A done or failed file is
+        queued again, with a fresh attempt count, when its size/mtime or the
+        queue's ``version`` changed, or (done) when its output file is gone."""
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            rows = {r[0]: r[1:] for r in self.db.execute(
+                'SELECT name, size, mtime_ns, state, version, output_path FROM jobs')}
+            for file in files:
+                st = os.stat(os.path.join(path, file))
+                row = rows.get(file)
+                if row is None:
+                    self.db.execute('INSERT INTO jobs VALUES (?, ?, ?, ?, 0, NULL, NULL, NULL, NULL, 0, ?, ?)',
+                                    (file, st.st_size, st.st_mtime_ns, PENDING, now, self.version))
+                elif row[2] != RUNNING and ((row[0], row[1]) != (st.st_size, st.st_mtime_ns) or row[3] != self.version
+                                            or (row[2] == DONE and not os.path.exists(row[4] or ''))):
+                    self.db.execute('''UPDATE jobs SET size = ?, mtime_ns = ?, state = ?, attempts = 0,
+                                       last_error = NULL, not_before = 0, updated = ?, version = ? WHERE name = ?''',
+                                    (st.st_size, st.st_mtime_ns, PENDING, now, self.version, file))
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+    @_locked
+    def claim(self):
+        """Take the next runnable job for this worker; its name, or None."""
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            self.db.execute('''UPDATE jobs SET state = ?, last_error = 'worker ' || worker || ' stopped responding',
+                               not_before = 0, updated = ? WHERE state = ? AND heartbeat < ?''',
+                            (FAILED, now, RUNNING, now - self.lease))
+            row = self.db.execute('''SELECT name FROM jobs
+                WHERE state = ? OR (state = ? AND attempts < ? AND not_before <= ?)
+                ORDER BY attempts, name LIMIT 1''', (PENDING, FAILED, self.max_attempts, now)).fetchone()
+            if row is not None:
+                self.db.execute('''UPDATE jobs SET state = ?, attempts = attempts + 1, worker = ?,
+                                   heartbeat = ?, updated = ? WHERE name = ?''',
+                                (RUNNING, self.worker, now, now, row[0]))
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        return row[0] if row is not None else None
+
+    # the `worker = ?` guards: a job taken over after its lease ran out belongs to the new worker
+
+    @_locked
+    def done(self, name, output_path):
+        self.db.execute('''UPDATE jobs SET state = ?, output_path = ?, last_error = NULL, updated = ?
+                           WHERE name = ? AND worker = ?''', (DONE, output_path, time.time(), name, self.worker))
+
+    @_locked
+    def fail(self, name, error):
+        now = time.time()
+        self.db.execute('''UPDATE jobs SET state = ?, last_error = ?, not_before = ?, updated = ?
+                           WHERE name = ? AND worker = ?''',
+                        (FAILED, str(error)[:2000], now + self.retry_delay, now, name, self.worker))
+
+    @_locked
+    def release(self, name):
+        """Hand a claimed job back untouched (e.g. on Ctrl+C), without using up an attempt."""
+        self.db.execute('''UPDATE jobs SET state = ?, attempts = attempts - 1, updated = ?
+                           WHERE name = ? AND state = ? AND worker = ?''', (PENDING, time.time(), name, RUNNING, self.worker))
+
+    @_locked
+    def heartbeat(self):
+        self.db.execute('UPDATE jobs SET heartbeat = ? WHERE state = ? AND worker = ?',
+                        (time.time(), RUNNING, self.worker))
+
+    @_locked
+    def next_retry(self):
+        """Seconds until a failed job may be retried, or a running job of another
+        worker may be taken over if its lease runs out; None when neither will happen."""
+        row = self.db.execute('''SELECT MIN(t) FROM (
+            SELECT MIN(not_before) AS t FROM jobs WHERE state = ? AND attempts < ?
+            UNION ALL SELECT MIN(heartbeat) + ? FROM jobs WHERE state = ? AND worker != ?)''',
+                              (FAILED, self.max_attempts, self.lease, RUNNING, self.worker)).fetchone()
+        return None if row[0] is None else max(row[0] - time.time(), 0.0)
+
+    @_locked
+    def counts(self):
+        return dict(self.db.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+
+    @_locked
+    def close(self):
+        self.db.close()
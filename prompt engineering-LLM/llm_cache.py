@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Disk cache of chat-completion responses, so reruns do not pay twice.
+
+``ResponseCache(path)`` is one SQLite file. The key is a SHA-256 of
+everything that decides the answer: model, messages (system prompt and
+document), temperature and max_tokens. Change any of them and the document
+is sent again. Each entry keeps the raw response JSON (zlib-compressed), its
+token usage, and when it was stored and last read.
+
+``ExtractionEngine`` reads through the cache: a hit returns the stored
+response without touching the rate limiter, a miss calls the API and stores
+the answer. With ``cache_only=True`` a miss returns None instead.
+
+The file is kept under ``max_mb`` (and ``max_entries``, if set) by dropping
+the least recently read entries. ``stats`` counts hits, misses, stores and
+evictions.
+"""
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+
+
+def cache_key(model, messages, temperature, max_tokens):
+    blob = json.dumps([model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, max_mb=512, max_entries=0):
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')  # readers do not block the writer
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, model TEXT, response BLOB, size INTEGER,
+            prompt_tokens INTEGER, completion_tokens INTEGER, total_tokens INTEGER,
+            created REAL, used REAL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_used ON responses (used)')
+        self.max_bytes = max_mb * 2 ** 20 if max_mb else 0
+        self.max_entries = max_entries
+        self.stats = {'hit': 0, 'miss': 0, 'stored': 0, 'evicted': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key):
+        """The stored response dict for ``key``, or None."""
+        row = self.db.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.stats['miss'] += 1
+            return None
+        self.db.execute('UPDATE responses SET used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        self.stats['hit'] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, model, response):
+        """Store ``response`` (the dict form of a ChatCompletion) under ``key``."""
+        body = zlib.compress(json.dumps(response, ensure_ascii=False).encode('utf-8'))
+        usage = response.get('usage') or {}
+        now = time.time()
+        self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (key, model, body, len(body), usage.get('prompt_tokens'),
+                         usage.get('completion_tokens'), usage.get('total_tokens'), now, now))
+        self.stats['stored'] += 1
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        count, size = self.db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        over_entries = count - self.max_entries if self.max_entries else 0
+        over_bytes = size - self.max_bytes if self.max_bytes else 0
+        if over_entries <= 0 and over_bytes <= 0:
+            return
+        drop = []
+        for key, entry_size in self.db.execute('SELECT key, size FROM responses ORDER BY used'):
+            if over_entries <= 0 and over_bytes <= 0:
+                break
+            drop.append((key,))
+            over_entries -= 1
+            over_bytes -= entry_size
+        self.db.executemany('DELETE FROM responses WHERE key = ?', drop)
+        self.stats['evicted'] += len(drop)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
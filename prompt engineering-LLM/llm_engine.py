@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Concurrent chat-completion calls that share one rate limit.
+
+``ExtractionEngine(client, model, ...)`` wraps an ``openai.AsyncOpenAI``
+client. It is one keep-alive connection pool, built with ``max_retries=0``
+so retrying is left to the engine. Any number of workers may await
+``engine.complete(messages)`` at once:
+- ``RateLimiter`` holds every call until the requests-per-minute and
+  tokens-per-minute buckets have room. A call reserves its prompt estimate
+  plus ``max_tokens``, and the difference is settled once the response
+  reports its usage;
+- a 429 pauses the limiter for everyone, for ``Retry-After`` (or
+  ``retry-after-ms``) when the server sends one. Other retryable errors
+  (timeouts, connection errors, 5xx) back off exponentially. Both waits get
+  random jitter so the workers do not all come back at the same moment;
+- ``CircuitBreaker`` opens after ``failures`` consecutive timeouts,
+  connection errors or 5xx. Calls then wait ``cooldown`` seconds, after
+  which one probe call is let through and closes it again on success.
+
+With a ``ResponseCache`` (llm_cache.py) calls read through it: hits skip
+the limiter and the API entirely.
+"""
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from llm_cache import cache_key
+
+RETRYABLE = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def estimate_tokens(text):
+    # no tokenizer for DeepSeek here; ~3 characters a token errs on the high side for English
+    return len(text) // 3 + 1
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait in ``error``'s response, or None."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by all workers.
+
+    Each bucket holds ``burst`` seconds' worth, so a fresh run does not send
+    a whole minute's quota at once. A limit of 0 or None is not enforced.
+    Callers are served in arrival order: the one at the head of the line holds
+    the lock while it waits.
+    """
+
+    def __init__(self, rpm, tpm, burst=10.0):
+        self.rpm = rpm or 0
+        self.tpm = tpm or 0
+        self.max_requests = max(self.rpm * burst / 60, 1.0)
+        self.max_tokens = self.tpm * burst / 60
+        self.requests = self.max_requests
+        self.tokens = self.max_tokens
+        self.stamp = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.stamp
+        self.stamp = now
+        if self.rpm:
+            self.requests = min(self.max_requests, self.requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tokens = min(self.max_tokens, self.tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens):
+        """Wait for one request and ``tokens`` tokens; returns the tokens reserved.
+
+        A call larger than the bucket waits for a full bucket and leaves it in debt.
+        """
+        tokens = min(tokens, self.max_tokens) if self.tpm else tokens
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    wait = max((1 - self.requests) * 60 / self.rpm if self.rpm else 0,
+                               (tokens - self.tokens) * 60 / self.tpm if self.tpm else 0)
+                    if wait <= 0:
+                        self.requests -= 1
+                        self.tokens -= tokens
+                        return tokens
+                await asyncio.sleep(wait)
+
+    def settle(self, reserved, used):
+        """Charge (or give back) the difference between the reservation and real usage."""
+        if self.tpm:
+            self.tokens -= used - reserved
+
+    def pause(self, seconds):
+        """Hold every caller for ``seconds``, e.g. after a 429."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    def __init__(self, failures=5, cooldown=60.0):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    async def wait(self):
+        """Return when a call may go out: the breaker is closed, or this call is
+        the probe (then True is returned, and the caller must ``release()``)."""
+        while self.opened_at is not None:
+            left = self.opened_at + self.cooldown - time.monotonic()
+            if left <= 0 and not self.probing:
+                self.probing = True
+                return True
+            await asyncio.sleep(left if left > 0 else 1.0)
+        return False
+
+    def release(self):
+        """End a probe that said nothing about the server (a 429, a cancelled call...),
+        so the next call becomes the probe instead."""
+        self.probing = False
+
+    def success(self):
+        if self.opened_at is not None:
+            logging.info("Circuit breaker closed")
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+            logging.warning(f"Circuit breaker open for {self.cooldown:.0f} s after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ExtractionEngine:
+    def __init__(self, client, model, rpm=60, tpm=0, max_tokens=6000, temperature=0,
+                 max_retries=5, backoff=1.0, max_backoff=60.0, breaker=None, cache=None, cache_only=False):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = RateLimiter(rpm, tpm)
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        self.cache_only = cache_only
+        self.stats = {'calls': 0, 'retries': 0, 'rate_limited': 0, 'failed': 0, 'tokens': 0}
+
+    def _delay(self, attempt, error):
+        asked = retry_after(error)
+        if asked is not None:
+            return asked + random.uniform(0, 1.0)
+        # full jitter: anywhere up to the exponential step
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def complete(self, messages):
+        """The chat completion for ``messages``, or None when it keeps failing
+        (or is not cached, in cache-only mode)."""
+        if self.cache is None:
+            return await self._call(messages)
+        key = cache_key(self.model, messages, self.temperature, self.max_tokens)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate(cached)
+        if self.cache_only:
+            return None
+        response = await self._call(messages)
+        if response is not None:
+            self.cache.put(key, self.model, response.model_dump(mode='json'))
+        return response
+
+    async def _call(self, messages):
+        prompt = estimate_tokens(''.join(m['content'] for m in messages))
+        delay = 0
+        for attempt in range(self.max_retries):
+            if delay:
+                await asyncio.sleep(delay)
+            probe = await self.breaker.wait()
+            try:
+                reserved = await self.limiter.acquire(prompt + self.max_tokens)
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=self.max_tokens,
+                        temperature=self.temperature,
+                    )
+                except RETRYABLE as e:
+                    # a refused request still counts against the request bucket, its tokens do not
+                    self.limiter.settle(reserved, 0)
+                    delay = self._delay(attempt, e)
+                    if isinstance(e, openai.RateLimitError):
+                        self.stats['rate_limited'] += 1
+                        self.limiter.pause(delay)
+                    else:
+                        self.breaker.failure()
+                    self.stats['retries'] += 1
+                    logging.error(f"{type(e).__name__} (attempt {attempt + 1}/{self.max_retries}), retrying in {delay:.1f} s: {e}")
+                    continue
+                except openai.APIError as e:
+                    self.limiter.settle(reserved, 0)
+                    self.breaker.success()  # the server answered; the request itself is bad
+                    self.stats['failed'] += 1
+                    logging.error(f"API error, not retried: {e}")
+                    return None
+                self.breaker.success()
+                used = response.usage.total_tokens if response.usage else reserved
+                self.limiter.settle(reserved, used)
+                self.stats['calls'] += 1
+                self.stats['tokens'] += used
+                return response
+            finally:
+                if probe:
+                    # success() and failure() already end the probe; anything else must too
+                    self.breaker.release()
+        self.stats['failed'] += 1
+        return None
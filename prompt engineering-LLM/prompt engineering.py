@@ -1,25 +1,45 @@
 import openai
+import asyncio
 import logging
-import time
 import os
 from dotenv import load_dotenv
 from docx import Document
 
+from llm_engine import ExtractionEngine, CircuitBreaker
+from llm_cache import ResponseCache, cache_key
+from job_queue import JobQueue
+
 load_dotenv()
 
+MODEL = "deepseek-chat"
+MAX_TOKENS = 6000
+TEMPERATURE = 0
+BASE_URL = "https://api.deepseek.com/v1"  # DeepSeek API endpoint
+CONCURRENCY = 8        # documents in flight at once
+RPM = 60               # requests per minute, shared by all workers (0 = no limit)
+TPM = 0                # tokens per minute, prompt + completion (0 = no limit); set to your account's quota
+MAX_RETRIES = 5        # attempts per document on 429/timeouts/5xx
+REQUEST_TIMEOUT = 600  # seconds; long documents can take minutes to answer
+BREAKER_FAILURES = 5   # consecutive timeouts/5xx before the circuit breaker opens
+BREAKER_COOLDOWN = 60  # seconds the breaker stays open before a probe request
+CACHE_PATH = "llm_cache.sqlite"  # responses kept across runs; None = no cache
+CACHE_ONLY = 0         # Set to 1 to answer from the cache only (re-export without API calls)
+CACHE_MAX_MB = 512     # least recently used responses are dropped past this size
+MAX_ATTEMPTS = 3       # runs of a document (each with MAX_RETRIES calls) before it stays failed
+RETRY_DELAY = 60       # seconds before a failed document is tried again
+JOB_LEASE = 120        # seconds without heartbeat after which another worker (or a restart) takes over a running job
+
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
 if not DEEPSEEK_API_KEY:
     logging.error("DeepSeek API key is not set. Please define DEEPSEEK_API_KEY in your environment variables.")
     exit("DeepSeek API key is not set. Please define DEEPSEEK_API_KEY in your environment variables.")
-else:
-    openai.api_key = DEEPSEEK_API_KEY
-    openai.api_base = "https://api.deepseek.com/v1"  # DeepSeek API endpoint
 
 logging.basicConfig(
     filename='process.log',
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
+logging.getLogger("httpx").setLevel(logging.WARNING)  # the openai client logs every request at INFO
 
 SYSTEM_MESSAGE_CONTENT = """
 You are tasked with extracting information about fatigue test specimens.
@@ -77,32 +97,31 @@ Important:
 
 class DeepSeekHandler:
 
-    @staticmethod
-    def extract_information(file_content, max_retries=3, delay=1):
-        for attempt in range(max_retries):
-            try:
-                response = openai.ChatCompletion.create(
-                    model="deepseek-chat",
-                    messages=[
-                        {"role": "system", "content": SYSTEM_MESSAGE_CONTENT},
-                        {"role": "user", "content": file_content}
-                    ],
-                    max_tokens=6000,
-                    temperature=0
-                )
-                fatigue_data = response.choices[0].message['content'].strip()
-                logging.info("Successfully called DeepSeek to extract information")
-                return fatigue_data
-            except openai.error.RateLimitError as e:
-                logging.error(f"API rate limit exceeded (attempt {attempt + 1}), error: {e}")
-                time.sleep(delay * (2 ** attempt))
-            except openai.error.APIError as e:
-                logging.error(f"API error (attempt {attempt + 1}): {e}")
-                time.sleep(delay)
-            except Exception as e:
-                logging.error(f"Unexpected error: {e}")
-                return None
-        return None
+    def __init__(self):
+        # one client = one keep-alive connection pool; retries are left to the engine
+        self.client = openai.AsyncOpenAI(api_key=DEEPSEEK_API_KEY, base_url=BASE_URL,
+                                         max_retries=0, timeout=REQUEST_TIMEOUT)
+        self.cache = ResponseCache(CACHE_PATH, CACHE_MAX_MB) if CACHE_PATH else None
+        self.engine = ExtractionEngine(self.client, MODEL, rpm=RPM, tpm=TPM, max_tokens=MAX_TOKENS, temperature=TEMPERATURE,
+                                       max_retries=MAX_RETRIES,
+                                       breaker=CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN),
+                                       cache=self.cache, cache_only=CACHE_ONLY)
+
+    async def extract_information(self, file_content):
+        response = await self.engine.complete([
+            {"role": "system", "content": SYSTEM_MESSAGE_CONTENT},
+            {"role": "user", "content": file_content}
+        ])
+        if response is None:
+            return None
+        logging.info("Successfully called DeepSeek to extract information")
+        return (response.choices[0].message.content or "").strip()
+
+    async def close(self):
+        await self.client.close()
+        if self.cache is not None:
+            logging.info(f"Cache stats: {self.cache.stats}")
+            self.cache.close()
 
 def read_word_file(file_path):
     doc = Document(file_path)
@@ -124,35 +143,104 @@ def read_text_file(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
-def process_all_files_in_directory(directory_path, output_directory):
+def read_input(file_path):
+    # Select reading method based on file extension
+    if file_path.endswith('.docx'):
+        return read_word_file(file_path)
+    return read_text_file(file_path)
+
+async def process_file(handler, file_path, output_directory):
+    file_content = await asyncio.to_thread(read_input, file_path)
+    extracted_data = await handler.extract_information(file_content)
+
+    if not extracted_data:
+        raise RuntimeError("No answer from the API after retries (or not cached, with CACHE_ONLY = 1)")
+    output_filename = os.path.splitext(os.path.basename(file_path))[0] + ".txt"
+    output_file_path = os.path.join(output_directory, output_filename)
+    with open(output_file_path, "w", encoding="utf-8") as output_file:
+        output_file.write(extracted_data)
+    logging.info(f"Successfully saved to file: {output_file_path}")
+    return output_file_path
+
+async def claim(queue):
+    # if we are cancelled meanwhile, the claim still completes in its thread:
+    # wait for it and hand the job back, or it would sit 'running' for a whole lease
+    task = asyncio.ensure_future(asyncio.to_thread(queue.claim))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        filename = await task
+        if filename is not None:
+            await asyncio.to_thread(queue.release, filename)
+        raise
+
+async def process_all_files_async(directory_path, output_directory, concurrency=CONCURRENCY):
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
 
-    for filename in os.listdir(directory_path):
+    inputs = []
+    for filename in sorted(os.listdir(directory_path)):
         file_path = os.path.join(directory_path, filename)
 
-        if os.path.isfile(file_path):
-            # Select reading method based on file extension
-            if filename.endswith('.docx'):
-                file_content = read_word_file(file_path)
-            elif filename.endswith('.txt'):
-                file_content = read_text_file(file_path)
-            else:
-                logging.warning(f"Unsupported file type: {filename}")
+        if not os.path.isfile(file_path):
+            logging.warning(f"Skipping directory: {file_path}")
+        elif filename.endswith(('.docx', '.txt')):
+            inputs.append(filename)
+        else:
+            logging.warning(f"Unsupported file type: {filename}")
+
+    # the job table lives with the outputs; other processes pointed at the same folders share it
+    # done jobs are run again when the prompt or the model settings change
+    version = cache_key(MODEL, [{"role": "system", "content": SYSTEM_MESSAGE_CONTENT}], TEMPERATURE, MAX_TOKENS)[:16]
+    queue = JobQueue(os.path.join(output_directory, 'jobs.sqlite'), MAX_ATTEMPTS, RETRY_DELAY, JOB_LEASE, version)
+    # the queue's sqlite calls can wait on other workers' locks: keep them off the event loop
+    await asyncio.to_thread(queue.add, directory_path, inputs)
+    handler = DeepSeekHandler()
+
+    async def worker():
+        while True:
+            filename = await claim(queue)
+            if filename is None:
+                wait = await asyncio.to_thread(queue.next_retry)
+                if wait is None:
+                    return
+                await asyncio.sleep(wait)
                 continue
+            try:
+                output_file_path = await process_file(handler, os.path.join(directory_path, filename), output_directory)
+            except asyncio.CancelledError:
+                await asyncio.to_thread(queue.release, filename)
+                raise
+            except Exception as e:
+                logging.error(f"Failed on {filename}: {e}")
+                await asyncio.to_thread(queue.fail, filename, e)
+            else:
+                await asyncio.to_thread(queue.done, filename, output_file_path)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(JOB_LEASE / 5)
+            await asyncio.to_thread(queue.heartbeat)
+
+    beat = asyncio.create_task(heartbeat())
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # a worker that raised (or Ctrl+C) stops the others, and they hand their jobs
+        # back, before the client and the queue are closed under them
+        for task in workers + [beat]:
+            task.cancel()
+        await asyncio.gather(*workers, beat, return_exceptions=True)
+        await handler.close()
+        logging.info(f"Engine stats: {handler.engine.stats}")
+        logging.info(f"Jobs: {queue.counts()}")
+        queue.close()
 
-            extracted_data = DeepSeekHandler.extract_information(file_content)
-
-            if extracted_data:
-                output_filename = os.path.splitext(filename)[0] + ".txt"
-                output_file_path = os.path.join(output_directory, output_filename)
-                with open(output_file_path, "w", encoding="utf-8") as output_file:
-                    output_file.write(extracted_data)
-                logging.info(f"Successfully saved to file: {output_file_path}")
-        else:
-            logging.warning(f"Skipping directory: {file_path}")
+def process_all_files_in_directory(directory_path, output_directory):
+    asyncio.run(process_all_files_async(directory_path, output_directory))
 
 if __name__ == "__main__":
     directory_path = r"F:\unprocessed"
     output_directory = r"F:\processed"
-    process_all_files_in_directory(directory_path, output_directory)
+    process_all_files_in_directory(directory_path, output_directory)
\ No newline at end of file